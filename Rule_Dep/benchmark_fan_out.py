@@ -0,0 +1,172 @@
+"""
+Benchmark fan_out_analysis.calculate_problem_scores against the previous
+implementation (re-expanding DFS for depths, O(V^2) in-degree and dependent
+scans) on grammars synthetically scaled to 10-100x SolidityParser.g4.
+
+A scaled grammar holds `factor` copies of complete_dependencies.json. Each
+parser-rule edge also points at the same rule in the next copy, which
+multiplies the number of root paths the way nested expression/statement
+alternatives do in a real grammar. The legacy implementation runs in a child
+process with a time limit so an exponential blow-up cannot hang the run.
+
+    python benchmark_fan_out.py [factor ...]
+"""
+
+import json
+import multiprocessing
+import sys
+import threading
+import time
+
+import numpy as np
+
+from fan_out_analysis import calculate_problem_scores, load_grammar_data
+
+
+LEGACY_TIMEOUT = 60.0
+
+
+def legacy_calculate_depths(adj_list, root="sourceUnit"):
+    depths = {}
+    visited = set()
+
+    def dfs(node, current_depth):
+        if node in visited:
+            if current_depth < depths.get(node, float('inf')):
+                depths[node] = current_depth
+            else:
+                return
+        else:
+            visited.add(node)
+            depths[node] = current_depth
+        if node in adj_list:
+            for dep in adj_list[node].get("parser_rules", []):
+                if dep in adj_list:
+                    dfs(dep, current_depth + 1)
+
+    if root in adj_list:
+        dfs(root, 0)
+
+    for node in adj_list:
+        if node not in depths:
+            min_depth_from_dependents = float('inf')
+            for other_node, other_data in adj_list.items():
+                if node in other_data.get("parser_rules", []):
+                    if other_node in depths:
+                        min_depth_from_dependents = min(min_depth_from_dependents, depths[other_node] + 1)
+            if min_depth_from_dependents != float('inf'):
+                depths[node] = min_depth_from_dependents
+            else:
+                depths[node] = 10
+    return depths
+
+
+def legacy_calculate_problem_scores(adj_list):
+    depths = legacy_calculate_depths(adj_list)
+    problem_scores = {}
+    for node, data in adj_list.items():
+        depth = depths.get(node, 10)
+        parser_fan_out = len(set(data.get("parser_rules", [])))
+        lexer_fan_out = len(set(data.get("lexer_tokens", [])))
+        total_fan_out = parser_fan_out + lexer_fan_out
+        in_degree = 0
+        for other_node, other_data in adj_list.items():
+            if node in other_data.get("parser_rules", []):
+                in_degree += 1
+        fan_out_depth_ratio = total_fan_out / (depth + 1)
+        problem_score = fan_out_depth_ratio * np.sqrt(depth + 1)
+        if depth > 2 and in_degree > 3:
+            problem_score *= 1.5
+        problem_scores[node] = {"depth": depth, "in_degree": in_degree, "problem_score": round(problem_score, 2)}
+    return problem_scores
+
+
+def scale_grammar(adj_list, factor):
+    """`factor` copies of adj_list, chained copy i -> copy i+1 on every parser-rule edge."""
+    def name(node, i):
+        return node if i == 0 else f"{node}__{i}"
+
+    scaled = {}
+    for i in range(factor):
+        for node, data in adj_list.items():
+            deps = [name(dep, i) for dep in data.get("parser_rules", [])]
+            if i + 1 < factor:
+                deps += [name(dep, i + 1) for dep in data.get("parser_rules", []) if dep in adj_list]
+            scaled[name(node, i)] = {"parser_rules": deps, "lexer_tokens": list(data.get("lexer_tokens", []))}
+    return scaled
+
+
+def _run_legacy(adj_list, out):
+    # The recursive DFS needs a deep stack on large grammars.
+    sys.setrecursionlimit(1000000)
+    threading.stack_size(512 * 1024 * 1024)
+    result = {}
+
+    def target():
+        start = time.perf_counter()
+        scores = legacy_calculate_problem_scores(adj_list)
+        result["seconds"] = time.perf_counter() - start
+        result["scores"] = scores
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    out.put(result)
+
+
+def time_legacy(adj_list, timeout=LEGACY_TIMEOUT):
+    """(seconds, scores) of the legacy implementation, or (None, None) past the timeout."""
+    out = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_legacy, args=(adj_list, out))
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return None, None
+    result = out.get() if not out.empty() else {}
+    return result.get("seconds"), result.get("scores")
+
+
+def same_scores(new, legacy):
+    return all(
+        new[node]["depth"] == legacy[node]["depth"]
+        and new[node]["in_degree"] == legacy[node]["in_degree"]
+        and new[node]["problem_score"] == legacy[node]["problem_score"]
+        for node in legacy
+    )
+
+
+if __name__ == "__main__":
+    factors = [int(f) for f in sys.argv[1:]] or [1, 10, 25, 50, 100]
+    base = load_grammar_data()
+
+    rows = []
+    legacy_gave_up = False
+    for factor in factors:
+        adj_list = scale_grammar(base, factor)
+        edges = sum(len(data["parser_rules"]) for data in adj_list.values())
+
+        start = time.perf_counter()
+        scores = calculate_problem_scores(adj_list)
+        new_seconds = time.perf_counter() - start
+
+        # Once the legacy version times out, larger grammars are not attempted.
+        legacy_seconds, legacy_scores = (None, None) if legacy_gave_up else time_legacy(adj_list)
+        legacy_gave_up = legacy_seconds is None
+
+        row = {
+            "factor": factor,
+            "nodes": len(adj_list),
+            "edges": edges,
+            "seconds": round(new_seconds, 4),
+            "legacy_seconds": round(legacy_seconds, 4) if legacy_seconds is not None else f"> {LEGACY_TIMEOUT:.0f}",
+            "speedup": round(legacy_seconds / new_seconds, 1) if legacy_seconds else None,
+            "identical": same_scores(scores, legacy_scores) if legacy_scores else None,
+        }
+        rows.append(row)
+        print(json.dumps(row))
+
+    with open("fan_out_benchmark.json", "w") as f:
+        json.dump(rows, f, indent=2)
+    print("✅ Benchmark saved to fan_out_benchmark.json")
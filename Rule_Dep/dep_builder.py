@@ -1,8 +1,25 @@
-from antlr4 import FileStream, CommonTokenStream
+from antlr4 import FileStream, InputStream, CommonTokenStream, Token
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
 from ANTLRv4Lexer import ANTLRv4Lexer
 from ANTLRv4Parser import ANTLRv4Parser
 from ANTLRv4ParserVisitor import ANTLRv4ParserVisitor
+import hashlib
 import json
+import os
+import re
+
+# Extracted graph of the last build, keyed by the grammar file's hash, with
+# a hash of every parser rule's source for incremental re-extraction.
+CACHE_FILE = '.dep_cache.json'
+CACHE_VERSION = 1
+
+# A parser rule starts at column 0 with its name; grammar-level keywords
+# and rule prequels (locals, returns, ...) also start there.
+RULE_START_RE = re.compile(
+    r'^(?!(?:parser|lexer|grammar|options|tokens|channels|import|mode|fragment|locals|returns|throws)\b)([a-z]\w*)\b',
+    re.M)
 
 class CompleteDependencyExtractor(ANTLRv4ParserVisitor):
     """
@@ -11,7 +28,9 @@ class CompleteDependencyExtractor(ANTLRv4ParserVisitor):
     """
     
     def __init__(self):
-        self.graph = {}  # rule -> {'parser_rules': [...], 'lexer_tokens': [...]}
+        # rule -> {'parser_rules': {...}, 'lexer_tokens': {...}}; dicts are
+        # used as ordered sets so dependencies keep first-use order.
+        self.graph = {}
         self.current_rule = None
         
     def visitParserRuleSpec(self, ctx):
@@ -20,8 +39,8 @@ class CompleteDependencyExtractor(ANTLRv4ParserVisitor):
         
         # Initialize node with both types of dependencies
         self.graph[self.current_rule] = {
-            'parser_rules': [],
-            'lexer_tokens': []
+            'parser_rules': {},
+            'lexer_tokens': {}
         }
         
         # Visit rule body
@@ -34,9 +53,8 @@ class CompleteDependencyExtractor(ANTLRv4ParserVisitor):
         
         target_rule = ctx.RULE_REF().getText()
         
-        # Add parser rule dependency (avoid duplicates)
-        if target_rule not in self.graph[self.current_rule]['parser_rules']:
-            self.graph[self.current_rule]['parser_rules'].append(target_rule)
+        # Add parser rule dependency (duplicates collapse in the ordered set)
+        self.graph[self.current_rule]['parser_rules'][target_rule] = None
         
         return self.visitChildren(ctx)
     
@@ -54,32 +72,151 @@ class CompleteDependencyExtractor(ANTLRv4ParserVisitor):
             token_name = ctx.STRING_LITERAL().getText()
         
         if token_name:
-            # Add lexer token dependency (avoid duplicates)
-            if token_name not in self.graph[self.current_rule]['lexer_tokens']:
-                self.graph[self.current_rule]['lexer_tokens'].append(token_name)
+            # Add lexer token dependency (duplicates collapse in the ordered set)
+            self.graph[self.current_rule]['lexer_tokens'][token_name] = None
         
         return self.visitChildren(ctx)
 
+    def dependency_lists(self):
+        return {
+            rule: {kind: list(deps) for kind, deps in dependencies.items()}
+            for rule, dependencies in self.graph.items()
+        }
+
+
+def parse(input_stream, entry):
+    """
+    Parse with SLL prediction first, which is much cheaper and enough for
+    almost every input, and only fall back to full LL prediction (with the
+    usual error reporting) if SLL fails.
+    Returns (tree, parser).
+    """
+    tokens = CommonTokenStream(ANTLRv4Lexer(input_stream))
+    parser = ANTLRv4Parser(tokens)
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser._errHandler = BailErrorStrategy()
+    try:
+        return entry(parser), parser
+    except ParseCancellationException:
+        tokens.seek(0)
+        parser.reset()
+        parser._interp.predictionMode = PredictionMode.LL
+        parser._errHandler = DefaultErrorStrategy()
+        return entry(parser), parser
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-def build_complete_graph(parser_grammar_file):
+
+def split_rules(grammar_text):
+    """
+    Source text of every parser rule, in grammar order: from its name to the
+    next rule's name. Returns None if a rule name occurs twice.
+    """
+    starts = list(RULE_START_RE.finditer(grammar_text))
+    chunks = {}
+    for i, match in enumerate(starts):
+        end = starts[i + 1].start() if i + 1 < len(starts) else len(grammar_text)
+        if match.group(1) in chunks:
+            return None
+        chunks[match.group(1)] = grammar_text[match.start():end]
+    return chunks
+
+
+def extract_rule(rule_name, rule_text):
+    """
+    Dependencies of a single parser rule parsed on its own, or None if the
+    text is not exactly that one rule (the caller then parses the grammar).
+    """
+    extractor = CompleteDependencyExtractor()
+    tree, parser = parse(InputStream(rule_text), lambda p: p.parserRuleSpec())
+    if parser.getNumberOfSyntaxErrors() or parser.getCurrentToken().type != Token.EOF:
+        return None
+    extractor.visit(tree)
+    graph = extractor.dependency_lists()
+    return graph.get(rule_name) if list(graph) == [rule_name] else None
+
+
+def load_cache(cache_file):
+    if not os.path.isfile(cache_file):
+        return None
+    with open(cache_file, 'r') as f:
+        cache = json.load(f)
+    return cache if cache.get('version') == CACHE_VERSION else None
+
+
+def save_cache(cache_file, grammar_hash, graph, chunks):
+    rules = {}
+    for rule, deps in graph.items():
+        rule_hash = hashlib.sha256(chunks[rule].encode('utf-8')).hexdigest() if chunks and rule in chunks else None
+        rules[rule] = dict(deps, hash=rule_hash)
+    with open(cache_file, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'hash': grammar_hash, 'rules': rules}, f, indent=2)
+
+
+def build_incremental(chunks, cache):
+    """
+    Graph from the cached dependencies of unchanged rules, re-extracting only
+    new or edited rules. Returns None if a rule cannot be extracted on its own.
+    """
+    graph = {}
+    reextracted = []
+    for rule, text in chunks.items():
+        cached = cache['rules'].get(rule)
+        if cached and cached['hash'] == hashlib.sha256(text.encode('utf-8')).hexdigest():
+            graph[rule] = {'parser_rules': cached['parser_rules'], 'lexer_tokens': cached['lexer_tokens']}
+            continue
+        deps = extract_rule(rule, text)
+        if deps is None:
+            return None
+        graph[rule] = deps
+        reextracted.append(rule)
+    print(f"Re-extracted {len(reextracted)} of {len(chunks)} rules: {', '.join(reextracted) or '(none)'}")
+    return graph
+
+
+def build_complete_graph(parser_grammar_file, cache_file=None):
     """
     Build complete dependency graph including lexer tokens.
+
+    With a cache file, an unchanged grammar is not parsed at all, and after
+    an edit only the rules whose source changed are re-extracted.
     
     Returns:
         dict: graph[rule] = {'parser_rules': [...], 'lexer_tokens': [...]}
     """
-    extractor = CompleteDependencyExtractor()
-    
-    # Parse parser grammar
-    print(f"Parsing {parser_grammar_file}...")
-    parser_input = FileStream(parser_grammar_file)
-    lexer = ANTLRv4Lexer(parser_input)
-    tokens = CommonTokenStream(lexer)
-    parser = ANTLRv4Parser(tokens)
-    parser_tree = parser.grammarSpec()
-    extractor.visit(parser_tree)
-    
-    return extractor.graph
+    cache = load_cache(cache_file) if cache_file else None
+    grammar_hash = file_hash(parser_grammar_file)
+    if cache and cache['hash'] == grammar_hash:
+        print(f"Using cached graph for {parser_grammar_file} ({cache_file})")
+        return {rule: {'parser_rules': deps['parser_rules'], 'lexer_tokens': deps['lexer_tokens']}
+                for rule, deps in cache['rules'].items()}
+
+    with open(parser_grammar_file, 'r', encoding='utf-8') as f:
+        chunks = split_rules(f.read())
+
+    graph = None
+    if cache and chunks:
+        print(f"{parser_grammar_file} changed, re-extracting edited rules...")
+        graph = build_incremental(chunks, cache)
+
+    if graph is None:
+        extractor = CompleteDependencyExtractor()
+
+        # Parse parser grammar
+        print(f"Parsing {parser_grammar_file}...")
+        parser_tree, _ = parse(FileStream(parser_grammar_file), lambda p: p.grammarSpec())
+        extractor.visit(parser_tree)
+        graph = extractor.dependency_lists()
+        if chunks and list(chunks) != list(graph):
+            # Rule boundaries not recognised; never reuse per-rule entries.
+            chunks = None
+
+    if cache_file:
+        save_cache(cache_file, grammar_hash, graph, chunks)
+    return graph
 
 
 def print_graph_summary(graph):
@@ -241,7 +378,7 @@ def print_rule_details(graph, rule_name):
 # Main usage
 if __name__ == "__main__":
     # Build the complete dependency graph
-    graph = build_complete_graph('SolidityParser.g4')
+    graph = build_complete_graph('SolidityParser.g4', CACHE_FILE)
     
     # Print summary
     print_graph_summary(graph)
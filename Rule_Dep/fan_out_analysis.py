@@ -1,4 +1,6 @@
 import json
+from collections import deque
+
 import numpy as np
 
 def load_grammar_data(json_file="complete_dependencies.json"):
@@ -6,126 +8,237 @@ def load_grammar_data(json_file="complete_dependencies.json"):
     with open(json_file, 'r') as f:
         return json.load(f)
 
-def calculate_depths(adj_list, root="sourceUnit"):
+def reverse_adjacency(adj_list):
+    """
+    Map each node to the nodes whose parser rules reference it, in adj_list
+    order. Built once so in-degrees and dependent lookups do not rescan the
+    whole graph per node.
+    """
+    referenced_by = {node: [] for node in adj_list}
+    for other_node, other_data in adj_list.items():
+        for dep in set(other_data.get("parser_rules", [])):
+            if dep in referenced_by:
+                referenced_by[dep].append(other_node)
+    return referenced_by
+
+def calculate_depths(adj_list, root="sourceUnit", referenced_by=None):
     """
     Calculate depth of each node from the root.
     Depth is the minimum distance from root via parser rule dependencies.
+
+    Breadth-first search visits every node and edge once, so this is
+    O(V + E) however many paths the grammar has.
     """
+    if referenced_by is None:
+        referenced_by = reverse_adjacency(adj_list)
+
     depths = {}
-    visited = set()
-    
-    def dfs(node, current_depth):
-        if node in visited:
-            if current_depth < depths.get(node, float('inf')):
-                depths[node] = current_depth
-            else:
-                return
-        else:
-            visited.add(node)
-            depths[node] = current_depth
-        
-        # Follow parser rules to dependencies
-        if node in adj_list:
-            for dep in adj_list[node].get("parser_rules", []):
-                if dep in adj_list:  # Only follow if it's a known node
-                    dfs(dep, current_depth + 1)
-    
-    # Start DFS from root
     if root in adj_list:
-        dfs(root, 0)
-    
+        depths[root] = 0
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            # Follow parser rules to dependencies
+            for dep in adj_list[node].get("parser_rules", []):
+                if dep in adj_list and dep not in depths:  # Only follow if it's a known node
+                    depths[dep] = depths[node] + 1
+                    queue.append(dep)
+
     # For any nodes not reached, estimate depth from their dependents
+    # (including unreached nodes already estimated earlier in this pass)
     for node in adj_list:
         if node not in depths:
-            min_depth_from_dependents = float('inf')
-            
-            # Find nodes that reference this node
-            for other_node, other_data in adj_list.items():
-                if node in other_data.get("parser_rules", []):
-                    if other_node in depths:
-                        min_depth_from_dependents = min(
-                            min_depth_from_dependents, 
-                            depths[other_node] + 1
-                        )
-            
-            if min_depth_from_dependents != float('inf'):
-                depths[node] = min_depth_from_dependents
+            dependent_depths = [depths[other] for other in referenced_by[node] if other in depths]
+            if dependent_depths:
+                depths[node] = min(dependent_depths) + 1
             else:
                 # Isolated node, assign a high depth
                 depths[node] = 10
-    
+
     return depths
 
+def score_arrays(depth, parser_fan_out, lexer_fan_out, in_degree):
+    """
+    Problem scores for arrays of depths, fan-outs and in-degrees (one entry
+    per node or per strongly connected component).
+    Returns a list of stats dicts in the same order.
+    """
+    total_fan_out = parser_fan_out + lexer_fan_out
+    # Adding 1 to depth to avoid division by zero for root
+    fan_out_depth_ratio = total_fan_out / (depth + 1)
+    # Higher score = more problematic (high fan-out at depth)
+    problem_score = fan_out_depth_ratio * np.sqrt(depth + 1)
+    # Additional penalty for "hub" nodes deep in the tree
+    problem_score = np.where((depth > 2) & (in_degree > 3), problem_score * 1.5, problem_score)
+
+    is_problematic = (problem_score > 2.0) & (depth > 2)
+    severity = np.select(
+        [depth <= 2, problem_score > 5, problem_score > 3, problem_score > 2, problem_score > 1],
+        ["low", "critical", "high", "medium", "low"],
+        default="normal",
+    )
+
+    return [
+        {
+            "depth": int(depth[i]),
+            "parser_fan_out": int(parser_fan_out[i]),
+            "lexer_fan_out": int(lexer_fan_out[i]),
+            "total_fan_out": int(total_fan_out[i]),
+            "in_degree": int(in_degree[i]),
+            "fan_out_depth_ratio": round(float(fan_out_depth_ratio[i]), 2),
+            "problem_score": round(float(problem_score[i]), 2),
+            "is_problematic": bool(is_problematic[i]),
+            "problem_severity": str(severity[i])
+        }
+        for i in range(len(depth))
+    ]
+
 def calculate_problem_scores(adj_list):
     """
     Calculate problem scores for each node based on depth-aware fan-out analysis.
     
     Problem Score = (Fan-out / (Depth + 1)) * sqrt(Depth + 1)
+
+    Scores are computed with NumPy over node-indexed arrays.
     """
-    # First calculate depths
-    depths = calculate_depths(adj_list)
-    
-    problem_scores = {}
-    
+    referenced_by = reverse_adjacency(adj_list)
+    depths = calculate_depths(adj_list, referenced_by=referenced_by)
+
+    nodes = list(adj_list)
+    depth = np.array([depths.get(node, 10) for node in nodes], dtype=np.int64)
+    parser_fan_out = np.array([len(set(adj_list[node].get("parser_rules", []))) for node in nodes], dtype=np.int64)
+    lexer_fan_out = np.array([len(set(adj_list[node].get("lexer_tokens", []))) for node in nodes], dtype=np.int64)
+    # How many nodes reference this one
+    in_degree = np.array([len(referenced_by[node]) for node in nodes], dtype=np.int64)
+
+    return dict(zip(nodes, score_arrays(depth, parser_fan_out, lexer_fan_out, in_degree)))
+
+def strongly_connected_components(adj_list):
+    """
+    Tarjan's algorithm over parser rule dependencies, iterative so deep
+    grammars do not hit the recursion limit. Linear in nodes and edges.
+
+    Returns components in topological order of the condensation (a
+    component only depends on components after it), members in adj_list
+    order.
+    """
+    position = {node: i for i, node in enumerate(adj_list)}
+
+    def successors(node):
+        return iter([dep for dep in adj_list[node].get("parser_rules", []) if dep in adj_list])
+
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for start in adj_list:
+        if start in index:
+            continue
+        index[start] = lowlink[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, successors(start))]
+        while work:
+            node, deps = work[-1]
+            for dep in deps:
+                if dep not in index:
+                    index[dep] = lowlink[dep] = len(index)
+                    stack.append(dep)
+                    on_stack.add(dep)
+                    work.append((dep, successors(dep)))
+                    break
+                if dep in on_stack:
+                    lowlink[node] = min(lowlink[node], index[dep])
+            else:
+                # All dependencies of node done
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component, key=position.get))
+
+    # Tarjan finishes a component after everything it depends on
+    return components[::-1]
+
+def build_condensation(adj_list, components=None):
+    """
+    Condensation DAG: one node per strongly connected component.
+
+    Returns a list of groups in topological order, each with its members,
+    whether it is recursive (more than one rule, or a rule referencing
+    itself), the groups it depends on and the groups that depend on it.
+    """
+    if components is None:
+        components = strongly_connected_components(adj_list)
+    component_of = {node: c for c, members in enumerate(components) for node in members}
+
+    groups = [
+        {"id": c, "members": members, "successors": {}, "predecessors": {}, "lexer_tokens": {}}
+        for c, members in enumerate(components)
+    ]
     for node, data in adj_list.items():
-        depth = depths.get(node, 10)
-        
-        # Calculate fan-out (outgoing dependencies)
-        parser_fan_out = len(set(data.get("parser_rules", [])))
-        lexer_fan_out = len(set(data.get("lexer_tokens", [])))
-        total_fan_out = parser_fan_out + lexer_fan_out
-        
-        # Calculate in-degree (how many nodes reference this one)
-        in_degree = 0
-        for other_node, other_data in adj_list.items():
-            if node in other_data.get("parser_rules", []):
-                in_degree += 1
-        
-        # Calculate fan-out-to-depth ratio
-        # Adding 1 to depth to avoid division by zero for root
-        if depth + 1 > 0:
-            fan_out_depth_ratio = total_fan_out / (depth + 1)
-        else:
-            fan_out_depth_ratio = total_fan_out
-        
-        # Calculate problem score
-        # Higher score = more problematic (high fan-out at depth)
-        problem_score = fan_out_depth_ratio * np.sqrt(depth + 1)
-        
-        # Additional penalty for nodes with high fan-out AND high in-degree
-        # These are "hub" nodes deep in the tree
-        if depth > 2 and in_degree > 3:
-            problem_score *= 1.5
-        
-        problem_scores[node] = {
-            "depth": depth,
-            "parser_fan_out": parser_fan_out,
-            "lexer_fan_out": lexer_fan_out,
-            "total_fan_out": total_fan_out,
-            "in_degree": in_degree,
-            "fan_out_depth_ratio": round(fan_out_depth_ratio, 2),
-            "problem_score": round(problem_score, 2),
-            "is_problematic": problem_score > 2.0 and depth > 2,
-            "problem_severity": classify_severity(problem_score, depth)
-        }
-    
-    return problem_scores
+        group = groups[component_of[node]]
+        group["lexer_tokens"].update(dict.fromkeys(data.get("lexer_tokens", [])))
+        for dep in data.get("parser_rules", []):
+            if dep not in component_of:
+                continue
+            target = component_of[dep]
+            if target != group["id"]:
+                # Ordered sets; several member edges collapse into one DAG edge
+                group["successors"][target] = None
+                groups[target]["predecessors"][group["id"]] = None
 
-def classify_severity(problem_score, depth):
-    """Classify problem severity based on score and depth"""
-    if depth <= 2:
-        return "low"  # Root nodes can have high fan-out
-    
-    if problem_score > 5:
-        return "critical"
-    elif problem_score > 3:
-        return "high"
-    elif problem_score > 2:
-        return "medium"
-    elif problem_score > 1:
-        return "low"
-    else:
-        return "normal"
+    for group in groups:
+        members = group["members"]
+        group["recursive"] = len(members) > 1 or members[0] in adj_list[members[0]].get("parser_rules", [])
+        for key in ("successors", "predecessors", "lexer_tokens"):
+            group[key] = list(group[key])
+    return groups
+
+def calculate_component_scores(adj_list, root="sourceUnit", groups=None):
+    """
+    Depths and problem scores of the condensation DAG's groups.
+
+    A group's depth is its shortest distance, in DAG edges, from the root's
+    group, computed in one pass over the groups in topological order. Groups
+    the root does not reach start at depth 10, like isolated nodes. Fan-out
+    counts the distinct groups and lexer tokens the group's rules use;
+    in-degree counts the distinct groups referencing it.
+    """
+    if groups is None:
+        groups = build_condensation(adj_list)
+    root_group = next((g["id"] for g in groups if root in g["members"]), None)
+
+    depth = np.full(len(groups), np.iinfo(np.int64).max, dtype=np.int64)
+    for group in groups:
+        c = group["id"]
+        if c == root_group:
+            depth[c] = 0
+        elif depth[c] == np.iinfo(np.int64).max:
+            # Nothing above it was reached from the root
+            depth[c] = 10
+        for successor in group["successors"]:
+            depth[successor] = min(depth[successor], depth[c] + 1)
+
+    parser_fan_out = np.array([len(g["successors"]) for g in groups], dtype=np.int64)
+    lexer_fan_out = np.array([len(g["lexer_tokens"]) for g in groups], dtype=np.int64)
+    in_degree = np.array([len(g["predecessors"]) for g in groups], dtype=np.int64)
+
+    scores = score_arrays(depth, parser_fan_out, lexer_fan_out, in_degree)
+    return [
+        dict({"id": g["id"], "members": g["members"], "recursive": g["recursive"], "successors": g["successors"]}, **stats)
+        for g, stats in zip(groups, scores)
+    ]
 
 def print_problem_analysis(problem_scores):
     """Print analysis of problem nodes"""
@@ -236,6 +349,50 @@ def print_problem_analysis(problem_scores):
     else:
         print("  No major grouping recommendations - grammar looks well-structured!")
 
+def print_recursion_analysis(component_scores):
+    """Print the recursive rule groups of the condensation DAG"""
+    recursive = [g for g in component_scores if g["recursive"]]
+    mutual = [g for g in recursive if len(g["members"]) > 1]
+
+    print(f"\n🔁 RECURSIVE RULE GROUPS (strongly connected components)")
+    print("-" * 100)
+    print(f"   {len(component_scores)} groups in the condensation DAG, "
+          f"{len(mutual)} mutually recursive, {len(recursive) - len(mutual)} self-recursive rules")
+    for group in sorted(recursive, key=lambda g: (-len(g["members"]), g["depth"])):
+        kind = "mutual" if len(group["members"]) > 1 else "self"
+        members = ", ".join(group["members"])
+        print(f"  [{kind:6}] Depth: {group['depth']:2d} | Fan-out: {group['total_fan_out']:3d} | "
+              f"Score: {group['problem_score']:6.2f} | {members}")
+
+def export_condensation_to_dot(component_scores, filename="parser_condensation.dot"):
+    """
+    Export the condensation DAG in the style of parser_graph.dot: one box per
+    group, mutually recursive groups filled red, self-recursive rules
+    outlined red.
+    """
+    with open(filename, 'w') as f:
+        f.write("digraph ParserRuleCondensation {\n")
+        f.write("  rankdir=LR;\n")
+        f.write("  node [shape=box, fillcolor=lightblue, style=filled];\n\n")
+
+        for group in component_scores:
+            label = "\\n".join(group["members"])
+            attributes = f'label="{label}"'
+            if len(group["members"]) > 1:
+                attributes += ", fillcolor=lightcoral"
+            elif group["recursive"]:
+                attributes += ", color=red, penwidth=2"
+            f.write(f'  "g{group["id"]}" [{attributes}];\n')
+
+        f.write("\n")
+        for group in component_scores:
+            for successor in group["successors"]:
+                f.write(f'  "g{group["id"]}" -> "g{successor}";\n')
+
+        f.write("}\n")
+
+    print(f"✅ Condensation DAG saved to {filename}")
+
 def save_problem_scores(problem_scores, filename="problem_scores.json"):
     """Save problem scores to JSON file"""
     with open(filename, 'w') as f:
@@ -280,12 +437,18 @@ if __name__ == "__main__":
     print("Calculating problem scores...")
     problem_scores = calculate_problem_scores(data)
     
+    # Recursive groups and scores on the condensation DAG
+    component_scores = calculate_component_scores(data)
+    
     # Print analysis
     print_problem_analysis(problem_scores)
+    print_recursion_analysis(component_scores)
     
     # Save results
     save_problem_scores(problem_scores, "solidity_grammar_problem_scores.json")
     generate_csv_report(problem_scores, "solidity_grammar_problem_scores.csv")
+    save_problem_scores(component_scores, "solidity_grammar_component_scores.json")
+    export_condensation_to_dot(component_scores, "parser_condensation.dot")
     
     print("\n" + "=" * 100)
     print("ANALYSIS COMPLETE")
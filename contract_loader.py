@@ -0,0 +1,69 @@
+"""
+Compile a contract directory (main.sol + metadata.json) with the solc version
+it was deployed with and return its concrete root contracts.
+"""
+
+import json
+import subprocess
+from collections import defaultdict
+
+from slither.slither import Slither
+
+
+def ensure_solc_version(version):
+    """Ensure the specified Solidity compiler version is installed and active."""
+    try:
+        result = subprocess.run(['solc-select', 'versions'], capture_output=True, text=True)
+        if version not in result.stdout:
+            print(f"Installing Solidity version {version}...")
+            subprocess.run(['solc-select', 'install', version], check=True)
+        
+        subprocess.run(['solc-select', 'use', version], check=True)
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"Error setting up Solidity version {version}: {e}")
+        return False
+
+
+def compiler_version(metadata_path):
+    """Base solc version (e.g. "0.4.24") from an Etherscan metadata.json, or ""."""
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    raw_version = metadata.get("CompilerVersion", "").lstrip("v")
+    return raw_version.split("-")[0].split("+")[0]
+
+
+def is_concrete(contract) -> bool:
+    return (
+        not contract.is_interface
+        and not contract.is_library
+        and not contract.is_abstract
+    )
+
+
+def concrete_root_contracts(src_path: str, metadata_path: str):
+    base_version = compiler_version(metadata_path)
+    if not base_version or not ensure_solc_version(base_version):
+        return False
+
+    sl = Slither(src_path)
+    contracts = list(sl.contracts)
+    by_name = {c.name: c for c in contracts}
+
+    # Compute indegree (number of children inheriting from this contract)
+    indegree = defaultdict(int)
+    for c in contracts:
+        indegree[c.name] = 0
+
+    for derived in contracts:
+        for base in derived.inheritance:
+            if base.name in by_name:
+                indegree[base.name] += 1
+
+    # Count concrete contracts with indegree == 0
+    concrete_roots = [
+        c for c in contracts
+        if is_concrete(c) and indegree[c.name] == 0
+    ]
+
+    return concrete_roots
@@ -0,0 +1,99 @@
+"""
+Corpus deduplication ahead of verification.
+
+Etherscan corpora hold many copies of the same token that differ only in
+comments or formatting. Contract directories (main.sol + metadata.json) are
+grouped by a hash of their normalized source plus compiler version; only the
+first member of each group is verified and its reports are copied to the
+other members with a provenance note.
+"""
+
+import json
+import os
+
+from contract_loader import compiler_version
+from normalize import normalize_source, sha256
+
+
+def source_key(contract_dir):
+    """Dedup key of a contract directory, or None if it has no source/metadata."""
+    src_path = os.path.join(contract_dir, "main.sol")
+    metadata_path = os.path.join(contract_dir, "metadata.json")
+    if not os.path.isfile(src_path) or not os.path.isfile(metadata_path):
+        return None
+    with open(src_path, "r", encoding="utf-8") as f:
+        source = f.read()
+    return sha256(compiler_version(metadata_path) + "\n" + normalize_source(source))
+
+
+def group_contracts(base_dir, entries=None):
+    """
+    {key: [entry, ...]} for the contract directories in base_dir (or only
+    the given entries). Members are sorted; the first one is the representative.
+    """
+    groups = {}
+    for entry in sorted(entries if entries is not None else os.listdir(base_dir)):
+        contract_dir = os.path.join(base_dir, entry)
+        if not os.path.isdir(contract_dir):
+            continue
+        key = source_key(contract_dir)
+        if key is None:
+            continue
+        groups.setdefault(key, []).append(entry)
+    return groups
+
+
+def write_manifest(groups, path):
+    duplicated = {members[0]: members[1:] for members in groups.values() if len(members) > 1}
+    summary = {
+        "contracts": sum(len(members) for members in groups.values()),
+        "groups": len(groups),
+        "duplicates": sum(len(members) - 1 for members in groups.values()),
+        "groups_with_duplicates": duplicated,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(summary, fp, indent=2)
+    print(f"[DEDUP] {summary['contracts']} contracts in {summary['groups']} groups ({summary['duplicates']} duplicates)")
+    return summary
+
+
+def with_provenance(report, representative):
+    note = {
+        "deduplicated_from": representative,
+        "note": "Same normalized source and compiler version as the representative; report copied, not re-verified.",
+    }
+    if isinstance(report, list):
+        return [with_provenance(item, representative) for item in report]
+    if isinstance(report, dict):
+        return dict(report, provenance=note)
+    return report
+
+
+def fan_out(output_dir, representative, members):
+    """
+    Copy every JSON report under output_dir/representative to each member
+    that does not have it yet. Returns the number of files written.
+    """
+    rep_dir = os.path.join(output_dir, representative)
+    if not os.path.isdir(rep_dir):
+        return 0
+
+    reports = {}
+    for f in os.listdir(rep_dir):
+        if f.endswith(".json"):
+            with open(os.path.join(rep_dir, f), "r", encoding="utf-8") as fp:
+                reports[f] = json.load(fp)
+
+    written = 0
+    for member in members:
+        member_dir = os.path.join(output_dir, member)
+        os.makedirs(member_dir, exist_ok=True)
+        for f, report in reports.items():
+            path = os.path.join(member_dir, f)
+            if os.path.isfile(path):
+                continue
+            with open(path, "w", encoding="utf-8") as fp:
+                json.dump(with_provenance(report, representative), fp, indent=2)
+            written += 1
+    return written
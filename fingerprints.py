@@ -0,0 +1,202 @@
+"""
+Known-implementation fingerprints.
+
+Many deployed tokens are copies of reference ERC-20 implementations
+(OpenZeppelin, ConsenSys). For each rule, the code that can affect its
+verdict - the targeted functions (or the declarations of public state
+variables whose getters they are), the functions emitting targeted events,
+and everything they reach through internal calls and modifiers - is hashed
+twice: once as normalized source and once as SlithIR. A reference store maps
+these fingerprints, per rule hash, to a verdict computed once for the
+reference implementation; a contract whose fingerprint matches gets that
+verdict back without running the pipeline.
+
+Build a store entry from a verified reference contract directory:
+    python fingerprints.py NAME dir3/<reference> reports/<reference>
+"""
+
+import json
+import os
+import sys
+
+from slither.core.declarations import Function, Modifier
+from slither.core.variables.state_variable import StateVariable
+from slither.slithir.operations import EventCall
+
+from normalize import normalize_source, sha256
+from static_checks import find_root_function
+
+
+FINGERPRINT_STORE = os.environ.get("SPECGUARD_FINGERPRINTS", os.path.join("fingerprints", "reference_erc20.json"))
+
+VERDICT_FIELDS = ("mode", "result", "reasoning", "evidence", "recommendations")
+
+
+def emitters(contract, event_name):
+    """Non-shadowed functions of contract that emit event_name, directly or through internal calls."""
+    found = []
+    for function in contract.functions:
+        if function.is_shadowed:
+            continue
+        if any(isinstance(ir, EventCall) and str(ir.name) == event_name for ir in function.all_slithir_operations()):
+            found.append(function)
+    return found
+
+
+def find_getter(contract, signature):
+    """The public state variable whose getter has signature, e.g. `uint256 public totalSupply`."""
+    for variable in contract.state_variables:
+        if variable.visibility == "public" and variable.solidity_signature == signature:
+            return variable
+    return None
+
+
+def relevant_code(contract, rule):
+    """
+    Functions, getter state variables, modifiers and events that can affect
+    the rule's verdict on contract, or None if a targeted function is missing
+    (neither implemented nor a public state variable).
+    """
+    signatures = [t["signature"] for t in rule["targets"] if t["kind"] == "function"]
+    signatures += rule["predicates"]["return_value"]
+    for _, sigs in rule["predicates"]["event_emission"]:
+        signatures += sigs
+
+    roots = []
+    getters = []
+    for signature in dict.fromkeys(signatures):
+        function = find_root_function(contract, signature)
+        if function is not None:
+            roots.append(function)
+            continue
+        getter = find_getter(contract, signature)
+        if getter is None:
+            return None
+        getters.append(getter)
+
+    events = []
+    for target in rule["targets"]:
+        if target["kind"] == "event":
+            roots += emitters(contract, target["name"])
+            events += [e for e in contract.events if e.name == target["name"]]
+
+    code = {}
+    stack = list(roots)
+    while stack:
+        function = stack.pop()
+        if function.canonical_name in code:
+            continue
+        code[function.canonical_name] = function
+        for call in function.all_internal_calls():
+            callee = getattr(call, "function", call)
+            if isinstance(callee, Function):
+                stack.append(callee)
+        stack.extend(m for m in function.modifiers if isinstance(m, Modifier))
+    return list(code.values()) + getters + events
+
+
+def slithir_text(function):
+    return "\n".join(str(ir) for node in function.nodes for ir in node.irs)
+
+
+def fingerprint(roots, rule):
+    """{"body": hash, "ir": hash} of the rule-relevant code of all roots, or None."""
+    bodies = []
+    irs = []
+    for contract in roots:
+        code = relevant_code(contract, rule)
+        if not code:
+            return None
+        for elem in code:
+            source = elem.source_mapping.content if elem.source_mapping else ""
+            bodies.append(normalize_source(source))
+            if isinstance(elem, Function):
+                irs.append(elem.solidity_signature + "\n" + slithir_text(elem))
+            elif isinstance(elem, StateVariable):
+                # A getter has no IR of its own: its signature and type decide it.
+                irs.append(f"{elem.solidity_signature} {elem.type}")
+            else:
+                irs.append(elem.full_name)
+    return {"body": sha256("\n".join(sorted(bodies))), "ir": sha256("\n".join(sorted(irs)))}
+
+
+class FingerprintStore:
+    """Reference fingerprints and their verdicts, indexed per rule hash."""
+
+    def __init__(self, path=FINGERPRINT_STORE):
+        self.path = path
+        self.data = {"version": 1, "implementations": {}}
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as fp:
+                self.data = json.load(fp)
+        self.reindex()
+
+    def reindex(self):
+        self.by_body = {}
+        self.by_ir = {}
+        for name, impl in self.data["implementations"].items():
+            for rule_hash, entry in impl["rules"].items():
+                hit = (name, entry)
+                self.by_body[(rule_hash, entry["fingerprint"]["body"])] = hit
+                self.by_ir[(rule_hash, entry["fingerprint"]["ir"])] = hit
+
+    def __len__(self):
+        return len(self.data["implementations"])
+
+    def lookup(self, roots, rule):
+        """Stored report for the rule if the roots match a reference, else None."""
+        if not self.by_body:
+            return None
+        fp = fingerprint(roots, rule)
+        if fp is None:
+            return None
+        hit = self.by_body.get((rule["hash"], fp["body"])) or self.by_ir.get((rule["hash"], fp["ir"]))
+        if hit is None:
+            return None
+        name, entry = hit
+        report = dict(entry["verdict"])
+        report["source"] = f"fingerprint:{name}"
+        return report
+
+    def add(self, name, source, roots, rules, reports_dir):
+        """Record fingerprints and verdicts of a verified reference implementation."""
+        impl = {"source": source, "rules": {}}
+        for rule in rules:
+            report_path = os.path.join(reports_dir, f"{rule['id']}_report.json")
+            fp = fingerprint(roots, rule)
+            if fp is None or not os.path.isfile(report_path):
+                continue
+            with open(report_path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+            if report.get("mode") != "VERIFIED":
+                continue
+            verdict = {key: report[key] for key in VERDICT_FIELDS if key in report}
+            impl["rules"][rule["hash"]] = {"rule_id": rule["id"], "fingerprint": fp, "verdict": verdict}
+        self.data["implementations"][name] = impl
+        self.reindex()
+        return len(impl["rules"])
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as fp:
+            json.dump(self.data, fp, indent=2)
+
+
+if __name__ == "__main__":
+    from contract_loader import concrete_root_contracts
+    from rule_compiler import compile_rules
+
+    if len(sys.argv) != 4:
+        print("usage: python fingerprints.py NAME CONTRACT_DIR REPORTS_DIR")
+        sys.exit(1)
+
+    name, contract_dir, reports_dir = sys.argv[1:]
+    roots = concrete_root_contracts(os.path.join(contract_dir, "main.sol"), os.path.join(contract_dir, "metadata.json"))
+    if not roots:
+        print(f"No concrete contracts compiled from {contract_dir}")
+        sys.exit(1)
+
+    store = FingerprintStore()
+    count = store.add(name, contract_dir, roots, compile_rules(), reports_dir)
+    store.save()
+    print(f"[FINGERPRINT] {name}: {count} rule verdicts stored in {store.path}")
@@ -1,8 +1,16 @@
 import json
 import re
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from markdown_tree_parser.parser import parse_string
-from openai import AzureOpenAI
+from llm_backend import get_backend
+from llm_resilience import with_resilience
+import grammar_query
+from grammar_subgraph import load_adjacency, render, seed_concepts, select_subgraph
+from rule_validator import REPAIR_PROMPT, ConceptMatcher, allowed_names, validate_rule
+from rule_manifest import RESPONSE_CACHE_FILE, ResponseCache, RuleManifest, generation_key, rule_id, sha256, slugify
+import os
+import sys
 import time
 import re
 from pathlib import Path
@@ -69,235 +77,39 @@ def get_section_content(tree, section_name):
 
 
 
-erc_text = """
----
-eip: 20
-title: Token Standard
-author: Fabian Vogelsteller <fabian@ethereum.org>, Vitalik Buterin <vitalik.buterin@ethereum.org>
-type: Standards Track
-category: ERC
-status: Final
-created: 2015-11-19
----
-
-## Simple Summary
-
-A standard interface for tokens.
-
-
-## Abstract
-
-The following standard allows for the implementation of a standard API for tokens within smart contracts.
-This standard provides basic functionality to transfer tokens, as well as allow tokens to be approved so they can be spent by another on-chain third party.
-
-
-## Motivation
-
-A standard interface allows any tokens on Ethereum to be re-used by other applications: from wallets to decentralized exchanges.
-
-## Specification
-
-### Methods
-
-**NOTES**:
- - The following specifications use syntax from Solidity `0.4.17` (or above)
- - Callers MUST handle `false` from `returns (bool success)`.  Callers MUST NOT assume that `false` is never returned!
-
-
-#### name
-
-Returns the name of the token - e.g. `"MyToken"`.
-
-OPTIONAL - This method can be used to improve usability,
-but interfaces and other contracts MUST NOT expect these values to be present.
-
-
-``` js
-function name() public view returns (string)
-```
-
-
-#### symbol
-
-Returns the symbol of the token. E.g. "HIX".
-
-OPTIONAL - This method can be used to improve usability,
-but interfaces and other contracts MUST NOT expect these values to be present.
-
-``` js
-function symbol() public view returns (string)
-```
-
-
-
-#### decimals
-
-Returns the number of decimals the token uses - e.g. `8`, means to divide the token amount by `100000000` to get its user representation.
-
-OPTIONAL - This method can be used to improve usability,
-but interfaces and other contracts MUST NOT expect these values to be present.
-
-``` js
-function decimals() public view returns (uint8)
-```
-
-
-#### totalSupply
-
-Returns the total token supply.
-
-``` js
-function totalSupply() public view returns (uint256)
-```
-
-
-
-#### balanceOf
-
-Returns the account balance of another account with address `_owner`.
-
-``` js
-function balanceOf(address _owner) public view returns (uint256 balance)
-```
-
-
-
-#### transfer
-
-Transfers `_value` amount of tokens to address `_to`, and MUST fire the `Transfer` event.
-The function SHOULD `throw` if the message caller's account balance does not have enough tokens to spend.
-
-*Note* Transfers of 0 values MUST be treated as normal transfers and fire the `Transfer` event.
-
-``` js
-function transfer(address _to, uint256 _value) public returns (bool success)
-```
-
-
-
-#### transferFrom
-
-Transfers `_value` amount of tokens from address `_from` to address `_to`, and MUST fire the `Transfer` event.
-
-The `transferFrom` method is used for a withdraw workflow, allowing contracts to transfer tokens on your behalf.
-This can be used for example to allow a contract to transfer tokens on your behalf and/or to charge fees in sub-currencies.
-The function SHOULD `throw` unless the `_from` account has deliberately authorized the sender of the message via some mechanism.
-
-*Note* Transfers of 0 values MUST be treated as normal transfers and fire the `Transfer` event.
-
-``` js
-function transferFrom(address _from, address _to, uint256 _value) public returns (bool success)
-```
-
-
-
-#### approve
-
-Allows `_spender` to withdraw from your account multiple times, up to the `_value` amount. If this function is called again it overwrites the current allowance with `_value`.
-
-**NOTE**: To prevent attack vectors like the one [described here](https://docs.google.com/document/d/1YLPtQxZu1UAvO9cZ1O2RPXBbT0mooh4DYKjA_jp-RLM/) and discussed [here](https://github.com/ethereum/EIPs/issues/20#issuecomment-263524729),
-clients SHOULD make sure to create user interfaces in such a way that they set the allowance first to `0` before setting it to another value for the same spender.
-THOUGH The contract itself shouldn't enforce it, to allow backwards compatibility with contracts deployed before
-
-``` js
-function approve(address _spender, uint256 _value) public returns (bool success)
-```
-
-
-#### allowance
-
-Returns the amount which `_spender` is still allowed to withdraw from `_owner`.
+FRONT_MATTER_RE = re.compile(r"\A\s*(---\n.*?\n---)\n", re.DOTALL)
 
-``` js
-function allowance(address _owner, address _spender) public view returns (uint256 remaining)
-```
-
-
-
-### Events
-
-
-#### Transfer
-
-MUST trigger when tokens are transferred, including zero value transfers.
-
-A token contract which creates new tokens SHOULD trigger a Transfer event with the `_from` address set to `0x0` when tokens are created.
-
-``` js
-event Transfer(address indexed _from, address indexed _to, uint256 _value)
-```
-
-
-
-#### Approval
-
-MUST trigger on any successful call to `approve(address _spender, uint256 _value)`.
-
-``` js
-event Approval(address indexed _owner, address indexed _spender, uint256 _value)
-```
-
-
-
-## Implementation
-
-There are already plenty of ERC20-compliant tokens deployed on the Ethereum network.
-Different implementations have been written by various teams that have different trade-offs: from gas saving to improved security.
-
-Example implementations are available at
-- [OpenZeppelin implementation](../assets/eip-20/OpenZeppelin-ERC20.sol)
-- [ConsenSys implementation](../assets/eip-20/Consensys-EIP20.sol)
-
-
-## History
-
-Historical links related to this standard:
-
-- Original proposal from Vitalik Buterin: https://github.com/ethereum/wiki/wiki/Standardized_Contract_APIs/499c882f3ec123537fc2fccd57eaa29e6032fe4a
-- Reddit discussion: https://www.reddit.com/r/ethereum/comments/3n8fkn/lets_talk_about_the_coin_standard/
-- Original Issue #20: https://github.com/ethereum/EIPs/issues/20
-
-
-
-## Copyright
-Copyright and related rights waived via [CC0](../LICENSE.md).
-"""
-
-tree = parse_string(erc_text)
-
-preamble = """
----
-eip: 20
-title: Token Standard
-author: Fabian Vogelsteller <fabian@ethereum.org>, Vitalik Buterin <vitalik.buterin@ethereum.org>
-type: Standards Track
-category: ERC
-status: Final
-created: 2015-11-19
----
-"""
-abstract_content = get_section_content(tree, "Abstract")
-motivation_content = get_section_content(tree, "Motivation")
 
+def load_standard(spec_file):
+    """
+    Parse one EIP markdown file into its rule namespace ("erc<eip>", or the
+    file name), context prefix (front matter, Abstract, Motivation) and the
+    paths of its Specification section. Returns None without a Specification.
+    """
+    with open(spec_file, "r", encoding="utf-8") as f:
+        text = f.read()
 
-specification_section = None
-for section in tree:
-    if section.text == "Specification":
-        specification_section = section
-        break
+    match = FRONT_MATTER_RE.match(text)
+    preamble = f"\n{match.group(1)}\n" if match else ""
+    eip = re.search(r"^eip:\s*(\d+)\s*$", preamble, re.M)
+    name = f"erc{eip.group(1)}" if eip else slugify(Path(spec_file).stem)
 
-if not specification_section:
-    print("ERROR: Specification section not found!")
-    exit(1)
+    tree = parse_string(text)
+    abstract_content = get_section_content(tree, "Abstract")
+    motivation_content = get_section_content(tree, "Motivation")
 
-# Get all paths from Specification section
-paths = get_all_paths(specification_section)
+    specification_section = None
+    for section in tree:
+        if section.text == "Specification":
+            specification_section = section
+            break
 
+    if not specification_section:
+        print(f"ERROR: Specification section not found in {spec_file}!")
+        return None
 
-# ------------------------------------------------------------
-# 5. Create context prefix (Abstract + Motivation)
-# ------------------------------------------------------------
-context_prefix = f"""{preamble}
+    # Create context prefix (Abstract + Motivation)
+    context_prefix = f"""{preamble}
 
 {abstract_content}
 
@@ -305,6 +117,14 @@ context_prefix = f"""{preamble}
 
 ---
 """
+    return {
+        "name": name,
+        "file": spec_file,
+        "context_prefix": context_prefix,
+        # Get all paths from Specification section
+        "paths": get_all_paths(specification_section),
+    }
+
 
 AZURE_OPENAI_API_KEY = ""
 AZURE_OPENAI_ENDPOINT = ""
@@ -312,6 +132,8 @@ AZURE_OPENAI_API_VERSION = "2024-12-01-preview"
 AZURE_OPENAI_DEPLOYMENT = "gpt-4o"
 MAX_TOKENS = "16384"
 TEMP = "0.0"
+# Pause between LLM calls to stay under the endpoint's rate limit (0 for the mock server).
+REQUEST_DELAY = float(os.environ.get("SPECGUARD_REQUEST_DELAY", "10"))
 
 SYSTEM_PROMPT = """ 
 You are an assistant that specializes in translating natural-language technical specifications into structured, implementation-oriented intermediate representations.
@@ -320,18 +142,14 @@ Your goal is to preserve the semantics of the specification while making control
 
 You operate under externally supplied constraints that define the allowed representation vocabulary and output format.
 """
-client = AzureOpenAI(azure_endpoint=AZURE_OPENAI_ENDPOINT,api_key=AZURE_OPENAI_API_KEY,api_version=AZURE_OPENAI_API_VERSION)
-
-with open("components.json", "r", encoding="utf-8") as f:
-    grammar = f.read()
+backend = with_resilience(get_backend(AZURE_OPENAI_DEPLOYMENT,azure_endpoint=AZURE_OPENAI_ENDPOINT,api_key=AZURE_OPENAI_API_KEY,api_version=AZURE_OPENAI_API_VERSION,max_tokens=int(MAX_TOKENS),temperature=float(TEMP)))
 
-count = 0
-for path in paths:
-    full_content = context_prefix + path
-    instruction_prompt = f"""
+# Static instructions come first and the spec path last, so every request
+# shares the instructions + grammar + context prefix and providers can cache it.
+INSTRUCTION_PROMPT = """
     You are given:
-    1) A natural-language requirement/specification snippet (“Spec”).
-    2) A JSON file that represents an adjacency list of grammar concepts (“GrammarGraphJSON”). It lists nonterminals (keys) and the concepts they can expand to (values).
+    1) A JSON file that represents an adjacency list of grammar concepts (“GrammarGraphJSON”). It lists nonterminals (keys) and the concepts they can expand to (values).
+    2) A natural-language requirement/specification snippet (“Spec”): the standard's context followed by one path through its Specification section.
 
     Your task:
     Convert the Spec into an implementation-oriented intermediate representation (IR) that is:
@@ -369,29 +187,276 @@ for path in paths:
     Now do the task.
 
     Inputs:
-    Spec:
-    <<<
-    {full_content}
-    >>>
+"""
 
+GRAMMAR_BLOCK = """
     GrammarGraphJSON:
     <<<
     {grammar}
     >>>
-    """
-    messages = [{"role": "system", "content": SYSTEM_PROMPT},{"role": "user","content": instruction_prompt}]
+"""
+
+CONTEXT_BLOCK = """
+    Spec (context):
+    <<<
+    {context}
+    >>>
+"""
 
-    response = client.chat.completions.create(model=AZURE_OPENAI_DEPLOYMENT,messages=messages,max_tokens=int(MAX_TOKENS),temperature=float(TEMP))
+PATH_BLOCK = """
+    Spec (path):
+    <<<
+    {path}
+    >>>
+"""
 
-    response_text = response.choices[0].message.content
+# Parallel generation requests (1 keeps the original one-at-a-time behaviour).
+GEN_WORKERS = int(os.environ.get("SPECGUARD_GEN_WORKERS", "1"))
+# Each standard's rules go to RULES_ROOT/<namespace>/, e.g. Rules/erc20/.
+RULES_ROOT = "Rules"
+# The namespace verifier.py reads (rule_compiler.RULES_DIR, not imported here
+# because it needs Slither) and where it writes reports; renaming its numbered
+# rules to ids also renames their reports.
+VERIFIER_RULES_DIR = os.environ.get("SPECGUARD_RULES_DIR", os.path.join(RULES_ROOT, "erc20"))
+REPORTS_DIR = "reports"
+SPEC_DIR = sys.argv[1] if len(sys.argv) > 1 else "specs"
+
+# Regeneration attempts for a rule that fails rule_validator.validate_rule.
+GEN_REPAIRS = int(os.environ.get("SPECGUARD_GEN_REPAIRS", "2"))
+
+# SPECGUARD_GRAMMAR_HOPS=k sends only the k-hop grammar neighbourhood of the
+# concepts in the schema and the spec path (see grammar_subgraph.py), capped
+# at SPECGUARD_GRAMMAR_BUDGET tokens. Unset sends the whole grammar.
+GRAMMAR_HOPS = os.environ.get("SPECGUARD_GRAMMAR_HOPS", "")
+GRAMMAR_BUDGET = int(os.environ.get("SPECGUARD_GRAMMAR_BUDGET", "0")) or None
+# SPECGUARD_GRAMMAR_BENCHMARK=1 generates every path with both payloads and
+# writes reports/grammar_subgraph_benchmark.json instead of Rules/.
+GRAMMAR_BENCHMARK = os.environ.get("SPECGUARD_GRAMMAR_BENCHMARK", "0") == "1"
+
+# Loaded once and shared by every standard.
+with open("components.json", "r", encoding="utf-8") as f:
+    grammar = f.read()
 
-    yaml_text = extract_yaml_from_response(response_text)
+adjacency = load_adjacency()
+# Precomputed distances for the per-path grammar neighbourhood, shared with the validator.
+grammar_index = grammar_query.index()
+# Validates generated rules against the grammar actually sent (GrammarGraphJSON).
+matcher = ConceptMatcher(json.loads(grammar))
+
+# Responses keyed by model and messages, shared by every standard and run.
+response_cache = ResponseCache(os.path.join(RULES_ROOT, RESPONSE_CACHE_FILE))
+
+standards = []
+for spec_file in sorted(Path(SPEC_DIR).glob("*.md")):
+    standard = load_standard(spec_file)
+    if standard is None:
+        continue
+    standard["rules_dir"] = os.path.join(RULES_ROOT, standard["name"])
+    # Names the spec itself uses (totalSupply, ...) are not invented concepts.
+    standard["allowed"] = allowed_names(standard["context_prefix"] + "\n".join(standard["paths"]))
+    # Identical for every path of the standard; rendered once.
+    standard["prompt_prefix"] = INSTRUCTION_PROMPT + GRAMMAR_BLOCK.format(grammar=grammar) + CONTEXT_BLOCK.format(context=standard["context_prefix"])
+    # With a per-path grammar only the instructions and context can be shared.
+    standard["subgraph_prefix"] = INSTRUCTION_PROMPT + CONTEXT_BLOCK.format(context=standard["context_prefix"])
+    standards.append(standard)
+
+if not standards:
+    print(f"ERROR: no specification found in {SPEC_DIR}!")
+    exit(1)
+for standard in standards:
+    print(f"[GEN] {standard['name']}: {len(standard['paths'])} paths from {standard['file']}")
 
-    print(yaml_text)
 
-    save_yaml(yaml_text,"Rules/"+str(count)+".yaml")
+def build_messages(standard, path, hops=None):
+    if hops is None:
+        content = standard["prompt_prefix"] + PATH_BLOCK.format(path=path)
+    else:
+        seeds = seed_concepts(adjacency, INSTRUCTION_PROMPT, path)
+        subgraph = select_subgraph(adjacency, seeds, hops, GRAMMAR_BUDGET, grammar_index)
+        content = standard["subgraph_prefix"] + GRAMMAR_BLOCK.format(grammar=render(subgraph)) + PATH_BLOCK.format(path=path)
+    return [{"role": "system", "content": SYSTEM_PROMPT},{"role": "user","content": content}]
 
-    count = count+1
 
-    time.sleep(10)
+def cached_chat(messages, use_cache=True):
+    """
+    Response text for messages, from the shared response cache when possible.
+    Returns (text, cached). Responses are only cached once they validate
+    (see generate_rule), so an invalid rule is asked for again on the next run.
+    """
+    response_text = response_cache.get(AZURE_OPENAI_DEPLOYMENT, messages) if use_cache else None
+    if response_text is not None:
+        return response_text, True
+    return backend.chat(messages), False
+
+
+def validation_errors(standard, response_text):
+    try:
+        yaml_text = extract_yaml_from_response(response_text)
+    except ValueError as e:
+        return None, [str(e)]
+    return yaml_text, validate_rule(yaml_text, matcher, standard["allowed"])["errors"]
 
+
+def generate_rule(standard, rid, key, index, path, use_cache=True):
+    """
+    Generate the rule for one spec path and write it to
+    Rules/<namespace>/<rid>.yaml as soon as it completes. The id comes from the
+    path itself (rule_manifest.py), so file names depend neither on completion
+    order nor on the path's position. A rule that fails validation is asked
+    for again with its errors, up to GEN_REPAIRS times. use_cache=False
+    bypasses cached responses (for rules already known to be invalid).
+    """
+    messages = build_messages(standard, path, int(GRAMMAR_HOPS) if GRAMMAR_HOPS else None)
+    response_text, cached = cached_chat(messages, use_cache)
+    yaml_text, errors = validation_errors(standard, response_text)
+
+    attempt = 0
+    while errors and attempt < GEN_REPAIRS:
+        attempt += 1
+        print(f"[VALIDATE] {standard['name']}/{rid} attempt {attempt}: {'; '.join(errors)}")
+        messages = messages + [
+            {"role": "assistant", "content": response_text},
+            {"role": "user", "content": REPAIR_PROMPT.format(errors="; ".join(errors))},
+        ]
+        response_text, repair_cached = cached_chat(messages, use_cache)
+        cached = cached and repair_cached
+        yaml_text, errors = validation_errors(standard, response_text)
+
+    if yaml_text is None:
+        raise ValueError("; ".join(errors))
+    if errors:
+        # Kept so the verifier has a rule; it is not cached, so the next
+        # run asks the model again instead of replaying this response.
+        print(f"[VALIDATE] {standard['name']}/{rid} still invalid: {'; '.join(errors)}")
+    elif not cached:
+        response_cache.put(AZURE_OPENAI_DEPLOYMENT, messages, response_text)
+
+    manifest = standard["manifest"]
+    out_path = manifest.file_for(rid)
+    save_yaml(yaml_text, out_path)
+    manifest.record(rid, key, path, index)
+
+    # Per-worker pacing; the resilience layer handles 429s on top of it.
+    if not cached:
+        time.sleep(REQUEST_DELAY)
+    return out_path, yaml_text
+
+
+def rule_is_valid(standard, rid):
+    with open(standard["manifest"].file_for(rid), "r", encoding="utf-8") as f:
+        return not validate_rule(f.read(), matcher, standard["allowed"])["errors"]
+
+
+def benchmark_path(standard, index, path, hops):
+    """Prompt size, latency and validity of one path with the full grammar and the subgraph."""
+    row = {"standard": standard["name"], "path": index}
+    for variant, variant_hops in (("full", None), ("subgraph", hops)):
+        messages = build_messages(standard, path, variant_hops)
+        completion = backend.complete(messages)
+        try:
+            errors = validate_rule(extract_yaml_from_response(completion.text), matcher, standard["allowed"])["errors"]
+        except ValueError as e:
+            errors = [str(e)]
+        row[variant] = {
+            "prompt_chars": len(messages[1]["content"]),
+            "prompt_tokens": completion.usage.get("prompt_tokens", 0),
+            "latency": round(completion.latency, 3),
+            "valid": not errors,
+            "errors": errors,
+        }
+        time.sleep(REQUEST_DELAY)
+    return row
+
+
+def benchmark_summary(rows, hops):
+    summary = {"paths": len(rows), "hops": hops, "budget": GRAMMAR_BUDGET}
+    for variant in ("full", "subgraph"):
+        cells = [row[variant] for row in rows]
+        summary[variant] = {
+            "mean_prompt_chars": round(sum(c["prompt_chars"] for c in cells) / len(cells), 1),
+            "mean_prompt_tokens": round(sum(c["prompt_tokens"] for c in cells) / len(cells), 1),
+            "mean_latency": round(sum(c["latency"] for c in cells) / len(cells), 3),
+            "valid_rate": round(sum(c["valid"] for c in cells) / len(cells), 3),
+        }
+    return summary
+
+
+if GRAMMAR_BENCHMARK:
+    hops = int(GRAMMAR_HOPS or "1")
+    items = [(standard, index, path) for standard in standards for index, path in enumerate(standard["paths"])]
+    with ThreadPoolExecutor(max_workers=max(GEN_WORKERS, 1)) as executor:
+        rows = list(executor.map(lambda item: benchmark_path(*item, hops), items))
+    summary = benchmark_summary(rows, hops)
+    os.makedirs("reports", exist_ok=True)
+    with open(os.path.join("reports", "grammar_subgraph_benchmark.json"), "w", encoding="utf-8") as fp:
+        json.dump({"summary": summary, "paths": rows}, fp, indent=2)
+    print(f"[GRAMMAR] {json.dumps(summary)}")
+    exit(0)
+
+
+# Everything besides the path text and spec context that shapes a generated
+# rule: a change in any of these regenerates every rule, a changed path only its own.
+if GRAMMAR_HOPS:
+    grammar_identity = f"subgraph:{GRAMMAR_HOPS}:{GRAMMAR_BUDGET}:{sha256(json.dumps(adjacency))}"
+else:
+    grammar_identity = "full:" + sha256(grammar)
+prompt_version = sha256(SYSTEM_PROMPT + INSTRUCTION_PROMPT + GRAMMAR_BLOCK + CONTEXT_BLOCK + PATH_BLOCK)
+
+jobs = []
+for standard in standards:
+    verified = os.path.normpath(standard["rules_dir"]) == os.path.normpath(VERIFIER_RULES_DIR)
+    manifest = standard["manifest"] = RuleManifest(standard["rules_dir"], REPORTS_DIR if verified else None)
+    paths = standard["paths"]
+    pending = []
+    invalid = 0
+    for index, path in enumerate(paths):
+        rid = rule_id(path)
+        key = generation_key(path, standard["context_prefix"], grammar_identity, prompt_version, AZURE_OPENAI_DEPLOYMENT)
+        if manifest.is_current(rid, key) or manifest.adopt_legacy(rid, key, path, index):
+            # Up-to-date rules are regenerated only if they fail validation,
+            # without replaying the cached responses that produced them.
+            if rule_is_valid(standard, rid):
+                continue
+            invalid += 1
+            pending.append((standard, rid, key, index, path, False))
+            continue
+        pending.append((standard, rid, key, index, path))
+    print(f"[GEN] {standard['name']}: {len(paths) - len(pending)} up to date, {invalid} invalid, {len(pending)} to generate")
+    jobs += pending
+
+# All standards share one pool, so a small standard does not wait for a large one.
+failed = []
+if GEN_WORKERS <= 1:
+    for job in jobs:
+        rid = f"{job[0]['name']}/{job[1]}"
+        try:
+            out_path, yaml_text = generate_rule(*job)
+        except Exception as e:
+            failed.append(rid)
+            print(f"[GEN] {rid} failed: {e}")
+            continue
+        print(f"[GEN] {rid} -> {out_path}")
+        print(yaml_text)
+else:
+    print(f"[GEN] {len(jobs)} paths with {GEN_WORKERS} workers")
+    with ThreadPoolExecutor(max_workers=GEN_WORKERS) as executor:
+        futures = {executor.submit(generate_rule, *job): f"{job[0]['name']}/{job[1]}" for job in jobs}
+        for future in as_completed(futures):
+            rid = futures[future]
+            try:
+                out_path, yaml_text = future.result()
+            except Exception as e:
+                failed.append(rid)
+                print(f"[GEN] {rid} failed: {e}")
+                continue
+            print(f"[GEN] {rid} -> {out_path}")
+            print(yaml_text)
+
+for standard in standards:
+    removed = standard["manifest"].prune([rule_id(path) for path in standard["paths"]])
+    if removed:
+        print(f"[GEN] {standard['name']}: removed {len(removed)} rules whose spec path is gone: {removed}")
+if failed:
+    print(f"[GEN] {len(failed)} paths failed: {sorted(failed)}")
+print(f"[GEN] response cache: {json.dumps(response_cache.summary())}")
+print(f"[LLM] {backend.name}: {json.dumps(backend.summary())}")
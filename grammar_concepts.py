@@ -0,0 +1,187 @@
+"""
+Grammar-concept tags for slice elements and rule-directed slice pruning.
+
+Rules are written in terms of Solidity grammar concepts from Rule_Dep's
+graph (emitStatement, returnStatement, revertStatement,
+stateVariableDeclaration, ...). Each slice element is tagged with the
+concepts it contains, read off its SlithIR operations and CFG nodes, and
+prune_slice() drops the elements that find_slice pulled in transitively
+(callers, other readers of the same state) but that cannot contribute to
+the concepts the rule mentions.
+
+Only concepts that separate one function from another are tagged; generic
+ones (functionDefinition, block, expression, ...) say nothing about
+relevance and never restrict a slice.
+"""
+
+from slither.core.cfg.node import NodeType
+from slither.core.declarations import Event, Function, Modifier
+from slither.core.solidity_types import MappingType
+from slither.core.variables.state_variable import StateVariable
+from slither.slithir.operations import EventCall, HighLevelCall, LowLevelCall, Return, SolidityCall
+
+
+# Concepts the tagger can produce. All are parser rules of
+# Rule_Dep/parser_adjacency_list.json.
+TAGGED_CONCEPTS = (
+    "emitStatement",
+    "returnStatement",
+    "revertStatement",
+    "ifStatement",
+    "forStatement",
+    "whileStatement",
+    "tryStatement",
+    "catchClause",
+    "assemblyStatement",
+    "modifierInvocation",
+    "callArgumentList",
+    "stateVariableDeclaration",
+    "constantVariableDeclaration",
+    "mappingType",
+    "eventDefinition",
+)
+
+NODE_CONCEPTS = {
+    NodeType.RETURN: ("returnStatement",),
+    NodeType.THROW: ("revertStatement",),
+    NodeType.IF: ("ifStatement",),
+    # SlithIR does not tell for from while loops apart.
+    NodeType.STARTLOOP: ("forStatement", "whileStatement"),
+    NodeType.ASSEMBLY: ("assemblyStatement",),
+    NodeType.TRY: ("tryStatement",),
+    NodeType.CATCH: ("catchClause",),
+}
+
+# Concepts through which code outside a seed's own call can still matter.
+STATE_CONCEPTS = {"stateVariableDeclaration", "mappingType"}
+EVENT_CONCEPTS = {"emitStatement", "eventDefinition"}
+
+# Sections whose wording is not a requirement on the code.
+IGNORED_SECTIONS = ("gaps",)
+
+
+def function_concepts(function):
+    concepts = set()
+    for node in function.nodes:
+        concepts.update(NODE_CONCEPTS.get(node.type, ()))
+        for ir in node.irs:
+            if isinstance(ir, EventCall):
+                concepts.add("emitStatement")
+            elif isinstance(ir, Return):
+                concepts.add("returnStatement")
+            elif isinstance(ir, SolidityCall):
+                # require/assert are how most tokens express revert conditions,
+                # and rules use revertStatement for them.
+                if ir.function.name.startswith(("revert", "require", "assert")):
+                    concepts.add("revertStatement")
+            elif isinstance(ir, (HighLevelCall, LowLevelCall)):
+                concepts.add("callArgumentList")
+    if function.modifiers:
+        concepts.add("modifierInvocation")
+    if function.state_variables_written:
+        # Rules describe state effects through stateVariableDeclaration.
+        concepts.add("stateVariableDeclaration")
+    return concepts
+
+
+def element_concepts(elem):
+    """Grammar concepts contained in a function, modifier, state variable or event."""
+    if isinstance(elem, Function):
+        return frozenset(function_concepts(elem))
+    if isinstance(elem, StateVariable):
+        concepts = {"constantVariableDeclaration" if elem.is_constant else "stateVariableDeclaration"}
+        if isinstance(elem.type, MappingType):
+            concepts.add("mappingType")
+        return frozenset(concepts)
+    if isinstance(elem, Event):
+        return frozenset(("eventDefinition",))
+    return frozenset()
+
+
+def rule_concepts(sections):
+    """Tagged concepts a rule (its parsed IR sections) mentions."""
+    text = "\n".join("\n".join(items) for name, items in sections.items() if name not in IGNORED_SECTIONS)
+    return [concept for concept in TAGGED_CONCEPTS if concept in text]
+
+
+def dependencies(function):
+    """Callees (internal and library) and modifiers: code whose behaviour is part of function's own."""
+    deps = [getattr(call, "function", call) for call in function.all_internal_calls()]
+    deps += [call.function for call in function.all_library_calls()]
+    deps += [m for m in function.modifiers if isinstance(m, Modifier)]
+    return [dep for dep in deps if isinstance(dep, Function)]
+
+
+def emitted_events(function):
+    return {str(ir.name) for ir in function.all_slithir_operations() if isinstance(ir, EventCall)}
+
+
+def closure(elems, slices):
+    """elems plus every sliced function they reach through internal calls and modifiers."""
+    reached = set()
+    stack = list(elems)
+    while stack:
+        elem = stack.pop()
+        if elem in reached:
+            continue
+        reached.add(elem)
+        if isinstance(elem, Function):
+            stack.extend(dep for dep in dependencies(elem) if dep in slices)
+    return reached
+
+
+def contributes(function, concepts, core_reads, event_names):
+    """
+    Whether a sliced function outside the seeds' call closure can affect what
+    the rule checks. Such a function does not run during a seed call, so
+    control-flow concepts (return, revert, if, loops) in it are irrelevant;
+    it matters only through state the seeds read or events the rule names.
+    """
+    tags = element_concepts(function)
+    if concepts & STATE_CONCEPTS and "stateVariableDeclaration" in tags:
+        if core_reads & set(function.state_variables_written):
+            return True
+    if concepts & EVENT_CONCEPTS and "emitStatement" in tags:
+        if event_names & emitted_events(function):
+            return True
+    return False
+
+
+def prune_slice(slices, seeds, concepts, event_names=()):
+    """
+    Drop the elements find_slice pulled in that cannot contribute to the
+    concepts a rule mentions. The seeds and everything they reach through
+    internal calls and modifiers are always kept; other functions (callers,
+    readers and writers of the same state) only if contributes(); state
+    variables and events only if a kept function uses them.
+    Returns slices unchanged if the rule mentions no tagged concept.
+    """
+    concepts = set(concepts)
+    if not concepts:
+        return slices
+    event_names = set(event_names) | {elem.name for elem in seeds if isinstance(elem, Event)}
+
+    core = closure([elem for elem in seeds if elem in slices], slices)
+    core_reads = set(core) & set(slices)
+    for function in core:
+        if isinstance(function, Function):
+            core_reads.update(function.state_variables_read)
+
+    extra = [elem for elem in slices if isinstance(elem, Function) and elem not in core
+             and contributes(elem, concepts, core_reads, event_names)]
+    kept = core | closure(extra, slices)
+
+    used_vars = set()
+    emitted = set()
+    for function in kept:
+        if isinstance(function, Function):
+            used_vars.update(function.state_variables_read)
+            used_vars.update(function.state_variables_written)
+            emitted |= emitted_events(function)
+
+    for elem in slices:
+        if isinstance(elem, StateVariable) and elem in used_vars:
+            kept.add(elem)
+        elif isinstance(elem, Event) and elem.name in emitted:
+            kept.add(elem)
+    return {elem for elem in slices if elem in kept}
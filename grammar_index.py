@@ -0,0 +1,198 @@
+"""
+Precomputed reachability and distance tables over Rule_Dep's grammar graph.
+
+complete_dependencies.json is a dict of lists, so every question about it
+("can emitStatement appear under functionDefinition?", "how far is
+revertStatement from the seeds?") used to be a fresh traversal. build_index()
+turns it once into a CSR graph over parser rules and lexer tokens, with
+- closure: transitive-closure bitsets, one packed row per node, where bit j
+  of row i says node j is reachable from node i in one or more steps;
+- distance: all-pairs shortest distances along dependency edges;
+- parser_undirected: shortest distances between parser rules ignoring edge
+  direction (the neighbourhood grammar_subgraph.py selects from).
+The tables are saved to Rule_Dep/grammar_index.npz together with a hash of
+the source JSON and rebuilt by load_index() whenever the JSON changes.
+
+    python grammar_index.py
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+DEPENDENCIES_PATH = os.path.join("Rule_Dep", "complete_dependencies.json")
+INDEX_PATH = os.path.join("Rule_Dep", "grammar_index.npz")
+INDEX_VERSION = 1
+
+UNREACHABLE = np.iinfo(np.uint16).max
+
+
+def source_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def to_csr(graph):
+    """
+    (nodes, n_parser, indptr, indices): parser rules first in graph order,
+    then lexer tokens in order of first use; the dependencies of node i are
+    indices[indptr[i]:indptr[i + 1]].
+    """
+    nodes = list(graph)
+    n_parser = len(nodes)
+    position = {node: i for i, node in enumerate(nodes)}
+    for deps in graph.values():
+        for token in deps.get("lexer_tokens", []):
+            if token not in position:
+                position[token] = len(nodes)
+                nodes.append(token)
+
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int32)
+    indices = []
+    for i, deps in enumerate(graph.values()):
+        targets = dict.fromkeys(position[dep] for dep in deps.get("parser_rules", []) if dep in position)
+        targets.update(dict.fromkeys(position[token] for token in deps.get("lexer_tokens", [])))
+        indices.extend(targets)
+        indptr[i + 1] = len(indices)
+    # Lexer tokens have no dependencies.
+    indptr[n_parser + 1:] = len(indices)
+    return nodes, n_parser, indptr, np.array(indices, dtype=np.int32)
+
+
+def dense(indptr, indices, n):
+    adjacency = np.zeros((n, n), dtype=bool)
+    rows = np.repeat(np.arange(n), np.diff(indptr[:n + 1]))
+    adjacency[rows, indices] = True
+    return adjacency
+
+
+def all_pairs(adjacency):
+    """
+    (distance, closure) by breadth-first search from every node at once: each
+    level expands the current frontier of all sources with one boolean
+    matrix product.
+    """
+    n = len(adjacency)
+    step = adjacency.astype(np.int32)
+    distance = np.full((n, n), UNREACHABLE, dtype=np.uint16)
+    np.fill_diagonal(distance, 0)
+    reached = np.eye(n, dtype=bool)
+    closure = np.zeros((n, n), dtype=bool)
+    frontier = reached.copy()
+    level = 0
+    while frontier.any():
+        level += 1
+        successors = (frontier.astype(np.int32) @ step) > 0
+        closure |= successors
+        frontier = successors & ~reached
+        distance[frontier] = level
+        reached |= frontier
+    return distance, closure
+
+
+def build_index(dependencies_path=DEPENDENCIES_PATH):
+    with open(dependencies_path, "r", encoding="utf-8") as f:
+        graph = json.load(f)
+    nodes, n_parser, indptr, indices = to_csr(graph)
+    adjacency = dense(indptr, indices, len(nodes))
+    distance, closure = all_pairs(adjacency)
+    parser = adjacency[:n_parser, :n_parser]
+    parser_undirected, _ = all_pairs(parser | parser.T)
+    return {
+        "version": np.array(INDEX_VERSION),
+        "source_hash": np.array(source_hash(dependencies_path)),
+        "nodes": np.array(nodes),
+        "n_parser": np.array(n_parser),
+        "indptr": indptr,
+        "indices": indices,
+        "closure": np.packbits(closure, axis=1),
+        "distance": distance,
+        "parser_undirected": parser_undirected,
+    }
+
+
+def save_index(tables, path=INDEX_PATH):
+    np.savez_compressed(path, **tables)
+
+
+class GrammarIndex:
+    """Array lookups over the tables of build_index()."""
+
+    def __init__(self, tables):
+        self.nodes = [str(node) for node in tables["nodes"]]
+        self.position = {node: i for i, node in enumerate(self.nodes)}
+        self.n_parser = int(tables["n_parser"])
+        self.indptr = tables["indptr"]
+        self.indices = tables["indices"]
+        self.closure = tables["closure"]
+        self.distance_table = tables["distance"]
+        self.parser_undirected = tables["parser_undirected"]
+
+    def __contains__(self, name):
+        return name in self.position
+
+    def is_parser_rule(self, name):
+        return self.position.get(name, self.n_parser) < self.n_parser
+
+    def parser_rules(self):
+        return self.nodes[:self.n_parser]
+
+    def successors(self, name):
+        i = self.position[name]
+        return [self.nodes[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def reachable(self, source, target):
+        """Whether target can appear (transitively) under source."""
+        i, j = self.position[source], self.position[target]
+        return bool(self.closure[i, j >> 3] & (0x80 >> (j & 7)))
+
+    def descendant_mask(self, name):
+        return np.unpackbits(self.closure[self.position[name]], count=len(self.nodes)).astype(bool)
+
+    def ancestor_mask(self, name):
+        j = self.position[name]
+        return (self.closure[:, j >> 3] & (0x80 >> (j & 7))) != 0
+
+    def descendants(self, name):
+        return [self.nodes[j] for j in np.flatnonzero(self.descendant_mask(name))]
+
+    def ancestors(self, name):
+        return [self.nodes[i] for i in np.flatnonzero(self.ancestor_mask(name))]
+
+    def distance(self, source, target):
+        """Fewest dependency edges from source to target, or None."""
+        d = self.distance_table[self.position[source], self.position[target]]
+        return None if d == UNREACHABLE else int(d)
+
+    def neighbourhood(self, seeds, hops):
+        """{parser rule: undirected distance to the nearest seed} for rules at most hops away."""
+        rows = [self.position[seed] for seed in seeds if self.is_parser_rule(seed)]
+        if not rows:
+            return {}
+        nearest = self.parser_undirected[rows].min(axis=0)
+        return {self.nodes[j]: int(nearest[j]) for j in np.flatnonzero(nearest <= hops)}
+
+
+def load_index(path=INDEX_PATH, dependencies_path=DEPENDENCIES_PATH):
+    """The saved index, rebuilt (and saved again) if missing or older than the source JSON."""
+    if os.path.isfile(path):
+        with np.load(path) as data:
+            tables = dict(data)
+        if int(tables["version"]) == INDEX_VERSION and str(tables["source_hash"]) == source_hash(dependencies_path):
+            return GrammarIndex(tables)
+        print(f"[INDEX] {path} is stale, rebuilding")
+    tables = build_index(dependencies_path)
+    save_index(tables, path)
+    return GrammarIndex(tables)
+
+
+if __name__ == "__main__":
+    tables = build_index()
+    save_index(tables)
+    index = GrammarIndex(tables)
+    print(f"[INDEX] {index.n_parser} parser rules, {len(index.nodes) - index.n_parser} lexer tokens, "
+          f"{len(index.indices)} edges")
+    print(f"[INDEX] saved to {INDEX_PATH} ({os.path.getsize(INDEX_PATH)} bytes)")
@@ -0,0 +1,186 @@
+"""
+Grammar queries for the rule tooling: which concepts can appear under
+functionDefinition, the path from sourceUnit to emitStatement, the nearest
+concept containing both revertStatement and returnStatement.
+
+The grammar index (grammar_index.py) is loaded once per process and every
+query is answered from its tables and memoized. Memoized results are
+immutable (tuples in grammar order), so callers cannot change the cached
+values; the batch entry points answer many pairs with one array lookup.
+
+    python grammar_query.py descendants functionDefinition
+    python grammar_query.py ancestors emitStatement
+    python grammar_query.py path sourceUnit emitStatement
+    python grammar_query.py lca revertStatement returnStatement
+    python grammar_query.py khop emitStatement 2 [out|in|both]
+"""
+
+import json
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from grammar_index import UNREACHABLE, load_index
+
+
+@lru_cache(maxsize=None)
+def index():
+    """The shared grammar_index.GrammarIndex."""
+    return load_index()
+
+
+def _check(*concepts):
+    for concept in concepts:
+        if concept not in index():
+            raise KeyError(f"unknown grammar concept: {concept}")
+
+
+def _names(mask, tokens):
+    grammar = index()
+    if not tokens:
+        mask = mask[:grammar.n_parser]
+    return tuple(grammar.nodes[i] for i in np.flatnonzero(mask))
+
+
+@lru_cache(maxsize=1024)
+def descendants(concept, tokens=False):
+    """Concepts (and lexer tokens if tokens) that can appear, transitively, under concept."""
+    _check(concept)
+    return _names(index().descendant_mask(concept), tokens)
+
+
+@lru_cache(maxsize=1024)
+def ancestors(concept):
+    """Parser rules under which concept can appear."""
+    _check(concept)
+    return _names(index().ancestor_mask(concept), False)
+
+
+@lru_cache(maxsize=4096)
+def shortest_path(source, target):
+    """
+    Fewest-edge dependency path (source, ..., target), or None if target
+    cannot appear under source. Each step moves to the first successor one
+    edge closer to target, so the path is deterministic.
+    """
+    _check(source, target)
+    grammar = index()
+    if grammar.distance(source, target) is None:
+        return None
+    t = grammar.position[target]
+    path = [source]
+    node = grammar.position[source]
+    while node != t:
+        remaining = grammar.distance_table[node, t]
+        successors = grammar.indices[grammar.indptr[node]:grammar.indptr[node + 1]]
+        node = next(int(s) for s in successors if grammar.distance_table[s, t] == remaining - 1)
+        path.append(grammar.nodes[node])
+    return tuple(path)
+
+
+@lru_cache(maxsize=4096)
+def lowest_common_ancestor(first, second):
+    """
+    The parser rule closest to both concepts that both can appear under
+    (either concept itself counts). The grammar is recursive, so there can
+    be several candidates; the one with the smallest larger distance wins,
+    then the smallest total distance, then grammar order. None if there is
+    no common ancestor.
+    """
+    _check(first, second)
+    grammar = index()
+    i, j = grammar.position[first], grammar.position[second]
+    n = grammar.n_parser
+    to_first = grammar.distance_table[:n, i].astype(np.int64)
+    to_second = grammar.distance_table[:n, j].astype(np.int64)
+    common = (to_first != UNREACHABLE) & (to_second != UNREACHABLE)
+    if not common.any():
+        return None
+    candidates = np.flatnonzero(common)
+    order = np.lexsort((candidates, to_first[candidates] + to_second[candidates],
+                        np.maximum(to_first[candidates], to_second[candidates])))
+    return grammar.nodes[candidates[order[0]]]
+
+
+@lru_cache(maxsize=1024)
+def k_hop(concept, k, direction="out"):
+    """
+    ((concept, distance), ...) in grammar order for parser rules at most k
+    edges from concept: "out" follows dependencies, "in" follows them
+    backwards, "both" ignores direction. concept itself is included at
+    distance 0.
+    """
+    _check(concept)
+    grammar = index()
+    i = grammar.position[concept]
+    n = grammar.n_parser
+    if direction == "out":
+        distances = grammar.distance_table[i, :n]
+    elif direction == "in":
+        distances = grammar.distance_table[:n, i]
+    elif direction == "both":
+        return tuple(grammar.neighbourhood([concept], k).items())
+    else:
+        raise ValueError(f"direction must be out, in or both, not {direction!r}")
+    return tuple((grammar.nodes[j], int(distances[j])) for j in np.flatnonzero(distances <= k))
+
+
+def _pair_positions(pairs):
+    pairs = list(pairs)
+    for pair in pairs:
+        _check(*pair)
+    position = index().position
+    rows = np.array([position[a] for a, _ in pairs], dtype=np.int64)
+    cols = np.array([position[b] for _, b in pairs], dtype=np.int64)
+    return pairs, rows, cols
+
+
+def reachable_many(pairs):
+    """{(source, target): whether target can appear under source} for many pairs at once."""
+    pairs, rows, cols = _pair_positions(pairs)
+    bits = (index().closure[rows, cols >> 3] & (0x80 >> (cols & 7))) != 0
+    return {pair: bool(bit) for pair, bit in zip(pairs, bits)}
+
+
+def distance_many(pairs):
+    """{(source, target): fewest dependency edges, or None} for many pairs at once."""
+    pairs, rows, cols = _pair_positions(pairs)
+    distances = index().distance_table[rows, cols]
+    return {pair: None if d == UNREACHABLE else int(d) for pair, d in zip(pairs, distances)}
+
+
+def descendants_many(concepts, tokens=False):
+    return {concept: descendants(concept, tokens) for concept in concepts}
+
+
+def ancestors_many(concepts):
+    return {concept: ancestors(concept) for concept in concepts}
+
+
+def shortest_paths(pairs):
+    return {pair: shortest_path(*pair) for pair in pairs}
+
+
+def cache_stats():
+    """Memoization hits and misses per query."""
+    queries = (descendants, ancestors, shortest_path, lowest_common_ancestor, k_hop)
+    return {query.__name__: query.cache_info()._asdict() for query in queries}
+
+
+if __name__ == "__main__":
+    commands = {
+        "descendants": lambda concept: descendants(concept),
+        "ancestors": lambda concept: ancestors(concept),
+        "path": lambda source, target: shortest_path(source, target),
+        "lca": lambda first, second: lowest_common_ancestor(first, second),
+        "khop": lambda concept, k, direction="out": dict(k_hop(concept, int(k), direction)),
+    }
+    if len(sys.argv) < 3 or sys.argv[1] not in commands:
+        print(f"usage: python grammar_query.py {{{'|'.join(commands)}}} CONCEPT [ARG ...]")
+        sys.exit(1)
+    try:
+        print(json.dumps(commands[sys.argv[1]](*sys.argv[2:]), indent=2))
+    except (KeyError, ValueError, TypeError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
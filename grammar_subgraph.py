@@ -0,0 +1,118 @@
+"""
+Relevance-pruned grammar payload for rule generation.
+
+generate_req.py used to inline the whole grammar into every prompt, although
+a rule only touches a small neighbourhood of it. select_subgraph() starts
+from the concepts named in the YAML schema and in the spec path (directly or
+through keywords such as "event" or "throw"), adds their k-hop neighbourhood
+in Rule_Dep's parser adjacency list, nearest first, and stops at a token
+budget. The result keeps the adjacency-list format of the full grammar, with
+expansions restricted to the selected concepts.
+"""
+
+import json
+import os
+import re
+from collections import deque
+
+from llm_backend import approx_tokens
+
+
+ADJACENCY_PATH = os.path.join("Rule_Dep", "parser_adjacency_list.json")
+
+# Spec wording that points at a concept without naming it.
+KEYWORD_CONCEPTS = {
+    r"\bevents?\b|\bemit|\bfire|\blog": ("eventDefinition", "emitStatement", "eventParameter"),
+    r"\bthrow|\brevert|\bfail": ("revertStatement", "ifStatement"),
+    r"\breturns?\b": ("returnStatement", "parameterList"),
+    r"\bfunction\b|\bmethod\b": ("functionDefinition", "parameterList"),
+    r"\bview\b|\bpure\b|\bpayable\b": ("stateMutability",),
+    r"\bpublic\b|\bexternal\b": ("visibility",),
+    r"\bbalance|\ballowance|\bsupply|\bmapping": ("stateVariableDeclaration", "mappingType"),
+    r"\baddress\b|\buint\d*\b|\bbool\b|\bstring\b": ("typeName", "elementaryTypeName"),
+    r"\bconstructor|\bcreat": ("constructorDefinition",),
+}
+
+
+def load_adjacency(path=ADJACENCY_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def concepts_in(text, adjacency):
+    """Grammar keys named in text, in grammar order."""
+    return [concept for concept in adjacency if re.search(r"\b" + re.escape(concept) + r"\b", text)]
+
+
+def seed_concepts(adjacency, schema_text, path_text):
+    """Concepts named in the schema or the spec path, plus those its keywords point at."""
+    seeds = concepts_in(schema_text, adjacency) + concepts_in(path_text, adjacency)
+    for pattern, concepts in KEYWORD_CONCEPTS.items():
+        if re.search(pattern, path_text, re.I):
+            seeds += [c for c in concepts if c in adjacency]
+    return list(dict.fromkeys(seeds))
+
+
+def neighbours(adjacency):
+    """Undirected neighbour lists: a concept's expansions and the concepts expanding to it."""
+    undirected = {node: list(deps) for node, deps in adjacency.items()}
+    for node, deps in adjacency.items():
+        for dep in deps:
+            if dep in undirected and node not in undirected[dep]:
+                undirected[dep].append(node)
+    return undirected
+
+
+def neighbourhood(adjacency, seeds, hops):
+    """{concept: undirected distance to the nearest seed} for concepts at most hops away."""
+    undirected = neighbours(adjacency)
+    distance = {}
+    queue = deque()
+    for seed in seeds:
+        if seed in adjacency and seed not in distance:
+            distance[seed] = 0
+            queue.append(seed)
+    while queue:
+        node = queue.popleft()
+        if distance[node] == hops:
+            continue
+        for other in undirected[node]:
+            if other not in distance:
+                distance[other] = distance[node] + 1
+                queue.append(other)
+    return distance
+
+
+def select_subgraph(adjacency, seeds, hops=1, token_budget=None, index=None):
+    """
+    Seeds and their neighbourhood up to `hops` edges away (in either
+    direction), added nearest first until the rendered subgraph would exceed
+    token_budget. Returns {concept: [expansions within the subgraph]}.
+    With a grammar_index.GrammarIndex of the same grammar the neighbourhood
+    is read from its precomputed distances instead of a traversal.
+    """
+    if index is not None:
+        distance = index.neighbourhood(seeds, hops)
+    else:
+        distance = neighbourhood(adjacency, seeds, hops)
+
+    position = {node: i for i, node in enumerate(adjacency)}
+    order = sorted(distance, key=lambda node: (distance[node], position[node]))
+    selected = []
+    used = 2
+    for node in order:
+        # Cost of the node's own entry; edges to later nodes are small and ignored.
+        cost = approx_tokens(json.dumps({node: adjacency[node]}, indent=2))
+        if token_budget is not None and used + cost > token_budget and distance[node] > 0:
+            continue
+        selected.append(node)
+        used += cost
+
+    chosen = set(selected)
+    # Keep grammar order so equal selections render identically.
+    return {node: [dep for dep in deps if dep in chosen] for node, deps in adjacency.items() if node in chosen}
+
+
+def render(subgraph):
+    return json.dumps(subgraph, indent=2)
+
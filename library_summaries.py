@@ -0,0 +1,207 @@
+"""
+Precomputed summaries of well-known library functions.
+
+Slices often pull in SafeMath and Address through library calls and Context
+through internal calls, so prompts carry many lines of code the model
+already knows. Each entry
+below pairs a reference body with a short semantic summary; entries are
+keyed by the hash of the normalized body with parameters and locals
+alpha-renamed and the uint/int aliases spelled out, so copies that differ
+in formatting, comments, parameter names or integer spelling still match.
+Names of called functions are kept: div() and mod() wrappers differ only in
+the callee. build_structured_slice_output emits the summary instead of
+source and IR for matching functions.
+
+    python library_summaries.py CONTRACT_DIR
+
+lists the library functions the roots' slices reach and which of them are
+substituted (exit status 1 if none is).
+"""
+
+import re
+import threading
+
+from normalize import alpha_rename, normalize_source, sha256
+
+
+CALLED_RE = re.compile(r"([A-Za-z_$][\w$]*)\(")
+# Only applied to library bodies: normalize_source also keys the dedup
+# groups, verdict memo and fingerprint stores, which must stay stable.
+TYPE_ALIASES_RE = re.compile(r"(?<![\w$])(uint|int)(?![\w$])")
+
+
+# (library, reference body, summary). Several historical variants per function.
+LIBRARY_FUNCTIONS = [
+    # SafeMath (OpenZeppelin 2.x-3.x)
+    ("SafeMath", """function add(uint256 a, uint256 b) internal pure returns (uint256) {
+        uint256 c = a + b;
+        require(c >= a, "SafeMath: addition overflow");
+        return c;
+    }""", "Returns a + b; reverts on uint256 overflow."),
+    ("SafeMath", """function sub(uint256 a, uint256 b) internal pure returns (uint256) {
+        return sub(a, b, "SafeMath: subtraction overflow");
+    }""", "Returns a - b; reverts if b > a."),
+    ("SafeMath", """function sub(uint256 a, uint256 b, string memory errorMessage) internal pure returns (uint256) {
+        require(b <= a, errorMessage);
+        uint256 c = a - b;
+        return c;
+    }""", "Returns a - b; reverts with errorMessage if b > a."),
+    ("SafeMath", """function mul(uint256 a, uint256 b) internal pure returns (uint256) {
+        if (a == 0) {
+            return 0;
+        }
+        uint256 c = a * b;
+        require(c / a == b, "SafeMath: multiplication overflow");
+        return c;
+    }""", "Returns a * b; reverts on uint256 overflow."),
+    ("SafeMath", """function div(uint256 a, uint256 b) internal pure returns (uint256) {
+        return div(a, b, "SafeMath: division by zero");
+    }""", "Returns a / b (integer division); reverts if b == 0."),
+    ("SafeMath", """function div(uint256 a, uint256 b, string memory errorMessage) internal pure returns (uint256) {
+        require(b > 0, errorMessage);
+        uint256 c = a / b;
+        return c;
+    }""", "Returns a / b (integer division); reverts with errorMessage if b == 0."),
+    ("SafeMath", """function mod(uint256 a, uint256 b) internal pure returns (uint256) {
+        return mod(a, b, "SafeMath: modulo by zero");
+    }""", "Returns a % b; reverts if b == 0."),
+    ("SafeMath", """function mod(uint256 a, uint256 b, string memory errorMessage) internal pure returns (uint256) {
+        require(b != 0, errorMessage);
+        return a % b;
+    }""", "Returns a % b; reverts with errorMessage if b == 0."),
+
+    # SafeMath (OpenZeppelin 1.x, widely copied into 0.4.x tokens)
+    ("SafeMath", """function mul(uint256 a, uint256 b) internal pure returns (uint256) {
+        if (a == 0) {
+            return 0;
+        }
+        uint256 c = a * b;
+        assert(c / a == b);
+        return c;
+    }""", "Returns a * b; fails with assert on uint256 overflow."),
+    ("SafeMath", """function mul(uint256 a, uint256 b) internal pure returns (uint256) {
+        uint256 c = a * b;
+        assert(a == 0 || c / a == b);
+        return c;
+    }""", "Returns a * b; fails with assert on uint256 overflow."),
+    ("SafeMath", """function div(uint256 a, uint256 b) internal pure returns (uint256) {
+        uint256 c = a / b;
+        return c;
+    }""", "Returns a / b (integer division); division by zero fails."),
+    ("SafeMath", """function sub(uint256 a, uint256 b) internal pure returns (uint256) {
+        assert(b <= a);
+        return a - b;
+    }""", "Returns a - b; fails with assert if b > a."),
+    ("SafeMath", """function add(uint256 a, uint256 b) internal pure returns (uint256) {
+        uint256 c = a + b;
+        assert(c >= a);
+        return c;
+    }""", "Returns a + b; fails with assert on uint256 overflow."),
+
+    # Context
+    ("Context", """function _msgSender() internal view virtual returns (address) {
+        return msg.sender;
+    }""", "Returns msg.sender."),
+    ("Context", """function _msgSender() internal view returns (address payable) {
+        return msg.sender;
+    }""", "Returns msg.sender."),
+    ("Context", """function _msgSender() internal view virtual returns (address payable) {
+        return msg.sender;
+    }""", "Returns msg.sender."),
+    ("Context", """function _msgData() internal view virtual returns (bytes calldata) {
+        return msg.data;
+    }""", "Returns msg.data."),
+    ("Context", """function _msgData() internal view returns (bytes memory) {
+        this;
+        return msg.data;
+    }""", "Returns msg.data."),
+    ("Context", """function _msgData() internal view virtual returns (bytes memory) {
+        this;
+        return msg.data;
+    }""", "Returns msg.data."),
+
+    # Address
+    ("Address", """function isContract(address account) internal view returns (bool) {
+        return account.code.length > 0;
+    }""", "True if account currently has contract code (false during construction)."),
+    ("Address", """function isContract(address account) internal view returns (bool) {
+        uint256 size;
+        assembly { size := extcodesize(account) }
+        return size > 0;
+    }""", "True if account currently has contract code (extcodesize > 0; false during construction)."),
+    ("Address", """function isContract(address account) internal view returns (bool) {
+        bytes32 codehash;
+        bytes32 accountHash = 0xc5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470;
+        assembly { codehash := extcodehash(account) }
+        return (codehash != accountHash && codehash != 0x0);
+    }""", "True if account has code (extcodehash is neither empty-account hash nor zero)."),
+    ("Address", """function sendValue(address payable recipient, uint256 amount) internal {
+        require(address(this).balance >= amount, "Address: insufficient balance");
+        (bool success, ) = recipient.call{ value: amount }("");
+        require(success, "Address: unable to send value, recipient may have reverted");
+    }""", "Sends amount wei to recipient with a low-level call forwarding all gas; reverts if the balance is insufficient or the call fails."),
+]
+
+
+def body_hash(source):
+    text = TYPE_ALIASES_RE.sub(r"\g<1>256", normalize_source(source))
+    return sha256(alpha_rename(text, {}, reserved=set(CALLED_RE.findall(text))))
+
+
+class LibrarySummaryStore:
+    """Body hash -> (library, summary), with counts of substitutions and tokens saved."""
+
+    def __init__(self, entries=LIBRARY_FUNCTIONS):
+        self.entries = {body_hash(source): (library, summary) for library, source, summary in entries}
+        self._lock = threading.Lock()
+        self.stats = {"substituted": 0, "tokens_saved": 0}
+
+    def lookup(self, source):
+        if not source:
+            return None
+        return self.entries.get(body_hash(source))
+
+    def record(self, tokens_saved):
+        with self._lock:
+            self.stats["substituted"] += 1
+            self.stats["tokens_saved"] += tokens_saved
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    from contract_loader import concrete_root_contracts
+
+    if len(sys.argv) != 2:
+        print("usage: python library_summaries.py CONTRACT_DIR")
+        sys.exit(1)
+
+    contract_dir = sys.argv[1]
+    roots = concrete_root_contracts(os.path.join(contract_dir, "main.sol"), os.path.join(contract_dir, "metadata.json"))
+    if not roots:
+        print(f"No concrete contracts compiled from {contract_dir}")
+        sys.exit(1)
+
+    # The callees verifier.find_slice adds for each function of a root.
+    store = LibrarySummaryStore()
+    libraries = {library for library, _, _ in LIBRARY_FUNCTIONS}
+    callees = {}
+    for contract in roots:
+        for function in contract.functions:
+            for call in function.all_internal_calls() + function.all_library_calls():
+                callee = call.function
+                if callee.contract_declarer.is_library or callee.contract_declarer.name in libraries:
+                    callees[callee.canonical_name] = callee
+
+    substituted = 0
+    for name, callee in sorted(callees.items()):
+        known = store.lookup(callee.source_mapping.content if callee.source_mapping else "")
+        substituted += known is not None
+        print(f"[LIBRARY] {name}: {'substituted' if known else 'kept'}")
+    print(f"[LIBRARY] {substituted}/{len(callees)} library functions substituted")
+    sys.exit(0 if substituted else 1)
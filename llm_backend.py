@@ -0,0 +1,191 @@
+"""
+Chat-completion backends shared by verifier.py, simple_verifier.py and
+generate_req.py.
+
+The backend is chosen with the SPECGUARD_LLM_BACKEND environment variable:
+  azure   - Azure OpenAI deployment (default, uses the script's AZURE_* settings)
+  openai  - any OpenAI-compatible endpoint at SPECGUARD_LLM_BASE_URL
+  mock    - the local stand-in from mock_llm_server.py (default 127.0.0.1:8089)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_MOCK_BASE_URL = "http://127.0.0.1:8089/v1"
+
+Completion = namedtuple("Completion", ["text", "usage", "latency"])
+
+
+def usage_to_dict(usage):
+    """Normalize an OpenAI usage object (or None) to a plain dict of token counts."""
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+    # Prompt-cache hits are reported under prompt_tokens_details.cached_tokens.
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0,
+    }
+
+
+def approx_tokens(text):
+    """Rough token count (~4 characters per token), good enough for accounting and budgets."""
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / 4))
+
+
+class LLMBackend:
+    """
+    Base class for chat-completion backends.
+    Subclasses implement complete(); accounting is shared and thread-safe.
+    """
+
+    name = "base"
+
+    def __init__(self, model, max_tokens=16384, temperature=0.0):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "latency_total": 0.0,
+        }
+        self.started_at = time.monotonic()
+
+    def complete(self, messages, **kwargs):
+        """Return a Completion for messages."""
+        raise NotImplementedError
+
+    def chat(self, messages, **kwargs):
+        """Return only the response text for messages."""
+        return self.complete(messages, **kwargs).text
+
+    def stream(self, messages, on_usage=None, **kwargs):
+        """
+        Yield response text deltas as they are generated. Closing the
+        generator early aborts the request, which stops generation.
+        on_usage(usage) is called once the stream ends, if usage was reported.
+        """
+        raise NotImplementedError
+
+    def record(self, usage, latency):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            self.stats["completion_tokens"] += usage.get("completion_tokens", 0)
+            self.stats["cached_tokens"] += usage.get("cached_tokens", 0)
+            self.stats["latency_total"] += latency
+
+    def summary(self):
+        """Throughput summary since the backend was created."""
+        with self._lock:
+            stats = dict(self.stats)
+        elapsed = time.monotonic() - self.started_at
+        stats["elapsed"] = round(elapsed, 3)
+        stats["calls_per_sec"] = round(stats["calls"] / elapsed, 3) if elapsed > 0 else 0.0
+        stats["mean_latency"] = round(stats["latency_total"] / stats["calls"], 3) if stats["calls"] else 0.0
+        stats["latency_total"] = round(stats["latency_total"], 3)
+        return stats
+
+
+class OpenAIClientBackend(LLMBackend):
+    """Backend over an openai SDK client (OpenAI or AzureOpenAI)."""
+
+    def __init__(self, client, model, max_tokens=16384, temperature=0.0, name="openai"):
+        super().__init__(model, max_tokens=max_tokens, temperature=temperature)
+        self.client = client
+        self.name = name
+
+    def complete(self, messages, **kwargs):
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+        }
+        params.update(kwargs)
+
+        start = time.monotonic()
+        response = self.client.chat.completions.create(**params)
+        latency = time.monotonic() - start
+
+        usage = usage_to_dict(response.usage)
+        self.record(usage, latency)
+        return Completion(response.choices[0].message.content, usage, latency)
+
+    def stream(self, messages, on_usage=None, **kwargs):
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        params.update(kwargs)
+
+        start = time.monotonic()
+        response = self.client.chat.completions.create(**params)
+        usage = None
+        try:
+            for chunk in response:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = usage_to_dict(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            # Reached on normal completion and on early close; closing the
+            # HTTP response is what tells the provider to stop generating.
+            response.close()
+            self.record(usage or usage_to_dict(None), time.monotonic() - start)
+            if on_usage is not None and usage is not None:
+                on_usage(usage)
+
+
+def azure_backend(deployment, azure_endpoint, api_key, api_version, max_tokens=16384, temperature=0.0):
+    from openai import AzureOpenAI
+
+    client = AzureOpenAI(azure_endpoint=azure_endpoint, api_key=api_key, api_version=api_version)
+    return OpenAIClientBackend(client, deployment, max_tokens=max_tokens, temperature=temperature, name="azure")
+
+
+def openai_compatible_backend(base_url, model, api_key="sk-local", max_tokens=16384, temperature=0.0, name="openai"):
+    from openai import OpenAI
+
+    client = OpenAI(base_url=base_url, api_key=api_key)
+    return OpenAIClientBackend(client, model, max_tokens=max_tokens, temperature=temperature, name=name)
+
+
+def get_backend(deployment, azure_endpoint="", api_key="", api_version="", max_tokens=16384, temperature=0.0):
+    """
+    Build the backend selected by SPECGUARD_LLM_BACKEND.
+    The Azure settings are the scripts' existing AZURE_OPENAI_* constants.
+    """
+    kind = os.environ.get("SPECGUARD_LLM_BACKEND", "azure").lower()
+
+    if kind == "azure":
+        return azure_backend(deployment, azure_endpoint, api_key, api_version, max_tokens=max_tokens, temperature=temperature)
+
+    if kind in ("openai", "mock"):
+        default_url = DEFAULT_MOCK_BASE_URL if kind == "mock" else ""
+        base_url = os.environ.get("SPECGUARD_LLM_BASE_URL", default_url)
+        if not base_url:
+            raise ValueError("SPECGUARD_LLM_BASE_URL must be set for the openai backend")
+        model = os.environ.get("SPECGUARD_LLM_MODEL", deployment)
+        key = os.environ.get("SPECGUARD_LLM_API_KEY", api_key or "sk-local")
+        return openai_compatible_backend(base_url, model, api_key=key, max_tokens=max_tokens, temperature=temperature, name=kind)
+
+    raise ValueError(f"Unknown SPECGUARD_LLM_BACKEND: {kind}")
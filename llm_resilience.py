@@ -0,0 +1,295 @@
+"""
+Tail-latency protection for LLM backends.
+
+ResilientBackend wraps any llm_backend.LLMBackend and adds:
+  - a per-attempt deadline, after which the call is abandoned,
+  - retries with exponential backoff and full jitter,
+  - optional hedging: a duplicate request is sent once an attempt runs past
+    the observed p95 latency, and whichever finishes first wins,
+  - a circuit breaker that pauses dispatch while the endpoint's recent error
+    rate is above a threshold.
+Every behavior is counted in summary()["resilience"].
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from llm_backend import LLMBackend
+
+
+class DeadlineExceeded(TimeoutError):
+    """An attempt did not finish within its deadline."""
+
+
+def is_retryable(error):
+    """Client errors (4xx other than 408/409/429) are not worth retrying."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return True
+    return status in (408, 409, 429) or status >= 500
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when the error rate over the last `window` outcomes reaches
+    `error_rate` (with at least `min_calls` outcomes). While open, callers wait
+    out the cooldown; then a single half-open probe decides whether to close
+    the breaker again or re-open it.
+    """
+
+    def __init__(self, window=20, min_calls=10, error_rate=0.5, cooldown=30.0):
+        self.window = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.cond = threading.Condition()
+        self.opens = 0
+        self.wait_time = 0.0
+
+    def before_call(self):
+        """Block until dispatch is allowed. Returns True if this call is the half-open probe."""
+        start = time.monotonic()
+        with self.cond:
+            while True:
+                if self.state == "closed":
+                    break
+                now = time.monotonic()
+                if self.state == "open" and now - self.opened_at >= self.cooldown:
+                    self.state = "half_open"
+                if self.state == "half_open" and not self.probe_in_flight:
+                    self.probe_in_flight = True
+                    self.wait_time += time.monotonic() - start
+                    return True
+                remaining = self.cooldown - (now - self.opened_at) if self.state == "open" else self.cooldown
+                self.cond.wait(timeout=max(0.05, remaining))
+            self.wait_time += time.monotonic() - start
+        return False
+
+    def record(self, success, probe=False):
+        with self.cond:
+            if probe:
+                self.probe_in_flight = False
+                if success:
+                    self.state = "closed"
+                    self.window.clear()
+                else:
+                    self._open()
+                self.cond.notify_all()
+                return
+
+            self.window.append(success)
+            if self.state == "closed" and len(self.window) >= self.min_calls:
+                failures = sum(1 for ok in self.window if not ok)
+                if failures / len(self.window) >= self.error_rate:
+                    self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.opens += 1
+        print(f"[BREAKER] open for {self.cooldown}s")
+
+
+class ResilientBackend(LLMBackend):
+    """Wraps a backend with deadlines, jittered retries, hedging and a circuit breaker."""
+
+    def __init__(self, inner, deadline=120.0, max_retries=4, backoff_base=1.0, backoff_cap=60.0,
+                 hedge=False, hedge_quantile=0.95, hedge_min_samples=20, breaker=None, max_workers=32, seed=None):
+        super().__init__(inner.model, max_tokens=inner.max_tokens, temperature=inner.temperature)
+        self.inner = inner
+        self.name = f"{inner.name}+resilient"
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.rng = random.Random(seed)
+        self.latencies = deque(maxlen=500)
+        self.metrics = {
+            "attempts": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "hedges_sent": 0,
+            "hedges_won": 0,
+            "gave_up": 0,
+        }
+
+        # The wrapper owns retrying; disable the SDK's own retry loop.
+        client = getattr(inner, "client", None)
+        if client is not None and hasattr(client, "with_options"):
+            inner.client = client.with_options(max_retries=0, timeout=deadline)
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.metrics[key] += n
+
+    def hedge_after(self):
+        if not self.hedge:
+            return None
+        with self._lock:
+            samples = list(self.latencies)
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return percentile(samples, self.hedge_quantile)
+
+    def backoff(self, attempt):
+        """Full jitter: uniform(0, min(cap, base * 2**attempt))."""
+        with self._lock:
+            return self.rng.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def attempt(self, messages, kwargs):
+        """One deadline-bounded attempt, possibly hedged. Returns (Completion, elapsed)."""
+        start = time.monotonic()
+        hedge_at = self.hedge_after()
+        primary = self.executor.submit(self.inner.complete, messages, **kwargs)
+        pending = [primary]
+        last_error = None
+
+        while pending:
+            elapsed = time.monotonic() - start
+            remaining = self.deadline - elapsed
+            if remaining <= 0:
+                self.count("timeouts")
+                raise DeadlineExceeded(f"LLM call exceeded {self.deadline}s deadline")
+
+            timeout = remaining
+            can_hedge = hedge_at is not None and len(pending) == 1 and pending[0] is primary
+            if can_hedge:
+                timeout = min(remaining, max(0.0, hedge_at - elapsed))
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge and time.monotonic() - start >= hedge_at:
+                    self.count("hedges_sent")
+                    pending.append(self.executor.submit(self.inner.complete, messages, **kwargs))
+                continue
+
+            for future in done:
+                pending.remove(future)
+                error = future.exception()
+                if error is None:
+                    if future is not primary:
+                        self.count("hedges_won")
+                    return future.result(), time.monotonic() - start
+                last_error = error
+
+        raise last_error
+
+    def complete(self, messages, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            probe = self.breaker.before_call()
+            self.count("attempts")
+            try:
+                completion, elapsed = self.attempt(messages, kwargs)
+            except Exception as e:
+                self.count("errors")
+                self.breaker.record(False, probe=probe)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.count("gave_up")
+                    raise
+                delay = self.backoff(attempt)
+                self.count("retries")
+                print(f"[RETRY] attempt {attempt + 1} failed ({type(e).__name__}: {e}); sleeping {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record(True, probe=probe)
+            with self._lock:
+                self.latencies.append(elapsed)
+            self.record(completion.usage, elapsed)
+            return completion
+
+    def stream(self, messages, **kwargs):
+        """
+        Streamed variant: the breaker and retries cover the request up to its
+        first delta; after that the stream is handed to the caller. A stalled
+        stream is bounded by the client read timeout (the deadline).
+        """
+        for attempt in range(self.max_retries + 1):
+            probe = self.breaker.before_call()
+            self.count("attempts")
+            start = time.monotonic()
+            deltas = self.inner.stream(messages, **kwargs)
+            try:
+                first = next(deltas, "")
+            except Exception as e:
+                self.count("errors")
+                self.breaker.record(False, probe=probe)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.count("gave_up")
+                    raise
+                delay = self.backoff(attempt)
+                self.count("retries")
+                print(f"[RETRY] stream attempt {attempt + 1} failed ({type(e).__name__}: {e}); sleeping {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record(True, probe=probe)
+            with self._lock:
+                self.stats["calls"] += 1
+                self.stats["latency_total"] += time.monotonic() - start
+            return self._relay(first, deltas)
+
+    def _relay(self, first, deltas):
+        try:
+            if first:
+                yield first
+            yield from deltas
+        finally:
+            deltas.close()
+
+    def summary(self):
+        stats = super().summary()
+        with self._lock:
+            resilience = dict(self.metrics)
+            samples = list(self.latencies)
+        resilience["breaker_opens"] = self.breaker.opens
+        resilience["breaker_state"] = self.breaker.state
+        resilience["breaker_wait_time"] = round(self.breaker.wait_time, 3)
+        for q in (0.5, 0.95, 0.99):
+            value = percentile(samples, q)
+            resilience[f"p{int(q * 100)}_latency"] = round(value, 3) if value is not None else None
+        stats["resilience"] = resilience
+        return stats
+
+
+def with_resilience(backend):
+    """
+    Wrap backend according to the environment:
+      SPECGUARD_LLM_DEADLINE        per-attempt deadline in seconds (default 120)
+      SPECGUARD_LLM_RETRIES         retries after the first attempt (default 4)
+      SPECGUARD_LLM_HEDGE           1 to enable p95 hedging (default off)
+      SPECGUARD_BREAKER_ERROR_RATE  error rate that opens the breaker (default 0.5)
+      SPECGUARD_BREAKER_COOLDOWN    seconds the breaker stays open (default 30)
+    """
+    breaker = CircuitBreaker(
+        error_rate=float(os.environ.get("SPECGUARD_BREAKER_ERROR_RATE", "0.5")),
+        cooldown=float(os.environ.get("SPECGUARD_BREAKER_COOLDOWN", "30")),
+    )
+    return ResilientBackend(
+        backend,
+        deadline=float(os.environ.get("SPECGUARD_LLM_DEADLINE", "120")),
+        max_retries=int(os.environ.get("SPECGUARD_LLM_RETRIES", "4")),
+        hedge=os.environ.get("SPECGUARD_LLM_HEDGE", "0") == "1",
+        breaker=breaker,
+    )
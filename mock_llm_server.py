@@ -0,0 +1,485 @@
+"""
+Local OpenAI-compatible stand-in for load testing the SpecGuard pipeline.
+
+Serves POST .../chat/completions (both /v1/chat/completions and the Azure
+/openai/deployments/<name>/chat/completions form) with deterministic,
+rule-aware responses, a configurable latency distribution, an injected
+429 rate and per-request token accounting. GET /stats returns the totals.
+"stream": true requests are answered as server-sent events, generated at
+--tokens-per-sec, and stop when the client disconnects. Prompt prefixes are
+cached like a provider would (128-token blocks, 1024-token minimum) and hits
+are reported in usage.prompt_tokens_details.cached_tokens.
+
+Usage:
+    python mock_llm_server.py --port 8089 --latency lognormal:0.0,0.5 --rate-429 0.02
+    SPECGUARD_LLM_BACKEND=mock python verifier.py
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backend import approx_tokens
+
+
+def parse_latency_spec(spec):
+    """
+    Parse a latency distribution spec into a sampler taking a random.Random.
+      fixed:S             always S seconds
+      uniform:A,B         uniform between A and B seconds
+      exp:MEAN            exponential with the given mean
+      lognormal:MU,SIGMA  lognormal (seconds), heavy right tail
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+
+    if kind == "fixed":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def load_canned(path):
+    """Canned responses: a JSON list of {"match": substring, "response": text}."""
+    if not path:
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ---------------------------------------------------------------------------
+# Rule-aware deterministic responses
+# ---------------------------------------------------------------------------
+
+BLOCK_RE = re.compile(r"<<<\s*\n(.*?)\n\s*>>>", re.DOTALL)
+
+
+def prompt_blocks(text):
+    return [b.strip() for b in BLOCK_RE.findall(text or "")]
+
+
+def find_rule_block(blocks):
+    for block in blocks:
+        if block.startswith("ir:"):
+            return block
+    return ""
+
+
+def find_inventory_block(blocks):
+    for block in blocks:
+        if not block.startswith("{"):
+            continue
+        for loader in (json.loads, ast.literal_eval):
+            try:
+                value = loader(block)
+            except (ValueError, SyntaxError):
+                continue
+            if isinstance(value, dict):
+                return value
+    return None
+
+
+def stable_fraction(*parts):
+    """Deterministic value in [0, 1) derived from the given strings."""
+    digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def mentioned(name, text):
+    return bool(name) and re.search(r"\b" + re.escape(name) + r"\b", text) is not None
+
+
+class ResponsePolicy:
+    """Decides the content of a mock response from the request messages."""
+
+    def __init__(self, canned=None, fail_rate=0.2, need_full_code_rate=0.3):
+        self.canned = canned or []
+        self.fail_rate = fail_rate
+        self.need_full_code_rate = need_full_code_rate
+
+    def respond(self, messages):
+        system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        user = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+
+        for entry in self.canned:
+            if entry.get("match", "") in system + user:
+                return entry["response"]
+
+        if "seed anchors" in system:
+            return self.seed(user)
+        if "compliance auditor" in system:
+            return self.empty_seed_verdict(user)
+        if "compliance verification assistant" in system:
+            return self.baseline_verdicts(user)
+        if "compliance assistant" in system:
+            return self.verdict(user)
+        if "intermediate representations" in system:
+            return self.rule_yaml(user)
+        return json.dumps({"mode": "VERIFIED", "result": "PASS", "reasoning": "mock"})
+
+    def seed(self, user):
+        blocks = prompt_blocks(user)
+        rule = find_rule_block(blocks)
+        inventory = find_inventory_block(blocks) or {"state_vars": [], "events": [], "functions": []}
+
+        filtered = {}
+        for bucket, items in inventory.items():
+            if not isinstance(items, list):
+                continue
+            filtered[bucket] = [item for item in items if isinstance(item, dict) and mentioned(item.get("name"), rule)]
+        return "```json\n" + json.dumps(filtered, indent=2) + "\n```"
+
+    def verdict_body(self, rule, allowed):
+        fraction = stable_fraction(rule, "result")
+        result = "FAIL" if fraction < self.fail_rate else "PASS"
+        if result not in allowed:
+            result = allowed[0]
+        return {
+            "mode": "VERIFIED",
+            "result": result,
+            "reasoning": f"mock verdict for rule {hashlib.sha256(rule.encode()).hexdigest()[:8]}",
+            "recommendations": [] if result == "PASS" else ["mock recommendation"],
+            "evidence": "mock evidence",
+            "fixed_code": None,
+        }
+
+    def verdict(self, user):
+        rule = find_rule_block(prompt_blocks(user))
+        full_code = "Full Solidity code" in user
+        if not full_code and stable_fraction(rule, user[-256:], "need_full") < self.need_full_code_rate:
+            return json.dumps({
+                "mode": "NEED_FULL_CODE",
+                "reason": "mock: slice is insufficient",
+                "what_to_provide": "full contract",
+            })
+        return json.dumps(self.verdict_body(rule, ("PASS", "FAIL")))
+
+    def empty_seed_verdict(self, user):
+        rule = find_rule_block(prompt_blocks(user))
+        if "OPTIONAL" in rule:
+            body = self.verdict_body(rule, ("NOT_APPLICABLE",))
+            body["result"] = "NOT_APPLICABLE"
+            return json.dumps(body)
+        body = self.verdict_body(rule, ("FAIL",))
+        body["result"] = "FAIL"
+        return json.dumps(body)
+
+    def baseline_verdicts(self, user):
+        return json.dumps([self.verdict_body(user[:512], ("PASS", "FAIL", "NOT_APPLICABLE"))])
+
+    def rule_yaml(self, user):
+        title = next((line.strip("# ").strip() for line in user.splitlines() if line.startswith("####")), "spec")
+        return (
+            "```yaml\n"
+            "ir:\n"
+            "  scope:\n"
+            f"    - The functionDefinition for `{title}` resides within a contractDefinition.\n"
+            "  normativity:\n"
+            "    - MUST: mock normativity referencing functionDefinition.\n"
+            "  signature:\n"
+            "    - The functionDefinition has visibility set to `public`.\n"
+            "  required_behavior:\n"
+            "    - The functionDefinition includes a returnStatement.\n"
+            "  guards_and_failures:\n"
+            "    - A revertStatement is used on failure.\n"
+            "  state_effects:\n"
+            "    - No stateVariableDeclaration is modified.\n"
+            "  observables:\n"
+            "    - No emitStatement is required.\n"
+            "  gaps:\n"
+            "    - None beyond the functionDefinition approximation.\n"
+            "```"
+        )
+
+
+# ---------------------------------------------------------------------------
+# HTTP server
+# ---------------------------------------------------------------------------
+
+class MockState:
+    """Shared configuration, RNG and counters for all handler threads."""
+
+    # Provider-style prefix caching: prompts are hashed in 128-token blocks and
+    # a hit is only reported once the cached prefix reaches 1024 tokens.
+    CACHE_BLOCK_CHARS = 128 * 4
+    CACHE_MIN_TOKENS = 1024
+    CACHE_MAX_ENTRIES = 200000
+
+    def __init__(self, policy, latency="fixed:0", rate_429=0.0, seed=0, tokens_per_sec=0.0, prefix_cache=True):
+        self.policy = policy
+        self.prefix_cache = OrderedDict() if prefix_cache else None
+        self.sample_latency = parse_latency_spec(latency)
+        self.rate_429 = rate_429
+        self.tokens_per_sec = tokens_per_sec
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "completed": 0,
+            "rate_limited": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "streams": 0,
+            "aborted_streams": 0,
+        }
+
+    def generation_time(self, tokens):
+        """Seconds needed to generate the given number of completion tokens."""
+        return tokens / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+
+    def draw(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            throttled = self.rng.random() < self.rate_429
+            latency = max(0.0, self.sample_latency(self.rng))
+            if throttled:
+                self.stats["rate_limited"] += 1
+        return throttled, latency
+
+    def cached_prefix_tokens(self, messages):
+        """Tokens of the longest previously seen prompt prefix (0 below the minimum)."""
+        if self.prefix_cache is None:
+            return 0
+        text = "".join(f"{m.get('role', '')}\n{m.get('content', '')}\n" for m in messages)
+        digest = hashlib.sha256()
+        keys = []
+        for start in range(0, len(text) - self.CACHE_BLOCK_CHARS + 1, self.CACHE_BLOCK_CHARS):
+            digest.update(text[start:start + self.CACHE_BLOCK_CHARS].encode("utf-8"))
+            keys.append(digest.copy().hexdigest())
+
+        with self.lock:
+            hits = 0
+            for key in keys:
+                if key not in self.prefix_cache:
+                    break
+                self.prefix_cache.move_to_end(key)
+                hits += 1
+            for key in keys[hits:]:
+                self.prefix_cache[key] = True
+            while len(self.prefix_cache) > self.CACHE_MAX_ENTRIES:
+                self.prefix_cache.popitem(last=False)
+
+        cached = hits * self.CACHE_BLOCK_CHARS // 4
+        return cached if cached >= self.CACHE_MIN_TOKENS else 0
+
+    def account(self, prompt_tokens, completion_tokens, streamed=False, aborted=False, cached_tokens=0):
+        with self.lock:
+            self.stats["completed"] += 1
+            self.stats["cached_tokens"] += cached_tokens
+            self.stats["streams"] += int(streamed)
+            self.stats["aborted_streams"] += int(aborted)
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (deadline or losing hedge); nothing to deliver.
+            pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path.endswith("/stats"):
+            self.send_json(200, self.state.snapshot())
+        elif path.endswith("/models"):
+            self.send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        else:
+            self.send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if not path.endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        messages = request.get("messages", [])
+
+        throttled, latency = self.state.draw()
+        if throttled:
+            self.send_json(
+                429,
+                {"error": {"message": "mock rate limit", "type": "rate_limit_exceeded", "code": "429"}},
+                headers={"Retry-After": "1"},
+            )
+            return
+
+        # latency models time-to-first-token; generation time is added per token.
+        time.sleep(latency)
+
+        text = self.state.policy.respond(messages)
+        max_tokens = request.get("max_tokens")
+        if max_tokens and approx_tokens(text) > int(max_tokens):
+            text = text[: int(max_tokens) * 4]
+            finish_reason = "length"
+        else:
+            finish_reason = "stop"
+
+        prompt_tokens = sum(approx_tokens(m.get("content", "")) for m in messages)
+        cached_tokens = min(prompt_tokens, self.state.cached_prefix_tokens(messages))
+        completion_id = "chatcmpl-" + uuid.uuid4().hex[:24]
+
+        if request.get("stream"):
+            include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+            self.stream_completion(completion_id, request, text, finish_reason, prompt_tokens, cached_tokens, include_usage)
+            return
+
+        completion_tokens = approx_tokens(text)
+        time.sleep(self.state.generation_time(completion_tokens))
+        self.state.account(prompt_tokens, completion_tokens, cached_tokens=cached_tokens)
+
+        self.send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        })
+
+    STREAM_CHUNK_CHARS = 16  # ~4 tokens per delta
+
+    def stream_completion(self, completion_id, request, text, finish_reason, prompt_tokens, cached_tokens, include_usage):
+        """
+        Send the completion as server-sent events. If the client disconnects
+        mid-stream, generation stops and only the emitted tokens are counted.
+        """
+        def event(choices, usage=None):
+            body = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": choices,
+            }
+            if include_usage:
+                body["usage"] = usage
+            return ("data: " + json.dumps(body) + "\n\n").encode("utf-8")
+
+        sent_chars = 0
+        aborted = False
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+
+            self.wfile.write(event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]))
+            for start in range(0, len(text), self.STREAM_CHUNK_CHARS):
+                piece = text[start:start + self.STREAM_CHUNK_CHARS]
+                time.sleep(self.state.generation_time(approx_tokens(piece)))
+                self.wfile.write(event([{"index": 0, "delta": {"content": piece}, "finish_reason": None}]))
+                self.wfile.flush()
+                sent_chars += len(piece)
+
+            completion_tokens = approx_tokens(text)
+            self.wfile.write(event([{"index": 0, "delta": {}, "finish_reason": finish_reason}]))
+            if include_usage:
+                self.wfile.write(event([], {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                }))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            aborted = True
+        self.state.account(prompt_tokens, approx_tokens(text[:sent_chars]), streamed=True, aborted=aborted, cached_tokens=cached_tokens)
+
+
+def make_server(host="127.0.0.1", port=8089, latency="fixed:0", rate_429=0.0, seed=0,
+                canned_path=None, fail_rate=0.2, need_full_code_rate=0.3, tokens_per_sec=0.0, prefix_cache=True):
+    policy = ResponsePolicy(load_canned(canned_path), fail_rate=fail_rate, need_full_code_rate=need_full_code_rate)
+    state = MockState(policy, latency=latency, rate_429=rate_429, seed=seed, tokens_per_sec=tokens_per_sec, prefix_cache=prefix_cache)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(**kwargs):
+    """Start a mock server on a background thread; returns (server, base_url)."""
+    server = make_server(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:A,B | exp:MEAN | lognormal:MU,SIGMA")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with HTTP 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--canned", default=None, help="JSON list of {match, response} entries")
+    parser.add_argument("--fail-rate", type=float, default=0.2)
+    parser.add_argument("--need-full-code-rate", type=float, default=0.3)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="completion generation speed (0 = instant)")
+    parser.add_argument("--no-prefix-cache", action="store_true", help="never report cached prompt tokens")
+    args = parser.parse_args()
+
+    server = make_server(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        rate_429=args.rate_429,
+        seed=args.seed,
+        canned_path=args.canned,
+        fail_rate=args.fail_rate,
+        need_full_code_rate=args.need_full_code_rate,
+        tokens_per_sec=args.tokens_per_sec,
+        prefix_cache=not args.no_prefix_cache,
+    )
+    print(f"Mock LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.RequestHandlerClass.state.snapshot(), indent=2))
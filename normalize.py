@@ -0,0 +1,88 @@
+"""
+Source normalization shared by the fingerprint, memo and dedup passes.
+
+normalize_source() removes comments and collapses whitespace so that copies
+of the same code that differ only in formatting or comments hash the same.
+alpha_rename() additionally replaces user identifiers with positional names
+(v0, v1, ...) so code that differs only in naming hashes the same too.
+"""
+
+import hashlib
+import re
+
+
+def strip_comments(source):
+    """Remove // and /* */ comments, leaving string literals untouched."""
+    out = []
+    i = 0
+    n = len(source)
+    while i < n:
+        ch = source[i]
+        if ch in "\"'":
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == "\\" else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif source.startswith("//", i):
+            j = source.find("\n", i)
+            i = n if j < 0 else j
+        elif source.startswith("/*", i):
+            j = source.find("*/", i + 2)
+            out.append(" ")
+            i = n if j < 0 else j + 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+PUNCT_SPACE_RE = re.compile(r"\s*([{}()\[\];,=<>!&|+\-*/%^~?:.])\s*")
+SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_source(source):
+    """Comments stripped, whitespace collapsed, no spaces around punctuation."""
+    text = SPACE_RE.sub(" ", strip_comments(source or "")).strip()
+    return PUNCT_SPACE_RE.sub(r"\1", text)
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Names that carry meaning of their own and are never renamed: keywords,
+# elementary types, globals and their members.
+SOLIDITY_RESERVED = frozenset("""
+    pragma solidity contract interface library abstract is function modifier event emit struct enum
+    mapping public private internal external pure view payable constant immutable returns return
+    if else for while do break continue throw revert require assert new delete this super true false
+    memory storage calldata indexed anonymous virtual override constructor fallback receive using
+    import from as try catch unchecked assembly let address bool string bytes byte var uint int
+    msg block tx now gasleft abi keccak256 sha3 sha256 ripemd160 ecrecover selfdestruct suicide type
+    wei gwei szabo finney ether seconds minutes hours days weeks years
+    length push pop transfer send call delegatecall staticcall value gas sender data sig origin
+    gasprice timestamp number coinbase difficulty prevrandao gaslimit balance code codehash
+    encode encodePacked encodeWithSelector encodeWithSignature decode min max
+""".split())
+
+IDENT_RE = re.compile(r"(?<![\w$])[A-Za-z_$][\w$]*")
+ELEMENTARY_TYPE_RE = re.compile(r"^(u?int\d*|bytes\d+|u?fixed[\dx]*)$")
+
+
+def alpha_rename(text, mapping, reserved=()):
+    """
+    Rename identifiers in text to v0, v1, ... in order of first appearance,
+    extending mapping (shared across calls for consistent renaming).
+    Reserved names, elementary types and ALL-CAPS tokens (constants and
+    SlithIR markers such as TMP_0 or INTERNAL_CALL) are kept.
+    """
+    def rename(match):
+        token = match.group(0)
+        if token in SOLIDITY_RESERVED or token in reserved or token.isupper() or ELEMENTARY_TYPE_RE.match(token):
+            return token
+        if token not in mapping:
+            mapping[token] = f"v{len(mapping)}"
+        return mapping[token]
+
+    return IDENT_RE.sub(rename, text)
@@ -0,0 +1,383 @@
+import json
+
+
+class ResponseParseError(ValueError):
+    """
+    Raised when an LLM response cannot be turned into a value that matches
+    the schema of the stage that requested it.
+    """
+
+    def __init__(self, stage, errors, response_text=None):
+        self.stage = stage
+        self.errors = list(errors)
+        self.response_text = response_text
+        super().__init__(f"[{stage}] " + "; ".join(self.errors))
+
+
+def find_balanced_json_spans(text):
+    """
+    Yield (start, end) spans of balanced {...} / [...] regions in text.
+    Brackets inside JSON strings (including escaped quotes) are ignored.
+    """
+    pos = 0
+    length = len(text)
+    while pos < length:
+        start = -1
+        for i in range(pos, length):
+            if text[i] in "{[":
+                start = i
+                break
+        if start < 0:
+            return
+
+        stack = []
+        in_string = False
+        escaped = False
+        end = -1
+        for i in range(start, length):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+                continue
+
+            if ch == '"':
+                in_string = True
+            elif ch in "{[":
+                stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                if not stack or stack.pop() != ch:
+                    break
+                if not stack:
+                    end = i + 1
+                    break
+
+        if end < 0:
+            # Unbalanced from this opener; try the next one.
+            pos = start + 1
+            continue
+
+        yield start, end
+        pos = end
+
+
+def extract_json_values(text):
+    """
+    Yield every balanced JSON object or array in text that decodes, in order.
+    Surrounding prose, code fences and stray tokens are ignored.
+    Raises ValueError if text is None.
+    """
+    if text is None:
+        raise ValueError("Empty response.")
+
+    for start, end in find_balanced_json_spans(text):
+        try:
+            yield json.loads(text[start:end])
+        except json.JSONDecodeError:
+            continue
+
+
+def extract_first_json_value(text):
+    """
+    Return the first balanced JSON object or array in text that decodes.
+    Raises ValueError if no such value exists.
+    """
+    for value in extract_json_values(text):
+        return value
+    raise ValueError("No balanced JSON value found in response.")
+
+
+# ---------------------------------------------------------------------------
+# Per-stage schemas
+# ---------------------------------------------------------------------------
+
+SEED_BUCKETS = ("state_vars", "events", "functions")
+
+VERDICT_OPTIONAL_FIELDS = {
+    "reasoning": (str,),
+    "evidence": (str, list, dict),
+    "recommendations": (list,),
+    "fixed_code": (str, type(None)),
+}
+
+
+def validate_seed(value):
+    """Seed selection returns a filtered inventory: {bucket: [{name, ...}, ...]}."""
+    errors = []
+    if not isinstance(value, dict):
+        return [f"expected a JSON object with keys {list(SEED_BUCKETS)}, got {type(value).__name__}"]
+
+    missing = [bucket for bucket in SEED_BUCKETS if bucket not in value]
+    if missing:
+        errors.append(f"missing keys {missing}")
+    for bucket, items in value.items():
+        if not isinstance(items, list):
+            errors.append(f"'{bucket}' must be a list")
+            continue
+        for idx, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append(f"'{bucket}[{idx}]' must be an object")
+                continue
+            for field in ("name", "contract"):
+                if not isinstance(item.get(field), str):
+                    errors.append(f"'{bucket}[{idx}]' is missing a string '{field}'")
+    return errors
+
+
+def _validate_verified(value, allowed_results):
+    errors = []
+    if value.get("result") not in allowed_results:
+        errors.append(f"'result' must be one of {list(allowed_results)}")
+    for field, types in VERDICT_OPTIONAL_FIELDS.items():
+        if field in value and not isinstance(value[field], types):
+            errors.append(f"'{field}' has the wrong type")
+    if not isinstance(value.get("reasoning"), str):
+        errors.append("'reasoning' must be a string")
+    return errors
+
+
+def validate_slice_verdict(value):
+    """Slice verification returns VERIFIED (PASS/FAIL) or NEED_FULL_CODE."""
+    if not isinstance(value, dict):
+        return [f"expected a JSON object, got {type(value).__name__}"]
+
+    mode = value.get("mode")
+    if mode == "VERIFIED":
+        return _validate_verified(value, ("PASS", "FAIL"))
+    if mode == "NEED_FULL_CODE":
+        return []
+    return ["'mode' must be VERIFIED or NEED_FULL_CODE"]
+
+
+def validate_full_verdict(value):
+    """Full-code verification must return a VERIFIED PASS/FAIL verdict."""
+    if not isinstance(value, dict):
+        return [f"expected a JSON object, got {type(value).__name__}"]
+    if value.get("mode") != "VERIFIED":
+        return ["'mode' must be VERIFIED"]
+    return _validate_verified(value, ("PASS", "FAIL"))
+
+
+def validate_empty_seed_verdict(value):
+    """The empty-seed fallback may additionally answer NOT_APPLICABLE."""
+    if not isinstance(value, dict):
+        return [f"expected a JSON object, got {type(value).__name__}"]
+    if value.get("mode") != "VERIFIED":
+        return ["'mode' must be VERIFIED"]
+    return _validate_verified(value, ("PASS", "FAIL", "NOT_APPLICABLE"))
+
+
+STAGE_SCHEMAS = {
+    "seed": validate_seed,
+    "slice_verdict": validate_slice_verdict,
+    "full_verdict": validate_full_verdict,
+    "empty_seed_verdict": validate_empty_seed_verdict,
+}
+
+STAGE_SHAPES = {
+    "seed": '{"state_vars": [...], "events": [...], "functions": [...]} where every element keeps its "name" and "contract" fields',
+    "slice_verdict": '{"mode": "VERIFIED", "result": "PASS" | "FAIL", "reasoning": "...", ...} or {"mode": "NEED_FULL_CODE", "reason": "...", "what_to_provide": "..."}',
+    "full_verdict": '{"mode": "VERIFIED", "result": "PASS" | "FAIL", "reasoning": "...", ...}',
+    "empty_seed_verdict": '{"mode": "VERIFIED", "result": "PASS" | "FAIL" | "NOT_APPLICABLE", "reasoning": "...", ...}',
+}
+
+
+def parse_response(response_text, stage):
+    """
+    Return the first JSON value in response_text that passes the schema of
+    the given stage, so a stray earlier value ("see [1]") does not cost a
+    repair call. Raises ResponseParseError with the errors of the first
+    decodable value if none passes.
+    """
+    first_errors = None
+    try:
+        for value in extract_json_values(response_text):
+            errors = STAGE_SCHEMAS[stage](value)
+            if not errors:
+                return value
+            if first_errors is None:
+                first_errors = errors
+    except ValueError as e:
+        raise ResponseParseError(stage, [str(e)], response_text)
+
+    if first_errors is None:
+        raise ResponseParseError(stage, ["No balanced JSON value found in response."], response_text)
+    raise ResponseParseError(stage, first_errors, response_text)
+
+
+REPAIR_PROMPT = """
+Your previous reply could not be used: {errors}.
+Reply again with ONLY the corrected JSON value, no prose and no code fences.
+Expected shape:
+{shape}
+"""
+
+
+def request_with_repair(send, messages, stage, max_repairs=2, response_text=None):
+    """
+    Send messages with send(messages) -> str and parse the reply for stage.
+    On a parse/schema failure, re-ask only this stage with a short repair
+    prompt (the bad reply plus the validation errors), up to max_repairs times.
+    If response_text is given it is used as the first reply instead of sending.
+    Returns the parsed value or raises the last ResponseParseError.
+    """
+    if response_text is None:
+        response_text = send(messages)
+    attempt = 0
+    while True:
+        try:
+            return parse_response(response_text, stage)
+        except ResponseParseError as e:
+            if attempt >= max_repairs:
+                raise
+            attempt += 1
+            print(f"[REPAIR] {stage} attempt {attempt}: {e}")
+            repair_messages = list(messages) + [
+                {"role": "assistant", "content": response_text or ""},
+                {"role": "user", "content": REPAIR_PROMPT.format(errors="; ".join(e.errors), shape=STAGE_SHAPES[stage])},
+            ]
+            response_text = send(repair_messages)
+
+
+# ---------------------------------------------------------------------------
+# Incremental parsing of streamed responses
+# ---------------------------------------------------------------------------
+
+class IncrementalObjectParser:
+    """
+    Incrementally parses the first top-level JSON object of a streamed reply.
+    feed() returns the (key, value) pairs whose values completed in the new
+    text, so callers can act on "mode"/"result" before the long free-text
+    fields have been generated. Text before the first '{' is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.complete = False
+        self.fields = {}
+
+        self.depth = 0            # nesting depth, 1 = inside the top-level object
+        self.in_string = False
+        self.escaped = False
+        self.expect = "key"       # key | colon | value | comma
+        self.token_start = None   # start of the current key/value text
+        self.current_key = None
+
+    def _emit(self, end, out):
+        raw = self.buffer[self.token_start:end].strip()
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        self.fields[self.current_key] = value
+        out.append((self.current_key, value))
+        self.token_start = None
+        self.expect = "comma"
+
+    def feed(self, text):
+        out = []
+        self.buffer += text
+        buf = self.buffer
+        while self.pos < len(buf) and not self.complete:
+            i = self.pos
+            ch = buf[i]
+            self.pos += 1
+
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expect == "key_string":
+                        self.current_key = json.loads(buf[self.token_start:i + 1])
+                        self.token_start = None
+                        self.expect = "colon"
+                    elif self.depth == 1 and self.expect == "value":
+                        # A top-level string value completes at its closing quote.
+                        self._emit(i + 1, out)
+                continue
+
+            if self.depth == 1 and self.expect == "key":
+                if ch == '"':
+                    self.in_string = True
+                    self.token_start = i
+                    self.expect = "key_string"
+                elif ch == "}":
+                    self.complete = True
+                continue
+
+            if self.depth == 1 and self.expect == "colon":
+                if ch == ":":
+                    self.expect = "value"
+                continue
+
+            if self.depth == 1 and self.expect == "comma":
+                if ch == ",":
+                    self.expect = "key"
+                elif ch == "}":
+                    self.complete = True
+                continue
+
+            # Inside a value (self.expect == "value") or a nested container.
+            if self.token_start is None and not ch.isspace():
+                self.token_start = i
+            if ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    # Top-level object closed right after a scalar value.
+                    self._emit(i, out)
+                    self.complete = True
+                elif self.depth == 1:
+                    self._emit(i + 1, out)
+            elif ch == "," and self.depth == 1:
+                self._emit(i, out)
+                self.expect = "key"
+        return out
+
+
+def consume_stream(chunks, stop_when=None, on_field=None):
+    """
+    Read text chunks from a streamed completion, parsing the JSON object
+    incrementally. on_field(key, value, fields) is called as each top-level
+    field completes. If stop_when(fields) returns True the stream is closed
+    early (which ends generation on the provider side).
+    Returns (fields, text, stopped_early).
+    """
+    parser = IncrementalObjectParser()
+    parts = []
+    stopped_early = False
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            if parser.complete:
+                # Drain the tail so the final usage chunk is still recorded.
+                continue
+            for key, value in parser.feed(chunk):
+                if on_field is not None:
+                    on_field(key, value, parser.fields)
+            if stop_when is not None and not parser.complete and parser.fields and stop_when(parser.fields):
+                stopped_early = True
+                break
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    return parser.fields, "".join(parts), stopped_early
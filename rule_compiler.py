@@ -0,0 +1,255 @@
+"""
+Compile Rules/<namespace>/*.yaml into pre-parsed rule objects.
+
+Each rule file is parsed once into its IR sections, the functions and events
+it targets, its normativity levels and the static-check predicates that apply
+to it. Compiled rules are cached in an artifact next to the rules, keyed by a
+hash of the rule text (and the compiler version), so unchanged rules are
+never re-parsed.
+
+Targets and predicates are resolved against per-standard tables
+(STANDARD_TABLES, keyed by rule namespace). A namespace without tables
+compiles to no targets and no predicates, so static triage, index seeding
+and the signature checks leave its rules to the LLM instead of judging them
+by ERC-20 expectations.
+
+A compiled rule is a plain dict:
+    {"id", "file", "namespace", "hash", "text", "sections", "levels", "optional",
+     "targets": [{"kind", "name", "signature", "returns"}],
+     "predicates": {"signature": bool, "event_emission": [[event, [sig]]], "return_value": [sig]}}
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import yaml
+
+from signature_index import ERC20_EVENTS, ERC20_FUNCTIONS
+from static_checks import BOOL_RETURNING, EVENT_EMITTERS
+
+
+COMPILER_VERSION = "2"
+COMPILED_RULES_FILE = ".compiled_rules.json"
+# Rule namespace to verify against (generate_req.py writes one per standard).
+RULES_DIR = os.environ.get("SPECGUARD_RULES_DIR", os.path.join("Rules", "erc20"))
+
+# Function/event tables and static-check expectations of each standard.
+STANDARD_TABLES = {
+    "erc20": {
+        "functions": ERC20_FUNCTIONS,
+        "events": ERC20_EVENTS,
+        "event_emitters": EVENT_EMITTERS,
+        "bool_returning": BOOL_RETURNING,
+    },
+}
+
+SECTION_RE = re.compile(r"^([A-Za-z_]+):\s*$")
+LEVEL_RE = re.compile(r"\b(MUST NOT|MUST|SHOULD NOT|SHOULD|MAY|OPTIONAL)\b")
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def parse_rule_sections(rule_text):
+    """
+    Line-based fallback for generated rule files that are not valid YAML
+    (unquoted ': ' or leading backticks inside list items).
+    """
+    ir = {}
+    items = None
+    for line in rule_text.splitlines():
+        stripped = line.strip()
+        match = SECTION_RE.match(stripped)
+        if match:
+            items = None if match.group(1) == "ir" else ir.setdefault(match.group(1), [])
+        elif stripped.startswith("- ") and items is not None:
+            items.append(stripped[2:].strip())
+        elif stripped and items:
+            items[-1] += " " + stripped
+    return ir
+
+
+def item_text(item):
+    # "- eventDefinition: Transfer(...)" loads as a one-key mapping.
+    if isinstance(item, dict):
+        return "; ".join(f"{k}: {v}" for k, v in item.items())
+    return str(item)
+
+
+def load_rule(rule_text):
+    """Return {section: [item text, ...]} for a rule file."""
+    try:
+        data = yaml.safe_load(rule_text) or {}
+    except yaml.YAMLError:
+        return parse_rule_sections(rule_text)
+    ir = data.get("ir", data) if isinstance(data, dict) else {}
+    if not isinstance(ir, dict):
+        return {}
+
+    sections = {}
+    for name, items in ir.items():
+        if items is None:
+            items = []
+        elif not isinstance(items, list):
+            items = [items]
+        sections[str(name)] = [item_text(item) for item in items]
+    return sections
+
+
+def section_text(ir, name):
+    return "\n".join(ir.get(name) or [])
+
+
+def find_names(text, names):
+    return [name for name in names if re.search(r"(?<![\w.])" + re.escape(name) + r"\b", text)]
+
+
+# ---------------------------------------------------------------------------
+# Targets and predicates
+# ---------------------------------------------------------------------------
+
+def signature_targets(ir, tables):
+    """
+    Functions and events a rule is about, resolved against the standard's tables.
+    Names are looked up in the scope and signature sections first, where
+    rules state their subject, and in the whole rule only if those are silent.
+    """
+    head = section_text(ir, "scope") + "\n" + section_text(ir, "signature")
+    text = "\n".join(section_text(ir, key) for key in ir)
+
+    functions = find_names(head, tables["functions"])
+    events = find_names(head, tables["events"])
+    if not functions and not events:
+        functions = find_names(text, tables["functions"])
+        events = find_names(text, tables["events"])
+
+    targets = []
+    for name in functions:
+        signature, returns = tables["functions"][name]
+        targets.append({"kind": "function", "name": name, "signature": signature, "returns": list(returns)})
+    for name in events:
+        targets.append({"kind": "event", "name": name, "signature": tables["events"][name], "returns": []})
+    return targets
+
+
+def event_emission_targets(ir, tables):
+    """
+    [[event_name, [signature, ...]]] for rules that require an event on every
+    successful call, or [] if the rule is not an event-emission rule.
+    """
+    normativity = section_text(ir, "normativity")
+    behavior = section_text(ir, "required_behavior") + "\n" + section_text(ir, "observables")
+    signature = section_text(ir, "signature")
+    text = "\n".join(section_text(ir, key) for key in ir)
+
+    targets = []
+    for event_name, candidates in tables["event_emitters"].items():
+        if not re.search(r"\b" + event_name + r"\b", normativity + behavior):
+            continue
+        if "emitStatement" not in behavior or "MUST" not in normativity + behavior:
+            continue
+
+        # Event-level rules (signature describes the event) cover every emitter.
+        if "eventDefinition" in signature and "functionDefinition" not in signature:
+            targets.append([event_name, list(candidates)])
+            continue
+
+        named = [sig for sig in candidates if re.search(r"\b" + sig.split("(")[0] + r"\b", text)]
+        if named:
+            targets.append([event_name, named])
+    return targets
+
+
+def return_value_targets(ir, tables):
+    """Signatures of the standard's bool-returning functions whose bool result the rule requires."""
+    spec = section_text(ir, "signature") + "\n" + section_text(ir, "required_behavior")
+    if "bool" not in spec or not re.search(r"return(Parameters|Statement)", spec):
+        return []
+    text = "\n".join(section_text(ir, key) for key in ir)
+    return [sig for sig in tables["bool_returning"] if re.search(r"\b" + sig.split("(")[0] + r"\b", text)]
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+
+def content_hash(rule_text, namespace="erc20"):
+    return hashlib.sha256((COMPILER_VERSION + "\0" + namespace + "\0" + rule_text).encode("utf-8")).hexdigest()
+
+
+def compile_rule(rule_id, rule_text, file_name=None, namespace="erc20"):
+    ir = load_rule(rule_text)
+    levels = sorted(set(LEVEL_RE.findall(section_text(ir, "normativity"))))
+    tables = STANDARD_TABLES.get(namespace)
+    resolve = bool(ir) and tables is not None
+    targets = signature_targets(ir, tables) if resolve else []
+    return {
+        "id": rule_id,
+        "file": file_name or f"{rule_id}.yaml",
+        "namespace": namespace,
+        "hash": content_hash(rule_text, namespace),
+        "text": rule_text,
+        "sections": ir,
+        "levels": levels,
+        "optional": "OPTIONAL" in levels,
+        "targets": targets,
+        "predicates": {
+            "signature": bool(targets),
+            "event_emission": event_emission_targets(ir, tables) if resolve else [],
+            "return_value": return_value_targets(ir, tables) if resolve else [],
+        },
+    }
+
+
+def compile_rules(rules_dir=RULES_DIR, cache_path=None):
+    """
+    Compile every rule file in rules_dir, reusing cached compilations whose
+    content hash is unchanged. Returns the compiled rules sorted by id.
+    """
+    if cache_path is None:
+        cache_path = os.path.join(rules_dir, COMPILED_RULES_FILE)
+    namespace = os.path.basename(os.path.normpath(rules_dir))
+    if namespace not in STANDARD_TABLES:
+        print(f"[RULES] no static tables for namespace {namespace}: static triage and index seeding are off")
+
+    cached = {}
+    if os.path.isfile(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as fp:
+                cached = json.load(fp).get("rules", {})
+        except (OSError, ValueError):
+            cached = {}
+
+    rules = []
+    hits = 0
+    for f in sorted(os.listdir(rules_dir), key=lambda name: (len(name), name)):
+        if not f.endswith((".yaml", ".yml")):
+            continue
+        with open(os.path.join(rules_dir, f), "r", encoding="utf-8") as fp:
+            rule_text = fp.read()
+
+        rule_id = os.path.splitext(f)[0]
+        compiled = cached.get(content_hash(rule_text, namespace))
+        if compiled is not None:
+            hits += 1
+            compiled = dict(compiled, id=rule_id, file=f)
+        else:
+            compiled = compile_rule(rule_id, rule_text, f, namespace)
+        rules.append(compiled)
+
+    artifact = {"compiler_version": COMPILER_VERSION, "rules": {rule["hash"]: rule for rule in rules}}
+    if hits != len(rules) or len(cached) != len(rules):
+        with open(cache_path, "w", encoding="utf-8") as fp:
+            json.dump(artifact, fp, indent=2)
+
+    print(f"[RULES] {len(rules)} rules ({hits} from {cache_path})")
+    return rules
+
+
+if __name__ == "__main__":
+    for rule in compile_rules():
+        print(f"{rule['id']}: levels={rule['levels']} targets={[t['name'] for t in rule['targets']]} "
+              f"predicates={json.dumps(rule['predicates'])}")
@@ -0,0 +1,167 @@
+"""
+Stable rule ids and incremental regeneration for generate_req.py.
+
+A rule's id is derived from its spec path (the section headings plus a hash
+of the path text), so it does not depend on the path's position in the spec
+and stays the same across runs. Its generation key additionally hashes the
+grammar payload, the prompt templates and the model; a rule is regenerated
+only when its key changes or its file is missing. Rules/manifest.json maps
+ids to files and keys. ResponseCache keeps raw responses by prompt so an
+identical request is never paid for twice.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+RESPONSE_CACHE_FILE = ".response_cache.jsonl"
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def path_headings(path):
+    """Section headings along a get_all_paths() path, outermost first."""
+    return [segment.split(":", 1)[0].strip() for segment in path.split("->")]
+
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def rule_id(path):
+    """e.g. "methods-transfer-1a2b3c4d": last two headings plus a hash of the path text."""
+    headings = [slugify(h) for h in path_headings(path)[-2:]]
+    return "-".join([h for h in headings if h] + [sha256(path)[:8]])
+
+
+def generation_key(path, *parts):
+    """Hash of the path text and everything else that shapes the generated rule."""
+    return sha256("\0".join(parts + (path,)))
+
+
+class RuleManifest:
+    """id -> {"file", "key", "headings", "index"} for the rules in one rules directory."""
+
+    def __init__(self, rules_dir, reports_dir=None):
+        self.rules_dir = rules_dir
+        # Verifier reports of these rules (reports/<contract>/<id>_report.json),
+        # renamed along with adopted rule files; None leaves reports alone.
+        self.reports_dir = reports_dir
+        self.path = os.path.join(rules_dir, MANIFEST_FILE)
+        self.rules = {}
+        self._lock = threading.Lock()
+        # Numbered files are only adopted into a directory without a manifest.
+        self.legacy = not os.path.isfile(self.path)
+        if os.path.isfile(self.path):
+            with open(self.path, "r", encoding="utf-8") as fp:
+                self.rules = json.load(fp).get("rules", {})
+
+    def file_for(self, rid):
+        return os.path.join(self.rules_dir, f"{rid}.yaml")
+
+    def is_current(self, rid, key):
+        entry = self.rules.get(rid)
+        return entry is not None and entry["key"] == key and os.path.isfile(self.file_for(rid))
+
+    def record(self, rid, key, path, index):
+        """Record a generated rule and save the manifest, so interrupted runs keep their progress."""
+        with self._lock:
+            self.rules[rid] = {"file": f"{rid}.yaml", "key": key, "headings": path_headings(path), "index": index}
+            self._save()
+
+    def adopt_legacy(self, rid, key, path, index):
+        """
+        Rename a rule generated before stable ids (Rules/<index>.yaml) to its
+        id instead of regenerating it, together with its verifier reports so
+        they are not verified again. Returns True if a file was adopted.
+        """
+        legacy = os.path.join(self.rules_dir, f"{index}.yaml")
+        if not self.legacy or not os.path.isfile(legacy) or os.path.isfile(self.file_for(rid)):
+            return False
+        os.replace(legacy, self.file_for(rid))
+        self.record(rid, key, path, index)
+        self._adopt_reports(rid, index)
+        return True
+
+    def _adopt_reports(self, rid, index):
+        if self.reports_dir is None or not os.path.isdir(self.reports_dir):
+            return
+        moved = 0
+        for entry in os.listdir(self.reports_dir):
+            old = os.path.join(self.reports_dir, entry, f"{index}_report.json")
+            new = os.path.join(self.reports_dir, entry, f"{rid}_report.json")
+            if os.path.isfile(old) and not os.path.exists(new):
+                os.replace(old, new)
+                moved += 1
+        if moved:
+            print(f"[GEN] {index}_report.json -> {rid}_report.json in {moved} report directories")
+
+    def prune(self, current_ids):
+        """Delete rules whose spec path no longer exists. Returns the removed ids."""
+        removed = []
+        with self._lock:
+            for rid in sorted(set(self.rules) - set(current_ids)):
+                if os.path.isfile(self.file_for(rid)):
+                    os.remove(self.file_for(rid))
+                del self.rules[rid]
+                removed.append(rid)
+            self._save()
+        return removed
+
+    def _save(self):
+        os.makedirs(self.rules_dir, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as fp:
+            json.dump({"version": MANIFEST_VERSION, "rules": dict(sorted(self.rules.items()))}, fp, indent=2)
+
+
+class ResponseCache:
+    """
+    LLM responses keyed by model and messages, appended to a JSON Lines file
+    and shared by every standard, so a repeated prompt (a lost manifest, an
+    identical path in two standards) is never sent twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[entry["key"]] = entry["response"]
+
+    @staticmethod
+    def key(model, messages):
+        return sha256(model + "\0" + json.dumps(messages, sort_keys=True))
+
+    def get(self, model, messages):
+        with self._lock:
+            response = self.entries.get(self.key(model, messages))
+            self.stats["hits" if response is not None else "misses"] += 1
+        return response
+
+    def put(self, model, messages, response):
+        key = self.key(model, messages)
+        with self._lock:
+            if key in self.entries:
+                return
+            self.entries[key] = response
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps({"key": key, "response": response}) + "\n")
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self.entries))
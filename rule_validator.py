@@ -0,0 +1,178 @@
+"""
+Post-generation validation of rule YAML against the schema and the grammar.
+
+Generated rules used to be written as-is, so rules that break the schema or
+name concepts outside GrammarGraphJSON only surfaced after a corpus run.
+The grammar keys are compiled once into a single matcher that, in one scan
+of each bullet, finds both the grammar concepts it references and any other
+camelCase concept-like names; validate_rule() combines that with the schema
+check. Errors (YAML that does not parse, missing sections, unknown concepts)
+make a rule invalid and trigger its regeneration in generate_req.py;
+softer departures from the prompt (bullet count, a bullet without a
+concept) are reported as warnings.
+
+    python rule_validator.py Rules/erc20 [specs/erc20.md]
+"""
+
+import json
+import os
+import re
+import sys
+
+import yaml
+
+import grammar_query
+
+
+SCHEMA_SECTIONS = ("scope", "normativity", "signature", "required_behavior", "guards_and_failures", "state_effects", "observables", "gaps")
+MIN_BULLETS = 6
+MAX_BULLETS = 14
+
+# Named by the generation prompt's schema although they are not parser rules
+# (returnParameters is a labelled parameterList in SolidityParser.g4).
+SCHEMA_CONCEPTS = ("returnParameters", "callArgument")
+
+# libyaml's loader when available; parsing dominates validation time.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CAMEL_RE = re.compile(r"\b[a-z][a-z0-9]*(?:[A-Z][a-z0-9]*)+\b")
+
+# Bullets that place one concept inside another ("returnStatement within the
+# block", "functionDefinition has a parameterList"); checked against the
+# grammar's reachability (grammar_query.py) with check_nesting.
+NESTING_RES = (
+    re.compile(r"\b(?P<inner>[a-z]\w*) (?:(?:is|are) )?(?:(?:defined|declared|used|nested) )?"
+               r"(?:within|inside|under|of|(?:as )?part of) (?:(?:a|an|the) )?(?P<outer>[a-z]\w*)\b"),
+    re.compile(r"\b(?P<outer>[a-z]\w*) (?:must )?(?:has|have|contains?|containing|includes?|including) "
+               r"(?:(?:a|an|the) )?(?P<inner>[a-z]\w*)\b"),
+)
+
+
+class ConceptMatcher:
+    """Grammar keys compiled into one alternation, plus a catch-all for other camelCase names."""
+
+    def __init__(self, keys):
+        self.keys = frozenset(keys) | frozenset(SCHEMA_CONCEPTS)
+        # Longest first so that e.g. "statement" never shadows "emitStatement".
+        alternatives = "|".join(re.escape(k) for k in sorted(self.keys, key=len, reverse=True))
+        self.pattern = re.compile(r"\b(?:(?P<key>" + alternatives + r")|(?P<other>" + CAMEL_RE.pattern[2:-2] + r"))\b")
+
+    def scan(self, text):
+        """(grammar concepts, other camelCase names) referenced in text."""
+        concepts = []
+        others = []
+        for match in self.pattern.finditer(text):
+            if match.group("key"):
+                concepts.append(match.group("key"))
+            else:
+                others.append(match.group("other"))
+        return concepts, others
+
+
+def load_matcher(path=os.path.join("Rule_Dep", "parser_adjacency_list.json")):
+    with open(path, "r", encoding="utf-8") as f:
+        return ConceptMatcher(json.load(f))
+
+
+def allowed_names(spec_text):
+    """camelCase names taken from the spec itself (totalSupply, transferFrom, ...) are not concepts."""
+    return frozenset(CAMEL_RE.findall(spec_text or ""))
+
+
+REPAIR_PROMPT = """
+The rule you produced fails validation: {errors}.
+Reply again with the corrected rule as valid YAML in a ```yaml ... ``` fenced block, following the schema exactly
+and using only concept names that are keys of GrammarGraphJSON.
+"""
+
+
+def bullet_text(item):
+    if isinstance(item, dict):
+        return "; ".join(f"{k}: {v}" for k, v in item.items())
+    return str(item)
+
+
+def nesting_claims(text):
+    """(outer, inner) pairs of parser rules that text places one inside the other."""
+    grammar = grammar_query.index()
+    claims = []
+    for pattern in NESTING_RES:
+        for match in pattern.finditer(text):
+            inner, outer = match.group("inner"), match.group("outer")
+            if grammar.is_parser_rule(inner) and grammar.is_parser_rule(outer):
+                claims.append((outer, inner))
+    return claims
+
+
+def validate_rule(yaml_text, matcher, allowed=frozenset(), check_nesting=False):
+    """
+    Returns {"errors": [...], "warnings": [...]}; the rule is valid if there
+    are no errors. With check_nesting, nesting claims the grammar rules out
+    are reported as warnings.
+    """
+    try:
+        data = yaml.load(yaml_text, Loader=SafeLoader)
+    except yaml.YAMLError as e:
+        return {"errors": [f"invalid YAML: {str(e).splitlines()[0]}"], "warnings": []}
+    if not isinstance(data, dict) or not isinstance(data.get("ir"), dict):
+        return {"errors": ["top level must be a mapping with an `ir` mapping"], "warnings": []}
+
+    ir = data["ir"]
+    errors = [f"missing section `{s}`" for s in SCHEMA_SECTIONS if s not in ir]
+    warnings = [f"unexpected section `{s}`" for s in ir if s not in SCHEMA_SECTIONS]
+
+    bullets = 0
+    unknown = set()
+    claims = []
+    for section in SCHEMA_SECTIONS:
+        items = ir.get(section) or []
+        if not isinstance(items, list):
+            errors.append(f"section `{section}` must be a list of bullets")
+            continue
+        for i, item in enumerate(items):
+            bullets += 1
+            text = bullet_text(item)
+            concepts, others = matcher.scan(text)
+            if not concepts and section != "gaps":
+                warnings.append(f"{section}[{i}] references no grammar concept")
+            if check_nesting and section != "gaps":
+                claims += [(f"{section}[{i}]", claim) for claim in nesting_claims(text)]
+            unknown.update(name for name in others if name not in allowed)
+
+    # All claims of the rule in one batch lookup.
+    reachable = grammar_query.reachable_many(claim for _, claim in claims)
+    for label, (outer, inner) in claims:
+        if not reachable[(outer, inner)]:
+            warnings.append(f"{label}: {inner} cannot appear inside {outer}")
+
+    if unknown:
+        errors.append(f"concepts not in GrammarGraphJSON: {', '.join(sorted(unknown))}")
+    if not MIN_BULLETS <= bullets <= MAX_BULLETS:
+        warnings.append(f"{bullets} bullets, expected {MIN_BULLETS}-{MAX_BULLETS}")
+    return {"errors": errors, "warnings": warnings}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("usage: python rule_validator.py RULES_DIR [SPEC_FILE]")
+        sys.exit(1)
+
+    rules_dir = sys.argv[1]
+    allowed = frozenset()
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            allowed = allowed_names(f.read())
+
+    matcher = load_matcher()
+    invalid = 0
+    files = sorted(f for f in os.listdir(rules_dir) if f.endswith((".yaml", ".yml")))
+    for f in files:
+        with open(os.path.join(rules_dir, f), "r", encoding="utf-8") as fp:
+            result = validate_rule(fp.read(), matcher, allowed, check_nesting=True)
+        if result["errors"]:
+            invalid += 1
+            print(f"[VALIDATE] {f}: INVALID: {'; '.join(result['errors'])}")
+        if result["warnings"]:
+            print(f"[VALIDATE] {f}: warnings: {'; '.join(result['warnings'])}")
+    print(f"[VALIDATE] {len(files) - invalid}/{len(files)} rules valid")
+    sys.exit(1 if invalid else 0)
@@ -0,0 +1,123 @@
+"""
+Per-contract index of 4-byte function selectors and event topics.
+
+The index covers every externally callable function (including public state
+variable getters) and every event visible in a concrete root contract, i.e.
+over its full inheritance chain. Rules name the functions and events they
+target; static_checks.py matches those against the index to answer
+presence, absence and signature-mismatch questions without a model call.
+"""
+
+from slither.utils.function import get_event_id, get_function_id
+
+
+# name -> (canonical signature, return types)
+ERC20_FUNCTIONS = {
+    "name": ("name()", ("string",)),
+    "symbol": ("symbol()", ("string",)),
+    "decimals": ("decimals()", ("uint8",)),
+    "totalSupply": ("totalSupply()", ("uint256",)),
+    "balanceOf": ("balanceOf(address)", ("uint256",)),
+    "transfer": ("transfer(address,uint256)", ("bool",)),
+    "transferFrom": ("transferFrom(address,address,uint256)", ("bool",)),
+    "approve": ("approve(address,uint256)", ("bool",)),
+    "allowance": ("allowance(address,address)", ("uint256",)),
+}
+
+ERC20_EVENTS = {
+    "Transfer": "Transfer(address,address,uint256)",
+    "Approval": "Approval(address,address,uint256)",
+}
+
+
+def selector(signature):
+    return f"0x{get_function_id(signature):08x}"
+
+
+def topic(signature):
+    return f"0x{get_event_id(signature):064x}"
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+def build_index(contract):
+    """
+    {"contract", "functions": {selector: entry}, "events": {topic: entry},
+     "function_names": {name: [selector]}, "event_names": {name: [topic]}}
+    """
+    index = {"contract": contract.name, "functions": {}, "events": {}, "function_names": {}, "event_names": {}}
+
+    def add_function(name, signature, returns, declared_in, kind):
+        sel = selector(signature)
+        if sel in index["functions"]:
+            return
+        index["functions"][sel] = {
+            "name": name,
+            "signature": signature,
+            "returns": list(returns),
+            "declared_in": declared_in,
+            "kind": kind,
+        }
+        index["function_names"].setdefault(name, []).append(sel)
+
+    for function in contract.functions:
+        if function.is_shadowed or function.is_constructor or function.is_fallback or function.is_receive:
+            continue
+        if function.visibility not in ("public", "external"):
+            continue
+        _, _, returns = function.signature
+        add_function(function.name, function.solidity_signature, returns, function.contract_declarer.name, "function")
+
+    for variable in contract.state_variables:
+        if variable.visibility != "public":
+            continue
+        _, _, returns = variable.signature
+        add_function(variable.name, variable.solidity_signature, returns, variable.contract.name, "getter")
+
+    for event in contract.events:
+        t = topic(event.full_name)
+        if t in index["events"]:
+            continue
+        index["events"][t] = {"name": event.name, "signature": event.full_name, "declared_in": event.contract.name}
+        index["event_names"].setdefault(event.name, []).append(t)
+
+    return index
+
+
+def contract_index(contract, indexes=None):
+    """
+    build_index(contract), memoized in indexes if given. The caller keeps one
+    dict per contract directory and drops it when moving on, so the indexes
+    (and the Slither objects they were built from) are not kept alive past it.
+    """
+    if indexes is None:
+        return build_index(contract)
+    if contract not in indexes:
+        indexes[contract] = build_index(contract)
+    return indexes[contract]
+
+
+def match_target(index, target):
+    """Returns (status, entry) with status in present / mismatch / absent."""
+    if target["kind"] == "event":
+        entry = index["events"].get(topic(target["signature"]))
+        if entry is not None:
+            return "present", entry
+        same_name = index["event_names"].get(target["name"], [])
+        return ("mismatch", index["events"][same_name[0]]) if same_name else ("absent", None)
+
+    entry = index["functions"].get(selector(target["signature"]))
+    if entry is not None:
+        if target["returns"] and entry["returns"] != target["returns"]:
+            return "mismatch", entry
+        return "present", entry
+    same_name = index["function_names"].get(target["name"], [])
+    return ("mismatch", index["functions"][same_name[0]]) if same_name else ("absent", None)
+
+
+def describe(entry):
+    if entry.get("returns"):
+        return f"{entry['signature']} returns ({','.join(entry['returns'])})"
+    return entry["signature"]
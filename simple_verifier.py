@@ -2,7 +2,6 @@ import json
 import re
 from pathlib import Path
 from markdown_tree_parser.parser import parse_string
-from openai import AzureOpenAI
 import time
 import re
 from pathlib import Path
@@ -17,7 +16,9 @@ import json
 import subprocess
 from slither.core.declarations import Event
 from slither.slithir.operations.event_call import EventCall
-from openai import AzureOpenAI
+from llm_backend import get_backend
+from llm_resilience import with_resilience
+from dedup import source_key, fan_out
 import re
 import time
 import traceback
@@ -75,199 +76,11 @@ def save_json(data: dict, output_path: str | Path) -> None:
 MAX_CONTRACTS_TO_PROCESS = 50
 processed_count = 0
 
-erc_text = """
----
-eip: 20
-title: Token Standard
-author: Fabian Vogelsteller <fabian@ethereum.org>, Vitalik Buterin <vitalik.buterin@ethereum.org>
-type: Standards Track
-category: ERC
-status: Final
-created: 2015-11-19
----
+# Specification the baseline verifies against (one EIP markdown file from specs/).
+SPEC_PATH = os.environ.get("SPECGUARD_SPEC", os.path.join("specs", "erc20.md"))
+with open(SPEC_PATH, "r", encoding="utf-8") as f:
+    erc_text = f.read()
 
-## Simple Summary
-
-A standard interface for tokens.
-
-
-## Abstract
-
-The following standard allows for the implementation of a standard API for tokens within smart contracts.
-This standard provides basic functionality to transfer tokens, as well as allow tokens to be approved so they can be spent by another on-chain third party.
-
-
-## Motivation
-
-A standard interface allows any tokens on Ethereum to be re-used by other applications: from wallets to decentralized exchanges.
-
-## Specification
-
-### Methods
-
-**NOTES**:
- - The following specifications use syntax from Solidity `0.4.17` (or above)
- - Callers MUST handle `false` from `returns (bool success)`.  Callers MUST NOT assume that `false` is never returned!
-
-
-#### name
-
-Returns the name of the token - e.g. `"MyToken"`.
-
-OPTIONAL - This method can be used to improve usability,
-but interfaces and other contracts MUST NOT expect these values to be present.
-
-
-``` js
-function name() public view returns (string)
-```
-
-
-#### symbol
-
-Returns the symbol of the token. E.g. "HIX".
-
-OPTIONAL - This method can be used to improve usability,
-but interfaces and other contracts MUST NOT expect these values to be present.
-
-``` js
-function symbol() public view returns (string)
-```
-
-
-
-#### decimals
-
-Returns the number of decimals the token uses - e.g. `8`, means to divide the token amount by `100000000` to get its user representation.
-
-OPTIONAL - This method can be used to improve usability,
-but interfaces and other contracts MUST NOT expect these values to be present.
-
-``` js
-function decimals() public view returns (uint8)
-```
-
-
-#### totalSupply
-
-Returns the total token supply.
-
-``` js
-function totalSupply() public view returns (uint256)
-```
-
-
-
-#### balanceOf
-
-Returns the account balance of another account with address `_owner`.
-
-``` js
-function balanceOf(address _owner) public view returns (uint256 balance)
-```
-
-
-
-#### transfer
-
-Transfers `_value` amount of tokens to address `_to`, and MUST fire the `Transfer` event.
-The function SHOULD `throw` if the message caller's account balance does not have enough tokens to spend.
-
-*Note* Transfers of 0 values MUST be treated as normal transfers and fire the `Transfer` event.
-
-``` js
-function transfer(address _to, uint256 _value) public returns (bool success)
-```
-
-
-
-#### transferFrom
-
-Transfers `_value` amount of tokens from address `_from` to address `_to`, and MUST fire the `Transfer` event.
-
-The `transferFrom` method is used for a withdraw workflow, allowing contracts to transfer tokens on your behalf.
-This can be used for example to allow a contract to transfer tokens on your behalf and/or to charge fees in sub-currencies.
-The function SHOULD `throw` unless the `_from` account has deliberately authorized the sender of the message via some mechanism.
-
-*Note* Transfers of 0 values MUST be treated as normal transfers and fire the `Transfer` event.
-
-``` js
-function transferFrom(address _from, address _to, uint256 _value) public returns (bool success)
-```
-
-
-
-#### approve
-
-Allows `_spender` to withdraw from your account multiple times, up to the `_value` amount. If this function is called again it overwrites the current allowance with `_value`.
-
-**NOTE**: To prevent attack vectors like the one [described here](https://docs.google.com/document/d/1YLPtQxZu1UAvO9cZ1O2RPXBbT0mooh4DYKjA_jp-RLM/) and discussed [here](https://github.com/ethereum/EIPs/issues/20#issuecomment-263524729),
-clients SHOULD make sure to create user interfaces in such a way that they set the allowance first to `0` before setting it to another value for the same spender.
-THOUGH The contract itself shouldn't enforce it, to allow backwards compatibility with contracts deployed before
-
-``` js
-function approve(address _spender, uint256 _value) public returns (bool success)
-```
-
-
-#### allowance
-
-Returns the amount which `_spender` is still allowed to withdraw from `_owner`.
-
-``` js
-function allowance(address _owner, address _spender) public view returns (uint256 remaining)
-```
-
-
-
-### Events
-
-
-#### Transfer
-
-MUST trigger when tokens are transferred, including zero value transfers.
-
-A token contract which creates new tokens SHOULD trigger a Transfer event with the `_from` address set to `0x0` when tokens are created.
-
-``` js
-event Transfer(address indexed _from, address indexed _to, uint256 _value)
-```
-
-
-
-#### Approval
-
-MUST trigger on any successful call to `approve(address _spender, uint256 _value)`.
-
-``` js
-event Approval(address indexed _owner, address indexed _spender, uint256 _value)
-```
-
-
-
-## Implementation
-
-There are already plenty of ERC20-compliant tokens deployed on the Ethereum network.
-Different implementations have been written by various teams that have different trade-offs: from gas saving to improved security.
-
-Example implementations are available at
-- [OpenZeppelin implementation](../assets/eip-20/OpenZeppelin-ERC20.sol)
-- [ConsenSys implementation](../assets/eip-20/Consensys-EIP20.sol)
-
-
-## History
-
-Historical links related to this standard:
-
-- Original proposal from Vitalik Buterin: https://github.com/ethereum/wiki/wiki/Standardized_Contract_APIs/499c882f3ec123537fc2fccd57eaa29e6032fe4a
-- Reddit discussion: https://www.reddit.com/r/ethereum/comments/3n8fkn/lets_talk_about_the_coin_standard/
-- Original Issue #20: https://github.com/ethereum/EIPs/issues/20
-
-
-
-## Copyright
-Copyright and related rights waived via [CC0](../LICENSE.md).
-"""
 with open("common_contracts.json", "r", encoding="utf-8") as f:
     common_data = json.load(f)
 common_contracts = set(common_data.get("common_contracts", []))
@@ -284,13 +97,18 @@ AZURE_OPENAI_API_VERSION = "2024-12-01-preview"
 AZURE_OPENAI_DEPLOYMENT = "gpt-4o"
 MAX_TOKENS = "16384"
 TEMP = "0.0"
+# Pause between LLM calls to stay under the endpoint's rate limit (0 for the mock server).
+REQUEST_DELAY = float(os.environ.get("SPECGUARD_REQUEST_DELAY", "15"))
 
-client = AzureOpenAI(azure_endpoint=AZURE_OPENAI_ENDPOINT,api_key=AZURE_OPENAI_API_KEY,api_version=AZURE_OPENAI_API_VERSION)
+backend = with_resilience(get_backend(AZURE_OPENAI_DEPLOYMENT,azure_endpoint=AZURE_OPENAI_ENDPOINT,api_key=AZURE_OPENAI_API_KEY,api_version=AZURE_OPENAI_API_VERSION,max_tokens=int(MAX_TOKENS),temperature=float(TEMP)))
 
 
 with open("sample_contracts.json", 'r') as f:
     sample = json.load(f)
 count = 0
+# Dedup key (normalized source + compiler version) -> entry whose report is reused.
+representatives = {}
+dedup_copies = 0
 
 for entry in os.listdir("reports"):
     try:
@@ -306,22 +124,31 @@ for entry in os.listdir("reports"):
             print(f"Reached limit of 50 processed contracts. Stopping.")
             break
         output_path = os.path.join(output_dir, entry, "report.json")
+        contract_dir = os.path.join(base_dir, entry)
+        if not os.path.isdir(contract_dir) and os.path.isdir(os.path.join("etherscan_contracts", entry)):
+            contract_dir = os.path.join("etherscan_contracts", entry)
         if os.path.exists(output_path):
             #print(f"Skipping {entry}: report already exists at {output_path}")
+            # A report from an earlier run still represents its duplicates.
+            existing_key = source_key(contract_dir) if os.path.isdir(contract_dir) else None
+            if existing_key is not None:
+                representatives.setdefault(existing_key, entry)
             processed_count = processed_count + 1
             continue    
-        contract_dir = os.path.join(base_dir, entry)
         if not os.path.isdir(contract_dir):
-            if not os.path.isdir(os.path.join("etherscan_contracts", entry)):
-                continue
-            else:
-                contract_dir = os.path.join("etherscan_contracts", entry)
+            continue
         src_path = os.path.join(contract_dir, "main.sol")
         metadata_path = os.path.join(contract_dir, "metadata.json")
 
         if not os.path.isfile(src_path) or not os.path.isfile(metadata_path):
             print("Here Now")
             continue
+        dedup_key = source_key(contract_dir)
+        if dedup_key in representatives and fan_out(output_dir, representatives[dedup_key], [entry]):
+            print(f"[DEDUP] {entry}: reusing report of {representatives[dedup_key]}")
+            dedup_copies = dedup_copies + 1
+            processed_count = processed_count + 1
+            continue
         with open(metadata_path, "r", encoding="utf-8") as f:
             metadata = json.load(f)
 
@@ -390,14 +217,7 @@ for entry in os.listdir("reports"):
         ]
 
         print("Sending verification request to LLM...")
-        response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT,
-            messages=messages,
-            max_tokens=int(MAX_TOKENS),
-            temperature=float(TEMP)
-        )
-        
-        response_text = response.choices[0].message.content
+        response_text = backend.chat(messages)
         print("Received response from LLM")
         
         # Extract and parse JSON
@@ -409,10 +229,13 @@ for entry in os.listdir("reports"):
         output_path = os.path.join(output_dir, entry, "report.json")
         save_json(reports, output_path)
         processed_count = processed_count + 1
-        time.sleep(15)
+        representatives.setdefault(dedup_key, entry)
+        time.sleep(REQUEST_DELAY)
     except Exception as e:
-        time.sleep(15)
+        time.sleep(REQUEST_DELAY)
 
 print(processed_count)
 print(count)
-    	
\ No newline at end of file
+print(f"[DEDUP] {dedup_copies} reports copied from duplicate contracts")
+    	
+print(f"[LLM] {backend.name}: {json.dumps(backend.summary())}")
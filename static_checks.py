@@ -0,0 +1,446 @@
+"""
+Deterministic SlithIR checks that can settle some rules without an LLM call.
+
+Each check returns a verdict dict
+    {"result": "PASS" | "FAIL" | "NOT_APPLICABLE" | "INCONCLUSIVE", "reasoning": str, "evidence": [str, ...]}
+Only decisive verdicts are reported directly; INCONCLUSIVE cases go to the LLM.
+"""
+
+from slither.core.cfg.node import NodeType
+from slither.core.declarations import Function, Modifier
+from slither.slithir.operations import EventCall, InternalCall, LowLevelCall, Return, SolidityCall
+
+from signature_index import contract_index, describe, match_target
+
+
+PASS = "PASS"
+FAIL = "FAIL"
+INCONCLUSIVE = "INCONCLUSIVE"
+NOT_APPLICABLE = "NOT_APPLICABLE"
+
+
+class Inconclusive(Exception):
+    """Raised when the analysis cannot decide soundly (assembly, delegatecall, missing bodies...)."""
+
+
+# ---------------------------------------------------------------------------
+# CFG helpers
+# ---------------------------------------------------------------------------
+
+def node_reverts(node):
+    """True if reaching this node aborts the transaction (throw / revert(...))."""
+    if node.type == NodeType.THROW:
+        return True
+    for ir in node.irs:
+        if isinstance(ir, SolidityCall) and ir.function.name.startswith("revert"):
+            return True
+    return False
+
+
+def node_label(node):
+    if node.expression is not None:
+        return str(node.expression)
+    return str(node.type)
+
+
+def all_paths_satisfy(entry, nodes, gen):
+    """
+    Must-analysis over a CFG: True if every non-reverting path from entry to an
+    exit passes through a node where gen(node) holds.
+
+    M(n) = gen(n) or reverts(n) or (n has sons and M(s) for every son s)
+
+    computed as a greatest fixpoint, so paths that never leave a loop count as
+    satisfied (they cannot return successfully). Returns (ok, values).
+    """
+    if entry is None:
+        return False, {}
+
+    gens = {node: gen(node) for node in nodes}
+    reverts = {node: node_reverts(node) for node in nodes}
+    values = {node: True for node in nodes}
+
+    changed = True
+    while changed:
+        changed = False
+        for node in nodes:
+            if gens[node] or reverts[node]:
+                continue
+            sons = [son for son in node.sons if son in values]
+            value = bool(sons) and all(values[son] for son in sons)
+            if value != values[node]:
+                values[node] = value
+                changed = True
+    return values.get(entry, False), values
+
+
+def witness_path(entry, values):
+    """A path from entry along nodes where the must-property fails, for evidence."""
+    path = []
+    node = entry
+    seen = set()
+    while node is not None and node not in seen and values.get(node) is False:
+        seen.add(node)
+        path.append(node_label(node))
+        node = next((son for son in node.sons if values.get(son) is False), None)
+    return path
+
+
+def with_modifiers(function, body_ok, gen, witnesses):
+    """
+    Lift a body-level result through the function's modifiers, innermost first.
+    Inside each modifier the placeholder `_` holds iff the wrapped code does;
+    other modifier nodes use gen. A failing modifier records a witness path.
+    """
+    ok = body_ok
+    for stmt in reversed(function.modifiers_statements):
+        modifier = stmt.modifier
+        if not isinstance(modifier, Modifier):
+            continue
+        if not modifier.is_implemented:
+            raise Inconclusive(f"modifier {modifier.name} has no body")
+        inner_ok = ok
+        ok, values = all_paths_satisfy(
+            modifier.entry_point,
+            modifier.nodes,
+            lambda node, inner_ok=inner_ok: (node.type == NodeType.PLACEHOLDER and inner_ok) or gen(node),
+        )
+        if not ok and inner_ok:
+            witnesses.setdefault(function, [f"modifier {modifier.name}"] + witness_path(modifier.entry_point, values))
+    return ok
+
+
+def guard_unsupported(function):
+    for node in function.nodes:
+        if node.type == NodeType.ASSEMBLY:
+            raise Inconclusive(f"{function.name} contains inline assembly")
+        for ir in node.irs:
+            if isinstance(ir, LowLevelCall) and str(ir.function_name) == "delegatecall":
+                raise Inconclusive(f"{function.name} performs a delegatecall")
+
+
+def find_root_function(contract, signature):
+    for function in contract.functions:
+        if function.solidity_signature == signature and not function.is_shadowed:
+            return function
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Event emission
+# ---------------------------------------------------------------------------
+
+# ERC-20 functions that MUST emit each event on every successful call.
+EVENT_EMITTERS = {
+    "Transfer": ("transfer(address,uint256)", "transferFrom(address,address,uint256)"),
+    "Approval": ("approve(address,uint256)",),
+}
+
+EVENT_SIGNATURES = {
+    "Transfer": "Transfer(address,address,uint256)",
+    "Approval": "Approval(address,address,uint256)",
+}
+
+
+def emits_event(function, event_name, memo, witnesses, stack=()):
+    """
+    True if every non-reverting path of function, including its modifiers and
+    internal calls, emits event_name. Failing functions get a witness path.
+    """
+    if function in memo:
+        return memo[function]
+    if function in stack:
+        raise Inconclusive(f"recursive call through {function.name}")
+    if not function.is_implemented:
+        raise Inconclusive(f"{function.name} has no body")
+    guard_unsupported(function)
+
+    stack = stack + (function,)
+
+    def gen(node):
+        for ir in node.irs:
+            if isinstance(ir, EventCall) and str(ir.name) == event_name:
+                return True
+            if isinstance(ir, InternalCall) and isinstance(ir.function, Function):
+                if emits_event(ir.function, event_name, memo, witnesses, stack):
+                    return True
+        return False
+
+    body_ok, values = all_paths_satisfy(function.entry_point, function.nodes, gen)
+    if not body_ok:
+        witnesses[function] = witness_path(function.entry_point, values)
+    ok = with_modifiers(function, body_ok, gen, witnesses)
+    memo[function] = ok
+    return ok
+
+
+def check_event_emission(roots, event_name, signatures):
+    """
+    Decide whether every concrete root's implementation of each signature emits
+    event_name on all successful paths.
+    """
+    evidence = []
+    failures = []
+
+    for contract in roots:
+        declared = [e for e in contract.events if e.name == event_name]
+        if not declared:
+            return verdict(INCONCLUSIVE, f"{contract.name} declares no {event_name} event", evidence)
+        if any(e.full_name != EVENT_SIGNATURES.get(event_name, e.full_name) for e in declared):
+            return verdict(INCONCLUSIVE, f"{contract.name} declares a non-standard {event_name} event", evidence)
+
+        for signature in signatures:
+            function = find_root_function(contract, signature)
+            if function is None:
+                return verdict(INCONCLUSIVE, f"{contract.name} does not implement {signature}", evidence)
+
+            witnesses = {}
+            try:
+                ok = emits_event(function, event_name, {}, witnesses)
+            except Inconclusive as e:
+                return verdict(INCONCLUSIVE, str(e), evidence)
+
+            if ok:
+                evidence.append(f"{function.canonical_name}: every non-reverting path emits {event_name}")
+            else:
+                path = witnesses.get(function, [])
+                failures.append(function.canonical_name)
+                evidence.append(f"{function.canonical_name}: path without emit {event_name}: " + " -> ".join(path))
+
+    if failures:
+        return verdict(FAIL, f"{', '.join(failures)} can return successfully without emitting {event_name}.", evidence)
+    return verdict(PASS, f"All non-reverting paths of {', '.join(signatures)} emit {event_name}.", evidence)
+
+
+# ---------------------------------------------------------------------------
+# Return values
+# ---------------------------------------------------------------------------
+
+# ERC-20 functions whose callers rely on a returned bool.
+BOOL_RETURNING = ("transfer(address,uint256)", "transferFrom(address,address,uint256)", "approve(address,uint256)")
+
+
+def returns_value(function):
+    """
+    True if every non-reverting path of function ends in `return <value>` or
+    assigns a named return variable on the way. Other paths hand the caller
+    the implicit zero value (false) instead of a result.
+    """
+    if not function.is_implemented:
+        raise Inconclusive(f"{function.name} has no body")
+    guard_unsupported(function)
+
+    named = {v for v in function.returns if v.name}
+
+    def gen(node):
+        if node.type == NodeType.RETURN and any(isinstance(ir, Return) and ir.values for ir in node.irs):
+            return True
+        return any(v in named for v in node.local_variables_written)
+
+    for modifier in function.modifiers:
+        if isinstance(modifier, Modifier) and any(node.type == NodeType.RETURN for node in modifier.nodes):
+            raise Inconclusive(f"modifier {modifier.name} contains a return statement")
+
+    witnesses = {}
+    body_ok, values = all_paths_satisfy(function.entry_point, function.nodes, gen)
+    if not body_ok:
+        witnesses[function] = witness_path(function.entry_point, values)
+    ok = with_modifiers(function, body_ok, lambda node: False, witnesses)
+    return ok, witnesses.get(function, [])
+
+
+def check_return_values(roots, signatures):
+    """
+    Decide whether each signature declares a single bool return and returns
+    a value on every non-reverting path, for every concrete root.
+    """
+    evidence = []
+    failures = []
+
+    for contract in roots:
+        for signature in signatures:
+            function = find_root_function(contract, signature)
+            if function is None:
+                return verdict(INCONCLUSIVE, f"{contract.name} does not implement {signature}", evidence)
+
+            return_type = function.return_type or []
+            if [str(t) for t in return_type] != ["bool"]:
+                failures.append(function.canonical_name)
+                declared = ", ".join(str(t) for t in return_type) or "nothing"
+                evidence.append(f"{function.canonical_name}: declared to return {declared}, expected (bool)")
+                continue
+
+            try:
+                ok, path = returns_value(function)
+            except Inconclusive as e:
+                return verdict(INCONCLUSIVE, str(e), evidence)
+
+            if ok:
+                evidence.append(f"{function.canonical_name}: every non-reverting path returns a value")
+            else:
+                failures.append(function.canonical_name)
+                evidence.append(f"{function.canonical_name}: path ending without a return value: " + " -> ".join(path))
+
+    if failures:
+        return verdict(FAIL, f"{', '.join(failures)} do not return a bool on every successful path.", evidence)
+    return verdict(PASS, f"{', '.join(signatures)} declare a bool return and return a value on every successful path.", evidence)
+
+
+def verdict(result, reasoning, evidence):
+    return {"result": result, "reasoning": reasoning, "evidence": list(evidence)}
+
+
+# ---------------------------------------------------------------------------
+# Rule-level checks (rules compiled by rule_compiler.py)
+# ---------------------------------------------------------------------------
+
+def check_rule_events(roots, rule, indexes=None):
+    """
+    Run the event-emission checker for a rule. Returns None if the rule is not
+    an event-emission rule, otherwise the combined verdict.
+    """
+    targets = rule["predicates"]["event_emission"]
+    if not targets:
+        return None
+
+    evidence = []
+    reasons = []
+    result = PASS
+    for event_name, signatures in targets:
+        v = check_event_emission(roots, event_name, signatures)
+        evidence.extend(v["evidence"])
+        reasons.append(v["reasoning"])
+        if v["result"] == INCONCLUSIVE:
+            return v
+        if v["result"] == FAIL:
+            result = FAIL
+    return verdict(result, " ".join(reasons), evidence)
+
+
+def check_rule_returns(roots, rule, indexes=None):
+    """Run the return-value checker for a rule, or return None if it does not apply."""
+    signatures = rule["predicates"]["return_value"]
+    if not signatures:
+        return None
+    return check_return_values(roots, signatures)
+
+
+def check_signatures(roots, targets, optional=False, indexes=None):
+    """
+    Match rule targets against each root's index. Absent targets fail the
+    rule (or make it NOT_APPLICABLE if the rule is OPTIONAL); mismatched
+    signatures fail it. PASS only means every target is present as specified.
+    indexes is the per-contract cache of signature_index.contract_index.
+    """
+    evidence = []
+    missing = []
+    mismatched = []
+
+    for contract in roots:
+        index = contract_index(contract, indexes)
+        for target in targets:
+            expected = describe(target)
+            status, entry = match_target(index, target)
+            if status == "present":
+                evidence.append(f"{contract.name}: {expected} present (declared in {entry['declared_in']})")
+            elif status == "mismatch":
+                mismatched.append(target["name"])
+                evidence.append(f"{contract.name}: expected {expected}, found {describe(entry)} (declared in {entry['declared_in']})")
+            else:
+                missing.append(target["name"])
+                evidence.append(f"{contract.name}: no {target['kind']} {expected}")
+
+    if mismatched:
+        return verdict(FAIL, f"Signature mismatch for {', '.join(sorted(set(mismatched)))}.", evidence)
+    if missing:
+        if optional:
+            return verdict(NOT_APPLICABLE, f"Optional {', '.join(sorted(set(missing)))} not implemented.", evidence)
+        return verdict(FAIL, f"Required {', '.join(sorted(set(missing)))} not implemented.", evidence)
+    return verdict(PASS, "All targeted signatures are present as specified.", evidence)
+
+
+def check_rule_signatures(roots, rule, indexes=None):
+    """Run the signature check for a rule, or return None if it names no known target."""
+    if not rule["predicates"]["signature"]:
+        return None
+    return check_signatures(roots, rule["targets"], optional=rule["optional"], indexes=indexes)
+
+
+def index_seed(roots, rule, indexes=None):
+    """
+    Seed inventory for the slice stage built from the index, in the format the
+    seed-selection prompt returns. None unless every target is present in
+    every root, in which case the seed LLM call can be skipped.
+    """
+    targets = rule["targets"]
+    if not targets:
+        return None
+
+    seed = {"state_vars": [], "events": [], "functions": []}
+    for contract in roots:
+        index = contract_index(contract, indexes)
+        for target in targets:
+            status, entry = match_target(index, target)
+            if status != "present":
+                return None
+            if target["kind"] == "event":
+                bucket = "events"
+            elif entry["kind"] == "getter":
+                bucket = "state_vars"
+            else:
+                bucket = "functions"
+            seed[bucket].append({"name": entry["name"], "contract": contract.name})
+    return seed
+
+
+# ---------------------------------------------------------------------------
+# Entry point used by verifier.py
+# ---------------------------------------------------------------------------
+
+# (name, check, recommendation on FAIL, whether a PASS can settle the rule).
+# Checks are called as check(roots, rule, indexes); only the signature check
+# uses the selector indexes.
+# Signature presence alone says nothing about behavior, so it can only fail
+# a rule or mark it not applicable.
+STATIC_CHECKS = [
+    ("signature", check_rule_signatures, "Implement the targeted functions and events with the standard signatures.", False),
+    ("event_emission", check_rule_events, "Emit the required event on every successful path.", True),
+    ("return_value", check_rule_returns, "Declare `returns (bool)` and return a value on every successful path.", True),
+]
+
+
+def run_static_checks(roots, rule, indexes=None):
+    """
+    Run every static check that applies to the rule and combine them: a FAIL
+    or NOT_APPLICABLE decides the rule, PASS needs every applicable check to
+    pass (and one of them to be behavioral), and an inconclusive check leaves
+    the rule to the LLM. Returns a report in the verifier's VERIFIED format,
+    or None.
+    """
+    applied = []
+    behavioral = False
+    for name, check, recommendation, decides_pass in STATIC_CHECKS:
+        v = check(roots, rule, indexes)
+        if v is None:
+            continue
+        if v["result"] in (FAIL, NOT_APPLICABLE):
+            applied = [(name, v, recommendation)]
+            break
+        if v["result"] == INCONCLUSIVE:
+            print(f"[STATIC] {name}: inconclusive ({v['reasoning']})")
+            return None
+        applied.append((name, v, recommendation))
+        behavioral = behavioral or decides_pass
+    else:
+        if not behavioral:
+            return None
+
+    return {
+        "mode": "VERIFIED",
+        "result": applied[0][1]["result"],
+        "reasoning": " ".join(v["reasoning"] for _, v, _ in applied),
+        "evidence": [item for _, v, _ in applied for item in v["evidence"]],
+        "recommendations": [rec for _, v, rec in applied if v["result"] == FAIL],
+        "fixed_code": None,
+        "source": "static:" + "+".join(name for name, _, _ in applied),
+    }
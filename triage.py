@@ -0,0 +1,251 @@
+"""
+Confidence-tiered triage in front of the LLM verifier.
+
+For every (contract, rule) pair the static checks in static_checks.py run
+first. A decisive static verdict gets a confidence from the check(s) that
+produced it and from how much of the rule's MUST-level text those checks
+actually cover; only verdicts at or above SPECGUARD_TRIAGE_MIN_CONFIDENCE
+(default 0.85) are reported without escalating to the LLM.
+
+agreement_benchmark() replays the static verdicts against existing LLM
+reports on a sample of pairs, so the threshold can be tuned from data.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import traceback
+from collections import defaultdict
+
+from static_checks import FAIL, NOT_APPLICABLE, PASS, run_static_checks
+
+
+MIN_CONFIDENCE = float(os.environ.get("SPECGUARD_TRIAGE_MIN_CONFIDENCE", "0.85"))
+
+# LLM calls a pair costs when it is escalated: seed selection + slice verdict
+# (the full-code fallback is not counted, so savings are a lower bound).
+CALLS_PER_PAIR = 2
+
+# Base confidence of each check per result.
+CHECK_CONFIDENCE = {
+    ("signature", FAIL): 0.97,
+    ("signature", NOT_APPLICABLE): 0.9,
+    ("event_emission", PASS): 0.92,
+    ("event_emission", FAIL): 0.92,
+    ("return_value", PASS): 0.93,
+    ("return_value", FAIL): 0.95,
+}
+
+# Rule text a check speaks to, used to measure how much of a rule it covers.
+CHECK_COVERS = {
+    "signature": re.compile(r"signature|parameterList|returnParameters|visibility|typeName", re.I),
+    # Event names are matched case-sensitively: "the transfer" is not the event.
+    "event_emission": re.compile(r"emitStatement|eventDefinition|\bemit|\bfire|(?-i:\bTransfer\b|\bApproval\b)", re.I),
+    "return_value": re.compile(r"returnStatement|returnParameters|\breturns?\b|\bbool\b", re.I),
+}
+
+REQUIREMENT_SECTIONS = ("normativity", "required_behavior", "guards_and_failures", "observables")
+MUST_RE = re.compile(r"\bmust\b", re.I)
+CALLER_RE = re.compile(r"\b(callers|clients|interfaces and contracts)\b", re.I)
+
+
+def implementation_requirements(rule):
+    """MUST-level items of the rule that constrain the implementation (not its callers)."""
+    items = []
+    for section in REQUIREMENT_SECTIONS:
+        for item in rule["sections"].get(section, []):
+            if MUST_RE.search(item) and not CALLER_RE.search(item):
+                items.append(item)
+    return items
+
+
+def coverage(rule, checks):
+    requirements = implementation_requirements(rule)
+    if not requirements:
+        return 1.0
+    covered = sum(1 for item in requirements if any(CHECK_COVERS[name].search(item) for name in checks))
+    return covered / len(requirements)
+
+
+def confidence(report, rule):
+    """
+    Confidence of a static report for a rule. FAIL / NOT_APPLICABLE verdicts
+    only need one violated requirement, so they keep the check's confidence.
+    A PASS is scaled down by the share of MUST requirements left unchecked.
+    Checks with no confidence for the result (the signature check on a PASS,
+    which it cannot decide) do not lower it.
+    """
+    checks = report["source"].split(":", 1)[1].split("+")
+    result = report["result"]
+    scored = [CHECK_CONFIDENCE[(name, result)] for name in checks if (name, result) in CHECK_CONFIDENCE]
+    base = min(scored, default=0.5)
+    if result != PASS:
+        return round(base, 3)
+    return round(base * (0.5 + 0.5 * coverage(rule, checks)), 3)
+
+
+def undecidable_passes(min_confidence=None):
+    """
+    Behavioral checks whose PASS cannot be decided statically even when it
+    covers the whole rule, as run_static_checks reports it (after the
+    signature check). Empty unless the threshold or CHECK_CONFIDENCE is off.
+    """
+    if min_confidence is None:
+        min_confidence = MIN_CONFIDENCE
+    fully_covered = {"sections": {}}
+    return [
+        name for name, result in CHECK_CONFIDENCE
+        if result == PASS and confidence({"source": f"static:signature+{name}", "result": PASS}, fully_covered) < min_confidence
+    ]
+
+
+def triage(roots, rule, min_confidence=None, indexes=None):
+    """
+    Returns {"report", "confidence", "decided"}. report is the static report
+    (or None if no check was decisive); decided is True if it can be used
+    without escalating to the LLM.
+    """
+    if min_confidence is None:
+        min_confidence = MIN_CONFIDENCE
+    report = run_static_checks(roots, rule, indexes)
+    if report is None:
+        return {"report": None, "confidence": 0.0, "decided": False}
+
+    conf = confidence(report, rule)
+    report = dict(report, confidence=conf)
+    return {"report": report, "confidence": conf, "decided": conf >= min_confidence}
+
+
+class TriageStats:
+    """Per-rule counts of pairs decided statically vs escalated, thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rules = defaultdict(lambda: {
+            "pairs": 0,
+            "fingerprint": 0,
+            "static": 0,
+            "escalated": 0,
+            "low_confidence": 0,
+            "seed_from_index": 0,
+            "calls_avoided": 0,
+        })
+
+    def record(self, rule_id, key, calls_avoided=0):
+        with self._lock:
+            stats = self.rules[rule_id]
+            stats[key] += 1
+            stats["calls_avoided"] += calls_avoided
+
+    def summary(self):
+        with self._lock:
+            per_rule = {rule_id: dict(stats) for rule_id, stats in self.rules.items()}
+        totals = defaultdict(int)
+        for stats in per_rule.values():
+            for key, value in stats.items():
+                totals[key] += value
+        return {"min_confidence": MIN_CONFIDENCE, "totals": dict(totals), "rules": per_rule}
+
+
+# ---------------------------------------------------------------------------
+# Agreement benchmark
+# ---------------------------------------------------------------------------
+
+def confidence_bucket(conf):
+    if conf >= 0.9:
+        return ">=0.90"
+    if conf >= 0.8:
+        return "0.80-0.90"
+    return "<0.80"
+
+
+def agreement_benchmark(base_dir, reports_dir, rules, load_roots, sample=200, seed=0, out_path=None):
+    """
+    Compare static verdicts with existing LLM reports on a random sample of
+    (contract, rule) pairs. load_roots(src_path, metadata_path) returns the
+    concrete root contracts. Writes and returns the summary.
+    """
+    pairs = []
+    for entry in sorted(os.listdir(reports_dir)):
+        for rule in rules:
+            report_path = os.path.join(reports_dir, entry, f"{rule['id']}_report.json")
+            if not os.path.isfile(report_path):
+                continue
+            try:
+                with open(report_path, "r", encoding="utf-8") as fp:
+                    report = json.load(fp)
+            except (OSError, ValueError):
+                continue
+            if str(report.get("source", "")).startswith("static:"):
+                continue
+            if report.get("result") in (PASS, FAIL, NOT_APPLICABLE):
+                pairs.append((entry, rule, report["result"]))
+
+    rng = random.Random(seed)
+    if len(pairs) > sample:
+        pairs = rng.sample(pairs, sample)
+
+    by_entry = defaultdict(list)
+    for entry, rule, llm_result in pairs:
+        by_entry[entry].append((rule, llm_result))
+
+    rows = []
+    for entry, items in sorted(by_entry.items()):
+        contract_dir = os.path.join(base_dir, entry)
+        try:
+            roots = load_roots(os.path.join(contract_dir, "main.sol"), os.path.join(contract_dir, "metadata.json"))
+        except Exception as e:
+            print(f"[BENCHMARK] skipping {entry}: {e}")
+            continue
+        indexes = {}
+        for rule, llm_result in items:
+            try:
+                t = triage(roots, rule, indexes=indexes)
+            except Exception:
+                traceback.print_exc()
+                continue
+            static_result = t["report"]["result"] if t["report"] else None
+            rows.append({
+                "contract": entry,
+                "rule": rule["id"],
+                "llm": llm_result,
+                "static": static_result,
+                "confidence": t["confidence"],
+                "decided": t["decided"],
+                "agree": static_result == llm_result if static_result else None,
+            })
+
+    def agreement(selected):
+        judged = [row for row in selected if row["static"] is not None]
+        agreed = sum(1 for row in judged if row["agree"])
+        return {
+            "pairs": len(selected),
+            "static_verdicts": len(judged),
+            "agreement": round(agreed / len(judged), 3) if judged else None,
+        }
+
+    per_rule = defaultdict(list)
+    per_bucket = defaultdict(list)
+    for row in rows:
+        per_rule[row["rule"]].append(row)
+        if row["static"] is not None:
+            per_bucket[confidence_bucket(row["confidence"])].append(row)
+
+    summary = {
+        "sample": len(rows),
+        "min_confidence": MIN_CONFIDENCE,
+        "overall": agreement(rows),
+        "decided": agreement([row for row in rows if row["decided"]]),
+        "by_rule": {rule_id: agreement(items) for rule_id, items in sorted(per_rule.items())},
+        "by_confidence": {bucket: agreement(items) for bucket, items in sorted(per_bucket.items())},
+        "disagreements": [row for row in rows if row["agree"] is False],
+    }
+
+    if out_path is None:
+        out_path = os.path.join(reports_dir, "triage_benchmark.json")
+    with open(out_path, "w", encoding="utf-8") as fp:
+        json.dump(summary, fp, indent=2)
+    print(f"[BENCHMARK] {json.dumps({k: summary[k] for k in ('sample', 'overall', 'decided')})}")
+    return summary
@@ -0,0 +1,112 @@
+"""
+Corpus-wide memo of slice verdicts.
+
+Slices built by build_structured_slice_output are often identical across
+contracts up to identifiers and comments. The memo keys each slice-stage
+verdict by (rule hash, normalized slice hash), where the slice is normalized
+with normalize.normalize_source and consistently alpha-renamed, so later
+contracts with the same normalized slice reuse the verdict without an LLM
+call. Entries are appended to a JSON Lines file and reloaded on start.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+
+from normalize import alpha_rename, normalize_source, sha256
+from signature_index import ERC20_EVENTS, ERC20_FUNCTIONS
+
+
+MEMO_PATH = os.environ.get("SPECGUARD_VERDICT_MEMO", os.path.join("reports", "verdict_memo.jsonl"))
+
+# Standard names are what rules talk about, so they are never renamed.
+STANDARD_NAMES = frozenset(ERC20_FUNCTIONS) | frozenset(ERC20_EVENTS)
+
+
+def normalize_slice(slice_json, reserved=STANDARD_NAMES):
+    """
+    Canonical text of a structured slice: comments and whitespace removed,
+    elements in an order that does not depend on naming, and identifiers
+    renamed consistently across sources and SlithIR.
+    """
+    elements = []
+    for category in sorted(slice_json):
+        for item in slice_json[category]:
+            # Library functions replaced by a summary carry "summary" instead of source.
+            source = normalize_source(item.get("source") or item.get("summary", ""))
+            ir = " ".join(item.get("slithir", "").split())
+            elements.append((category, source, ir))
+
+    # Sort by each element's own renamed form so the order is name-independent.
+    elements.sort(key=lambda e: (e[0], alpha_rename(e[1], {}, reserved), alpha_rename(e[2], {}, reserved)))
+
+    mapping = {}
+    parts = []
+    for category, source, ir in elements:
+        parts.append(f"{category}\n{alpha_rename(source, mapping, reserved)}\n{alpha_rename(ir, mapping, reserved)}")
+    return "\n\n".join(parts)
+
+
+def slice_hash(slice_json, compiler=""):
+    """
+    Hash of the normalized slice. compiler (e.g. "0.8") is mixed in because
+    the same code can behave differently across solc minor versions
+    (checked arithmetic since 0.8).
+    """
+    return sha256(compiler + "\n" + normalize_slice(slice_json))
+
+
+class VerdictMemo:
+    """(rule hash, normalized slice hash) -> slice-stage verdict, with per-rule hit rates."""
+
+    def __init__(self, path=MEMO_PATH):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[(entry["rule_hash"], entry["slice_hash"])] = entry
+
+    def get(self, rule, key):
+        with self._lock:
+            entry = self.entries.get((rule["hash"], key))
+            self.stats[rule["id"]]["hits" if entry else "misses"] += 1
+        if entry is None:
+            return None
+        report = dict(entry["report"])
+        report["source"] = f"memo:{entry['origin']}"
+        return report
+
+    def put(self, rule, key, report, origin):
+        """Store a slice-stage verdict (VERIFIED or NEED_FULL_CODE) computed for origin."""
+        entry = {"rule_hash": rule["hash"], "slice_hash": key, "rule_id": rule["id"], "origin": origin, "report": report}
+        with self._lock:
+            if (rule["hash"], key) in self.entries:
+                return
+            self.entries[(rule["hash"], key)] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps(entry) + "\n")
+
+    def summary(self):
+        with self._lock:
+            per_rule = {rule_id: dict(stats) for rule_id, stats in self.stats.items()}
+        for stats in per_rule.values():
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        hits = sum(s["hits"] for s in per_rule.values())
+        lookups = sum(s["hits"] + s["misses"] for s in per_rule.values())
+        return {
+            "entries": len(self.entries),
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "rules": per_rule,
+        }
@@ -6,31 +6,26 @@ from slither.core.variables.state_variable import StateVariable
 import copy
 import os
 import json
-import subprocess
 from slither.core.declarations import Event
 from slither.slithir.operations.event_call import EventCall
-from openai import AzureOpenAI
+from llm_backend import approx_tokens, get_backend
+from llm_resilience import with_resilience
+from response_parser import request_with_repair, consume_stream, ResponseParseError, STAGE_SCHEMAS
+from static_checks import index_seed
+from triage import triage, TriageStats, agreement_benchmark, undecidable_passes, CALLS_PER_PAIR, MIN_CONFIDENCE
+from rule_compiler import compile_rules
+from contract_loader import concrete_root_contracts, compiler_version
+from fingerprints import FingerprintStore
+from verdict_memo import VerdictMemo, slice_hash
+from dedup import group_contracts, write_manifest, fan_out
+from library_summaries import LibrarySummaryStore
+from grammar_concepts import prune_slice, rule_concepts
 import re
 import time
 import traceback
 
 
 
-def ensure_solc_version(version):
-    """Ensure the specified Solidity compiler version is installed and active."""
-    try:
-        result = subprocess.run(['solc-select', 'versions'], capture_output=True, text=True)
-        if version not in result.stdout:
-            print(f"Installing Solidity version {version}...")
-            subprocess.run(['solc-select', 'install', version], check=True)
-        
-        subprocess.run(['solc-select', 'use', version], check=True)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error setting up Solidity version {version}: {e}")
-        return False
-
-
 def find_slice(contract, comp, visited):
     if visited.get(comp.name, False):
         return []
@@ -40,6 +35,10 @@ def find_slice(contract, comp, visited):
     if isinstance(comp,FunctionContract):
         for call in comp.all_internal_calls():
             comp_slice.append(call.function)
+        # `using SafeMath for uint256; a.add(b)`, SafeMath.add(a, b) and
+        # Address.isContract(x) are library calls, not internal calls.
+        for call in comp.all_library_calls():
+            comp_slice.append(call.function)
 
         for func in contract.functions:
             if func.name != comp.name:
@@ -148,46 +147,6 @@ def read_solidity_source(filepath):
 
 
 
-def is_concrete(contract) -> bool:
-    return (
-        not contract.is_interface
-        and not contract.is_library
-        and not contract.is_abstract
-    )
-
-
-def concrete_root_contracts(src_path: str, metadata_path: str):
-    # Load compiler version
-    with open(metadata_path, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-
-    raw_version = metadata.get("CompilerVersion", "").lstrip("v")
-    base_version = raw_version.split("-")[0].split("+")[0]
-    if not base_version or not ensure_solc_version(base_version):
-        return False
-
-    sl = Slither(src_path)
-    contracts = list(sl.contracts)
-    by_name = {c.name: c for c in contracts}
-
-    # Compute indegree (number of children inheriting from this contract)
-    indegree = defaultdict(int)
-    for c in contracts:
-        indegree[c.name] = 0
-
-    for derived in contracts:
-        for base in derived.inheritance:
-            if base.name in by_name:
-                indegree[base.name] += 1
-
-    # Count concrete contracts with indegree == 0
-    concrete_roots = [
-        c for c in contracts
-        if is_concrete(c) and indegree[c.name] == 0
-    ]
-
-    return concrete_roots
-
 def get_skeleton(src_path,contract_name):
     
     slither = Slither(src_path)
@@ -305,6 +264,9 @@ def build_full_contract_structured_output(roots):
     
     return result
 
+library_store = LibrarySummaryStore()
+
+
 def build_structured_slice_output(slices):
     """
     Build simple structured output organized by category
@@ -317,11 +279,26 @@ def build_structured_slice_output(slices):
         "events": []
     }
     
+    tokens_saved = 0
     for elem in slices:
         if isinstance(elem, FunctionContract):
+            source = elem.source_mapping.content if elem.source_mapping else ""
+            known = library_store.lookup(source)
+            if known is not None:
+                # Well-known library code: a one-line summary instead of source and IR.
+                library, summary = known
+                saved = approx_tokens(source + get_slithir_string(elem)) - approx_tokens(summary)
+                library_store.record(saved)
+                tokens_saved += saved
+                result["functions"].append({
+                    "name": elem.name,
+                    "library": library,
+                    "summary": summary,
+                })
+                continue
             result["functions"].append({
                 "name": elem.name,
-                "source": elem.source_mapping.content if elem.source_mapping else "",
+                "source": source,
                 "slithir": get_slithir_string(elem)  # ← Use your function
             })
         
@@ -343,7 +320,9 @@ def build_structured_slice_output(slices):
                 "name": elem.name,
                 "source": elem.source_mapping.content if elem.source_mapping else ""
             })
-    
+
+    if tokens_saved:
+        print(f"[LIBRARY] slice: ~{tokens_saved} tokens saved by library summaries")
     return result
 
 
@@ -354,13 +333,471 @@ AZURE_OPENAI_API_VERSION = "2024-12-01-preview"
 AZURE_OPENAI_DEPLOYMENT = "gpt-4o"
 MAX_TOKENS = "16384"
 TEMP = "0.0"
+# Pause between LLM calls to stay under the endpoint's rate limit (0 for the mock server).
+REQUEST_DELAY = float(os.environ.get("SPECGUARD_REQUEST_DELAY", "10"))
+# Stream verdicts and parse them incrementally; optionally stop generation once
+# the required fields are in (skipping the long "fixed_code" text).
+STREAM_VERDICTS = os.environ.get("SPECGUARD_LLM_STREAM", "0") == "1"
+STREAM_EARLY_STOP = os.environ.get("SPECGUARD_STREAM_EARLY_STOP", "1") == "1"
+VERDICT_REQUIRED_FIELDS = ("mode", "result", "reasoning", "evidence", "recommendations")
+
+backend = with_resilience(get_backend(AZURE_OPENAI_DEPLOYMENT,azure_endpoint=AZURE_OPENAI_ENDPOINT,api_key=AZURE_OPENAI_API_KEY,api_version=AZURE_OPENAI_API_VERSION,max_tokens=int(MAX_TOKENS),temperature=float(TEMP)))
+
+# Prompt-cache instrumentation: prompt and cached-token counts per stage, from the API usage fields.
+prompt_cache_stats = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+
+
+def record_usage(stage, usage):
+    stats = prompt_cache_stats[stage]
+    stats["calls"] += 1
+    stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+    stats["cached_tokens"] += usage.get("cached_tokens", 0)
+
+
+def prompt_cache_summary():
+    summary = {}
+    for stage, stats in prompt_cache_stats.items():
+        ratio = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        summary[stage] = {**stats, "cached_ratio": round(ratio, 3)}
+    return summary
+
+
+def chat(messages, stage="other"):
+    """Send one chat completion request and return the response text."""
+    completion = backend.complete(messages)
+    record_usage(stage, completion.usage)
+    return completion.text
+
+
+# Per-rule counts of pairs decided by static triage vs escalated to the LLM.
+triage_stats = TriageStats()
+
+# Verdicts precomputed for known reference implementations (see fingerprints.py).
+fingerprint_store = FingerprintStore()
+
+# Slice-stage verdicts keyed by (rule hash, normalized slice hash), shared across runs.
+verdict_memo = VerdictMemo()
+
+# Drop slice elements that cannot contribute to the grammar concepts a rule mentions.
+SLICE_PRUNING = os.environ.get("SPECGUARD_SLICE_PRUNING", "1") == "1"
+
+# SPECGUARD_TRIAGE_BENCHMARK=N replays static triage against N existing LLM
+# reports instead of running the verifier.
+TRIAGE_BENCHMARK = int(os.environ.get("SPECGUARD_TRIAGE_BENCHMARK", "0"))
+
+
+def verdict_ready(fields):
+    """Stop condition for a streamed verdict."""
+    if fields.get("mode") == "NEED_FULL_CODE":
+        # Nothing after the mode is used; start the full-code fallback now.
+        return True
+    return STREAM_EARLY_STOP and all(key in fields for key in VERDICT_REQUIRED_FIELDS)
+
+
+def request_verdict(messages, stage):
+    """
+    Request a verdict for stage. In streaming mode the JSON object is parsed as
+    it arrives and the stream is closed as soon as verdict_ready() holds; an
+    unusable streamed reply goes through the normal repair path.
+    """
+    send = lambda msgs: chat(msgs, stage)
+    if not STREAM_VERDICTS:
+        return request_with_repair(send, messages, stage)
+
+    deltas = backend.stream(messages, on_usage=lambda usage: record_usage(stage, usage))
+    fields, response_text, stopped_early = consume_stream(deltas, stop_when=verdict_ready)
+    if fields and not STAGE_SCHEMAS[stage](fields):
+        if stopped_early:
+            print(f"[STREAM] {stage}: stopped early after {sorted(fields)}")
+        return fields
+    return request_with_repair(send, messages, stage, response_text=response_text)
+
+
+# ---------------------------------------------------------------------------
+# Prompt templates
+#
+# Every prompt is laid out for provider-side prefix caching: the static
+# system prompt and instructions come first, then per-contract content
+# (inventory, full source, SlithIR), then per-rule content. All rules of a
+# contract therefore share one long cacheable prefix.
+# ---------------------------------------------------------------------------
+
+SEED_GEN_SYSTEM_PROMPT = """ 
+You are a Solidity static-analysis assistant.
+Given a rule in YAML and a smart-contract element inventory, select a minimal set of seed anchors that enables downstream static analysis to extract all code relevant to verifying the rule.
+"""
+
+SEED_GEN_INSTRUCTION_PROMPT = """
+You are given:
+Input A: A smart-contract element inventory (JSON).
+Input B: A rule or requirement (YAML).
+
+Task:
+Return a FILTERED VERSION of the inventory containing ***ALL*** elements relevant to the rule.
+The filtered inventory will be used as seed input to a downstream static-analysis engine,
+which will expand dependencies automatically.
+
+Requirements:
+- Include ALL functions whose name matches any function mentioned in the rule (including overloads/variants).
+- Include getter/setter functions for state mentioned in "state_effects" or "required_behavior".
+- Include events mentioned in "observables" section.
+- Include state variables explicitly mentioned or implied by "state_effects".
+- Prefer seeds with explicit links (reads/writes/emits/calls).
+- Preserve the original inventory structure and field names exactly.
+- Do not modify elements; only remove irrelevant ones.
+- If the rule is OPTIONAL and the inventory does not contain evidence that the feature exists,
+  return the inventory structure with empty lists.
+- Do not add new fields, annotations, or invent elements.
+
+**IMPORTANT: It is acceptable to include extra elements (false positives), but you MUST NOT miss any relevant elements (false negatives). When in doubt, include the element.**
+
+Output:
+- Return valid JSON only.
+- The output must have the same top-level keys as the input inventory.
+- Elements not relevant to the rule must be omitted.
+"""
+
+INVENTORY_BLOCK = """
+Input A: A smart-contract element inventory (JSON).
+The inventory lists contract elements (state variables, events, functions, structs).
+<<<
+{inventory}
+>>>
+"""
+
+EMPTY_SEED_VERIFIER_SYSTEM_PROMPT = """
+You are a Solidity compliance auditor.
+
+Context:
+A prior rule-guided seed-selection step was executed over a static-analysis inventory
+(functions, state variables, and events). The resulting filtered inventory was
+structurally valid but EMPTY, meaning no rule-relevant anchors were identified.
+This may indicate that the rule is OPTIONAL and the feature is absent, that the
+feature is absent despite being required, or that the feature is not exposed by
+the extracted inventory.
+
+Your task:
+Perform a final, end-to-end compliance analysis using:
+- the rule (YAML), and
+- the full Solidity source code.
+
+Decision policy:
+- If the rule is OPTIONAL and the feature is absent in the code, return NOT_APPLICABLE.
+- If the rule requirements are satisfied, return PASS.
+- Otherwise, return FAIL.
+
+Return valid JSON only.
+"""
+
+EMPTY_SEED_VERIFIER_INSTRUCTION_PROMPT = """
+You are given:
+Input A: Full Solidity source code
+Input B: Rule (YAML)
+
+Output (JSON only):
+{
+  "mode": "VERIFIED",
+  "result": "PASS" | "FAIL" | "NOT_APPLICABLE",
+  "reasoning": "<brief explanation>",
+  "evidence": "<specific functions, state variables, events, or patterns>",
+  "recommendations": ["<fix suggestions if FAIL; else empty list>"],
+  "fixed_code": "<optional Solidity snippet or null>"
+}
+
+Constraints:
+- Do not re-run seed selection.
+- Do not assume missing code exists.
+- Be concise and concrete.
+"""
+
+VERIFIER_SYSTEM_PROMPT = """
+You are a Solidity compliance assistant.
+
+Your goal is to judge whether the given code satisfies a requirement/rule using the available evidence.
+When issues are found, suggest how they could be fixed.
+If the available code is not enough to decide, clearly say that more code is needed.
+"""
+
+# The slice depends on both the contract and the rule, so it goes last; the
+# rule text before it is shared by the same rule across contracts.
+VERIFIER_INSTRUCTION_PROMPT = """
+You are given:
+Input A: A structured rule describing expected behavior.
+Input B: A slice of Solidity code that is likely relevant.
+
+Task:
+Decide whether the code slice satisfies the rule.
+
+Guidelines:
+- Use the structured rule as guidance, but feel free to infer intent when appropriate.
+- Base your decision only on the code shown.
+- Use SlithIR to reason about control flow, state reads/writes, reverts, and event emissions when helpful.
+- If you can confidently decide compliance or non-compliance from the slice, report it.
+- If you cannot decide with confidence, ask for more code instead of guessing.
+
+Output:
+Return exactly ONE JSON object.
+
+If you can decide from the slice:
+{
+  "mode": "VERIFIED",
+  "result": "PASS" | "FAIL",
+  "reasoning": "<brief explanation>",
+  "recommendations": [
+    "<how the issue could be fixed, if any>"
+  ],
+  "evidence": "<brief reference to relevant functions, state, events, or IR behavior>",
+  "fixed_code": "<optional Solidity snippet if an obvious local fix exists, otherwise omit or null>"
+}
+
+If you cannot decide from the slice:
+{
+  "mode": "NEED_FULL_CODE",
+  "reason": "<why the slice is insufficient>",
+  "what_to_provide": "<what additional code would allow verification>"
+}
+
+Constraints:
+- Return valid JSON only.
+- Be concise.
+- Do not assume missing code exists.
+"""
+
+VERIFIER_FULL_INSTRUCTION_PROMPT = """
+You are given:
+Input A: Full Solidity code (more complete context than the slice).
+Input B: SlithIR for functions and modifiers.
+Input C: A structured rule describing expected behavior.
+
+Task:
+Decide whether the code satisfies the rule.
+
+Guidelines:
+- Use the structured rule as guidance, but feel free to infer intent when appropriate.
+- Use Solidity source for understanding the complete contract context.
+- Use SlithIR to reason about control flow, state reads/writes, reverts, and event emissions.
+- If you can decide compliance or non-compliance, report it.
+- Provide recommendations to fix failures, and include fixed code if an obvious local fix exists.
+
+Output:
+Return exactly ONE JSON object:
+{
+  "mode": "VERIFIED",
+  "result": "PASS" | "FAIL",
+  "reasoning": "<brief explanation>",
+  "recommendations": [
+    "<how the issue could be fixed, if any>"
+  ],
+  "evidence": "<brief reference to relevant functions, state, events, or IR behavior>",
+  "fixed_code": "<optional Solidity snippet if an obvious local fix exists, otherwise omit or null>"
+}
+
+Constraints:
+- Return valid JSON only.
+- Be concise.
+- Do not assume missing code exists.
+"""
+
+
+def contract_prompt_blocks(src_path, roots, merged_skeleton):
+    """
+    Render the per-contract prompt content once so every rule of the contract
+    sends a byte-identical prefix. The full-code blocks are built lazily.
+    """
+    blocks = {"inventory": INVENTORY_BLOCK.format(inventory=json.dumps(merged_skeleton, indent=2))}
+
+    def full_code_blocks():
+        if "full_code" not in blocks:
+            full_code = read_solidity_source(src_path)
+            full_code_ir = build_full_contract_structured_output(roots)
+            blocks["full_code"] = f"""
+Input A: Full Solidity code
+<<<
+{full_code}
+>>>
+"""
+            blocks["full_code_ir"] = f"""
+Input B: SlithIR for functions and modifiers.
+<<<
+{json.dumps(full_code_ir, indent=2)}
+>>>
+"""
+        return blocks["full_code"], blocks["full_code_ir"]
+
+    blocks["full_code_blocks"] = full_code_blocks
+    return blocks
+
+
+def rule_block(label, rule):
+    return f"""
+Input {label}: Rule (YAML)
+<<<
+{rule}
+>>>
+"""
+
+
+def verify_rule(src_path, roots, contract_blocks, compiled_rule, out_path, indexes=None):
+    """
+    Run seed selection, slice verification and (if needed) the full-code
+    fallback for one (contract, compiled rule) pair and write its report to
+    out_path. Pairs matching a known reference implementation, or that static
+    triage decides with enough confidence, are reported without any LLM call.
+    indexes caches the roots' selector indexes across the contract's rules.
+    """
+    rule = compiled_rule["text"]
+    rule_id = compiled_rule["id"]
+    triage_stats.record(rule_id, "pairs")
+
+    report = fingerprint_store.lookup(roots, compiled_rule)
+    if report is not None:
+        triage_stats.record(rule_id, "fingerprint", CALLS_PER_PAIR)
+        print(report)
+        with open(out_path, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2)
+        return
+
+    triaged = triage(roots, compiled_rule, indexes=indexes)
+    if triaged["decided"]:
+        triage_stats.record(rule_id, "static", CALLS_PER_PAIR)
+        print(triaged["report"])
+        with open(out_path, "w", encoding="utf-8") as fp:
+            json.dump(triaged["report"], fp, indent=2)
+        return
+
+    triage_stats.record(rule_id, "escalated")
+    static_triage = None
+    if triaged["report"] is not None:
+        # Kept on the LLM report so static/LLM agreement can be measured later.
+        triage_stats.record(rule_id, "low_confidence")
+        static_triage = {"result": triaged["report"]["result"], "confidence": triaged["confidence"], "source": triaged["report"]["source"]}
+
+    # If every function/event the rule targets is in the selector index, the
+    # seed is known without asking the model.
+    filtered_skeleton = index_seed(roots, compiled_rule, indexes)
+    if filtered_skeleton is not None:
+        triage_stats.record(rule_id, "seed_from_index", 1)
+    else:
+        seed_gen_instruction_prompt = SEED_GEN_INSTRUCTION_PROMPT + contract_blocks["inventory"] + rule_block("B", rule)
+
+        messages = [{"role": "system", "content": SEED_GEN_SYSTEM_PROMPT},{"role": "user","content": seed_gen_instruction_prompt}]
+
+        filtered_skeleton = request_with_repair(lambda msgs: chat(msgs, "seed"), messages, "seed")
+
+        time.sleep(REQUEST_DELAY)
+
+    if (isinstance(filtered_skeleton, dict) and filtered_skeleton and all(isinstance(v, list) and not v for v in filtered_skeleton.values())):
+        print("filtered_skeleton is empty")
+
+        full_code_block, _ = contract_blocks["full_code_blocks"]()
+        empty_seed_verifier_instruction_prompt = EMPTY_SEED_VERIFIER_INSTRUCTION_PROMPT + full_code_block + rule_block("B", rule)
+
+        messages = [{"role": "system", "content": EMPTY_SEED_VERIFIER_SYSTEM_PROMPT},{"role": "user","content": empty_seed_verifier_instruction_prompt}]
+
+        report = request_verdict(messages, "empty_seed_verdict")
+        report["static_triage"] = static_triage
+        print(report)
+        time.sleep(REQUEST_DELAY)
+        with open(out_path, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2)
+        return
+
+    slices = set()
+    seeds = []
+    for category, items in filtered_skeleton.items():
+        for item in items:
+            name = item.get("name")
+            if not name:
+                continue
+            contract_name = item.get("contract")
+            if not contract_name:
+                continue
+
+            contract = next((con for con in roots if con.name == contract_name), None)
+
+            if contract is None:
+                continue
+
+            if category == "functions":
+                cur_slice = get_func_code_slice(name,contract)
+                slices.update(cur_slice)
+            elif category == "state_vars":
+                cur_slice = get_state_var_code_slice(name,contract)
+                slices.update(cur_slice)
+            elif category == "events":
+                cur_slice = get_event_code_slice(name,contract)
+                slices.update(cur_slice)
+            else:
+                continue
+            # find_slice puts the element it starts from first.
+            seeds.extend(cur_slice[:1])
+
+    if SLICE_PRUNING:
+        event_names = [t["name"] for t in compiled_rule["targets"] if t["kind"] == "event"]
+        event_names += [event for event, _ in compiled_rule["predicates"]["event_emission"]]
+        pruned = prune_slice(slices, seeds, rule_concepts(compiled_rule["sections"]), event_names)
+        print(f"[SLICE] rule {rule_id}: kept {len(pruned)} of {len(slices)} elements")
+        slices = pruned
+
+    slice_json = build_structured_slice_output(slices)
+
+    # Identical slices (up to naming and comments) seen on earlier contracts
+    # reuse their slice-stage verdict.
+    solc_minor = ".".join(compiler_version(os.path.join(os.path.dirname(src_path), "metadata.json")).split(".")[:2])
+    memo_key = slice_hash(slice_json, solc_minor)
+    report = verdict_memo.get(compiled_rule, memo_key)
+    if report is None:
+        verifier_instruction_prompt = VERIFIER_INSTRUCTION_PROMPT + rule_block("A", rule) + f"""
+Input B: A slice of Solidity code that is likely relevant.
+<<<
+{slice_json}
+>>>
+"""
+
+        messages = [{"role": "system", "content": VERIFIER_SYSTEM_PROMPT},{"role": "user","content": verifier_instruction_prompt}]
+
+        report = request_verdict(messages, "slice_verdict")
+        verdict_memo.put(compiled_rule, memo_key, report, os.path.basename(os.path.dirname(out_path)))
+        time.sleep(REQUEST_DELAY)
+    report["static_triage"] = static_triage
+    print(report)
+    if report["mode"] == "NEED_FULL_CODE":
+        print("Need full code")
+        full_code_block, full_code_ir_block = contract_blocks["full_code_blocks"]()
+        verifier_instruction_full = VERIFIER_FULL_INSTRUCTION_PROMPT + full_code_block + full_code_ir_block + rule_block("C", rule)
+
+        messages = [{"role": "system", "content": VERIFIER_SYSTEM_PROMPT},{"role": "user", "content": verifier_instruction_full}]
+
+        report = request_verdict(messages, "full_verdict")
+        report["static_triage"] = static_triage
+        print(report)
+        with open(out_path, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2)
+        time.sleep(REQUEST_DELAY)
+    else:
+        with open(out_path, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2)
 
-client = AzureOpenAI(azure_endpoint=AZURE_OPENAI_ENDPOINT,api_key=AZURE_OPENAI_API_KEY,api_version=AZURE_OPENAI_API_VERSION)
 
 base_dir = "dir3"
 output_base_dir = "reports"
 
-for entry in os.listdir(base_dir):
+# Parsed once for the whole run; see rule_compiler.py.
+rules = compile_rules()
+for check_name in undecidable_passes():
+    print(f"[TRIAGE] a fully covered {check_name} PASS stays below {MIN_CONFIDENCE}; such pairs always escalate")
+
+if TRIAGE_BENCHMARK:
+    agreement_benchmark(base_dir, output_base_dir, rules, concrete_root_contracts, sample=TRIAGE_BENCHMARK)
+    raise SystemExit(0)
+
+# Copies that differ only in comments/formatting are verified once; the
+# representative's reports are fanned out to the other members.
+contract_groups = group_contracts(base_dir)
+write_manifest(contract_groups, os.path.join(output_base_dir, "dedup_groups.json"))
+
+for members in contract_groups.values():
+    entry = members[0]
     contract_dir = os.path.join(base_dir, entry)
     if not os.path.isdir(contract_dir):
         continue
@@ -379,307 +816,53 @@ for entry in os.listdir(base_dir):
             contract_skeleton_pair.append((contract, skeleton))
 
         merged_skeleton = get_merged_skeleton(contract_skeleton_pair)
-
-        SEED_GEN_SYSTEM_PROMPT = """ 
-        You are a Solidity static-analysis assistant.
-        Given a rule in YAML and a smart-contract element inventory, select a minimal set of seed anchors that enables downstream static analysis to extract all code relevant to verifying the rule.
-        """
-
-        for f in os.listdir("Rules"):
-            if f.endswith((".yaml", ".yml")):
-                with open(os.path.join("Rules", f)) as file:
-                    rule = file.read()
-                
-                rule_name = os.path.splitext(f)[0]
-
-                out_dir = os.path.join(output_base_dir, entry)
-                os.makedirs(out_dir, exist_ok=True)
-
-                out_path = os.path.join(out_dir, f"{rule_name}_report.json")
-
-                if os.path.isfile(out_path):
-                    print(f"Report already exists: {out_path}, skipping...")
-                    continue
-
-                seed_gen_instruction_prompt = f"""
-                    You are given:
-                    Input A: A rule or requirement (YAML).
-                    <<<
-                    {rule}
-                    >>>
-                    Input B: A smart-contract element inventory (JSON).
-                    The inventory lists contract elements (state variables, events, functions, structs).
-                    <<<
-                    {merged_skeleton}
-                    >>>
-
-                    Task:
-                    Return a FILTERED VERSION of the inventory containing ***ALL*** elements relevant to the rule.
-                    The filtered inventory will be used as seed input to a downstream static-analysis engine,
-                    which will expand dependencies automatically.
-
-                    Requirements:
-                    - Include ALL functions whose name matches any function mentioned in the rule (including overloads/variants).
-                    - Include getter/setter functions for state mentioned in "state_effects" or "required_behavior".
-                    - Include events mentioned in "observables" section.
-                    - Include state variables explicitly mentioned or implied by "state_effects".
-                    - Prefer seeds with explicit links (reads/writes/emits/calls).
-                    - Preserve the original inventory structure and field names exactly.
-                    - Do not modify elements; only remove irrelevant ones.
-                    - If the rule is OPTIONAL and the inventory does not contain evidence that the feature exists,
-                      return the inventory structure with empty lists.
-                    - Do not add new fields, annotations, or invent elements.
-
-                    **IMPORTANT: It is acceptable to include extra elements (false positives), but you MUST NOT miss any relevant elements (false negatives). When in doubt, include the element.**
-
-                    Output:
-                    - Return valid JSON only.
-                    - The output must have the same top-level keys as the input inventory.
-                    - Elements not relevant to the rule must be omitted.
-                """
-
-                messages = [{"role": "system", "content": SEED_GEN_SYSTEM_PROMPT},{"role": "user","content": seed_gen_instruction_prompt}]
-
-                response = client.chat.completions.create(model=AZURE_OPENAI_DEPLOYMENT,messages=messages,max_tokens=int(MAX_TOKENS),temperature=float(TEMP))
-
-                response_text = response.choices[0].message.content
-
-                time.sleep(10)
-                
-                filtered_skeleton = json.loads(re.sub(r"^```json\s*|\s*```$", "", response_text.strip(), flags=re.DOTALL))
-                
-                if (isinstance(filtered_skeleton, dict) and filtered_skeleton and all(isinstance(v, list) and not v for v in filtered_skeleton.values())):
-                    print("filtered_skeleton is empty")
-
-                    EMPTY_SEED_VERIFIER_SYSTEM_PROMPT = """
-                    You are a Solidity compliance auditor.
-
-                    Context:
-                    A prior rule-guided seed-selection step was executed over a static-analysis inventory
-                    (functions, state variables, and events). The resulting filtered inventory was
-                    structurally valid but EMPTY, meaning no rule-relevant anchors were identified.
-                    This may indicate that the rule is OPTIONAL and the feature is absent, that the
-                    feature is absent despite being required, or that the feature is not exposed by
-                    the extracted inventory.
-
-                    Your task:
-                    Perform a final, end-to-end compliance analysis using:
-                    - the rule (YAML), and
-                    - the full Solidity source code.
-
-                    Decision policy:
-                    - If the rule is OPTIONAL and the feature is absent in the code, return NOT_APPLICABLE.
-                    - If the rule requirements are satisfied, return PASS.
-                    - Otherwise, return FAIL.
-
-                    Return valid JSON only.
-                    """
-                    full_code = read_solidity_source(src_path) 
-                    empty_seed_verifier_instruction_prompt = f"""
-
-                    Input A: Rule (YAML)
-                    <<<
-                    {rule}
-                    >>>
-
-                    Input B: Full Solidity source code
-                    <<<
-                    {full_code}
-                    >>>
-
-                    Output (JSON only):
-                    {{
-                      "mode": "VERIFIED",
-                      "result": "PASS" | "FAIL" | "NOT_APPLICABLE",
-                      "reasoning": "<brief explanation>",
-                      "evidence": "<specific functions, state variables, events, or patterns>",
-                      "recommendations": ["<fix suggestions if FAIL; else empty list>"],
-                      "fixed_code": "<optional Solidity snippet or null>"
-                    }}
-
-                    Constraints:
-                    - Do not re-run seed selection.
-                    - Do not assume missing code exists.
-                    - Be concise and concrete.
-                    """
-
-                    messages = [{"role": "system", "content": EMPTY_SEED_VERIFIER_SYSTEM_PROMPT},{"role": "user","content": empty_seed_verifier_instruction_prompt}]
-
-                    response = client.chat.completions.create(model=AZURE_OPENAI_DEPLOYMENT,messages=messages,max_tokens=int(MAX_TOKENS),temperature=float(TEMP))
-
-                    response_text = response.choices[0].message.content
-
-                    report = json.loads(re.sub(r"^```json\s*|\s*```$", "", response_text.strip(), flags=re.DOTALL))
-                    print(report)
-                    time.sleep(10)
-                    with open(out_path, "w", encoding="utf-8") as fp:
-                        json.dump(report, fp, indent=2)
-                    continue
-
-                slices = set()
-                for category, items in filtered_skeleton.items():
-                    for item in items:
-                        name = item.get("name")
-                        if not name:
-                            continue
-                        contract_name = item.get("contract")
-                        if not contract_name:
-                            continue
-
-                        contract = next((con for con in roots if con.name == contract_name), None)
-
-                        if contract is None:
-                            continue
-
-                        if category == "functions":
-                            cur_slice = get_func_code_slice(name,contract)
-                            slices.update(cur_slice)
-                        elif category == "state_vars":
-                            cur_slice = get_state_var_code_slice(name,contract)
-                            slices.update(cur_slice)
-                        elif category == "events":
-                            cur_slice = get_event_code_slice(name,contract)
-                            slices.update(cur_slice)
-
-                slice_json = build_structured_slice_output(slices)
-                VERIFIER_SYSTEM_PROMPT = """
-                    You are a Solidity compliance assistant.
-
-                    Your goal is to judge whether the given code satisfies a requirement/rule using the available evidence.
-                    When issues are found, suggest how they could be fixed.
-                    If the available code is not enough to decide, clearly say that more code is needed.
-                """ 
-
-                verifier_instruction_prompt = f"""
-                    You are given:
-
-                    Input A: A structured rule describing expected behavior.
-                    <<<
-                    {rule}
-                    >>>
-
-                    Input B: A slice of Solidity code that is likely relevant.
-                    <<<
-                    {slice_json}
-                    >>>
-
-                    Task:
-                    Decide whether the code slice satisfies the rule.
-
-                    Guidelines:
-                    - Use the structured rule as guidance, but feel free to infer intent when appropriate.
-                    - Base your decision only on the code shown.
-                    - Use SlithIR to reason about control flow, state reads/writes, reverts, and event emissions when helpful.
-                    - If you can confidently decide compliance or non-compliance from the slice, report it.
-                    - If you cannot decide with confidence, ask for more code instead of guessing.
-
-                    Output:
-                    Return exactly ONE JSON object.
-
-                    If you can decide from the slice:
-                    {{
-                      "mode": "VERIFIED",
-                      "result": "PASS" | "FAIL",
-                      "reasoning": "<brief explanation>",
-                      "recommendations": [
-                        "<how the issue could be fixed, if any>"
-                      ],
-                      "evidence": "<brief reference to relevant functions, state, events, or IR behavior>",
-                      "fixed_code": "<optional Solidity snippet if an obvious local fix exists, otherwise omit or null>"
-                    }}
-
-                    If you cannot decide from the slice:
-                    {{
-                      "mode": "NEED_FULL_CODE",
-                      "reason": "<why the slice is insufficient>",
-                      "what_to_provide": "<what additional code would allow verification>"
-                    }}
-
-                    Constraints:
-                    - Return valid JSON only.
-                    - Be concise.
-                    - Do not assume missing code exists.
-
-                """        
-                
-                messages = [{"role": "system", "content": VERIFIER_SYSTEM_PROMPT},{"role": "user","content": verifier_instruction_prompt}]
-
-                response = client.chat.completions.create(model=AZURE_OPENAI_DEPLOYMENT,messages=messages,max_tokens=int(MAX_TOKENS),temperature=float(TEMP))
-
-                response_text = response.choices[0].message.content
-
-                report = json.loads(re.sub(r"^```json\s*|\s*```$", "", response_text.strip(), flags=re.DOTALL))
-                print(report)
-                time.sleep(10)
-                if report["mode"] == "NEED_FULL_CODE":
-                    print("Need full code")
-                    full_code = read_solidity_source(src_path)  # your existing helper
-                    full_code_ir = build_full_contract_structured_output(roots)
-                    verifier_instruction_full = f"""
-                        You are given:
-
-                        Input A: A structured rule describing expected behavior.
-                        <<<
-                        {rule}
-                        >>>
-
-                        Input B: Full Solidity code (more complete context than the slice).
-                        <<<
-                        {full_code}
-                        >>>
-
-                        Input C: SlithIR for functions and modifiers.
-                        <<<
-                        {json.dumps(full_code_ir, indent=2)}
-                        >>>
-
-                        Task:
-                        Decide whether the code satisfies the rule.
-
-                        Guidelines:
-                        - Use the structured rule as guidance, but feel free to infer intent when appropriate.
-                        - Use Solidity source for understanding the complete contract context.
-                        - Use SlithIR to reason about control flow, state reads/writes, reverts, and event emissions.
-                        - If you can decide compliance or non-compliance, report it.
-                        - Provide recommendations to fix failures, and include fixed code if an obvious local fix exists.
-
-                        Output:
-                        Return exactly ONE JSON object:
-                        {{
-                          "mode": "VERIFIED",
-                          "result": "PASS" | "FAIL",
-                          "reasoning": "<brief explanation>",
-                          "recommendations": [
-                            "<how the issue could be fixed, if any>"
-                          ],
-                          "evidence": "<brief reference to relevant functions, state, events, or IR behavior>",
-                          "fixed_code": "<optional Solidity snippet if an obvious local fix exists, otherwise omit or null>"
-                        }}
-
-                        Constraints:
-                        - Return valid JSON only.
-                        - Be concise.
-                        - Do not assume missing code exists.
-                        """
-
-                    messages = [{"role": "system", "content": VERIFIER_SYSTEM_PROMPT},{"role": "user", "content": verifier_instruction_full}]
-
-                    response = client.chat.completions.create(model=AZURE_OPENAI_DEPLOYMENT,messages=messages,max_tokens=int(MAX_TOKENS),temperature=float(TEMP))
-
-                    response_text = response.choices[0].message.content
-                    report = json.loads(re.sub(r"^```json\s*|\s*```$", "", response_text.strip(), flags=re.DOTALL))
-                    print(report)
-                    with open(out_path, "w", encoding="utf-8") as fp:
-                        json.dump(report, fp, indent=2)
-                    time.sleep(10)
-                else:
-                    with open(out_path, "w", encoding="utf-8") as fp:
-                        json.dump(report, fp, indent=2)
+        contract_blocks = contract_prompt_blocks(src_path, roots, merged_skeleton)
     except Exception as contract_err:
         print(f"[CONTRACT ERROR] {entry}")
         print(contract_err)
         traceback.print_exc()
-                    
+        continue
+
+    # Selector indexes of this contract's roots, shared by its rules only.
+    indexes = {}
+    for compiled_rule in rules:
+        rule_name = compiled_rule["id"]
 
+        out_dir = os.path.join(output_base_dir, entry)
+        os.makedirs(out_dir, exist_ok=True)
 
+        out_path = os.path.join(out_dir, f"{rule_name}_report.json")
 
+        if os.path.isfile(out_path):
+            print(f"Report already exists: {out_path}, skipping...")
+            continue
+
+        # A failure here only loses this (contract, rule) pair; the report
+        # is not written, so the pair is retried on the next run.
+        try:
+            verify_rule(src_path, roots, contract_blocks, compiled_rule, out_path, indexes)
+        except ResponseParseError as parse_err:
+            print(f"[RULE ERROR] {entry}/{rule_name}: unusable {parse_err.stage} response")
+            print(parse_err)
+        except Exception as rule_err:
+            print(f"[RULE ERROR] {entry}/{rule_name}")
+            print(rule_err)
+            traceback.print_exc()
+
+    if len(members) > 1:
+        written = fan_out(output_base_dir, entry, members[1:])
+        print(f"[DEDUP] {entry}: {written} reports copied to {len(members) - 1} duplicates")
+
+print(f"[LLM] {backend.name}: {json.dumps(backend.summary())}")
+print(f"[PROMPT CACHE] {json.dumps(prompt_cache_summary())}")
+print(f"[TRIAGE] {json.dumps(triage_stats.summary()['totals'])}")
+memo_summary = verdict_memo.summary()
+print(f"[LIBRARY] {json.dumps(library_store.summary())}")
+print(f"[MEMO] {memo_summary['hits']}/{memo_summary['lookups']} slice verdicts reused (hit rate {memo_summary['hit_rate']})")
+os.makedirs(output_base_dir, exist_ok=True)
+with open(os.path.join(output_base_dir, "prompt_cache_stats.json"), "w", encoding="utf-8") as fp:
+    json.dump(prompt_cache_summary(), fp, indent=2)
+with open(os.path.join(output_base_dir, "triage_stats.json"), "w", encoding="utf-8") as fp:
+    json.dump(triage_stats.summary(), fp, indent=2)
+with open(os.path.join(output_base_dir, "verdict_memo_stats.json"), "w", encoding="utf-8") as fp:
+    json.dump(memo_summary, fp, indent=2)